@@ -9,6 +9,7 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { prisma } from '@/lib/prisma';
 import { withAdminAuth } from '@/lib/auth/adminAuth';
+import { inlineContentFields } from '@/lib/competitiveSourceContent';
 
 interface RouteParams {
   params: Promise<{ id: string }>;
@@ -51,7 +52,10 @@ export async function GET(request: NextRequest, { params }: RouteParams) {
       return NextResponse.json({ error: 'Source not found' }, { status: 404 });
     }
     
-    return NextResponse.json({ source });
+    // Compressed bodies (SOURCE_CONTENT_STORAGE zstd/blob) are not readable here
+    return NextResponse.json({
+      source: { ...source, contentCompressed: undefined, rawContentCompressed: undefined },
+    });
   });
 }
 
@@ -77,7 +81,8 @@ export async function PATCH(request: NextRequest, { params }: RouteParams) {
     const updateData: Record<string, unknown> = {};
     
     // Content fetch results
-    if (body.content !== undefined) updateData.content = body.content;
+    // Edited text is stored inline; compressed/offloaded copies and their hash/length are replaced
+    if (body.content !== undefined) Object.assign(updateData, inlineContentFields(body.content));
     if (body.contentTitle !== undefined) updateData.contentTitle = body.contentTitle;
     if (body.authorName !== undefined) updateData.authorName = body.authorName;
     if (body.authorId !== undefined) updateData.authorId = body.authorId;
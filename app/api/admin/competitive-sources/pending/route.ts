@@ -105,8 +105,15 @@ export async function GET(request: NextRequest) {
       }
     }
     
+    // Compressed bodies (SOURCE_CONTENT_STORAGE zstd/blob) are not readable here
+    const transformedSources = sources.map((source) => ({
+      ...source,
+      contentCompressed: undefined,
+      rawContentCompressed: undefined,
+    }));
+    
     return NextResponse.json({
-      sources,
+      sources: transformedSources,
       factionDatasheets,
       count: sources.length,
       status,
@@ -15,6 +15,7 @@ import {
   ExtractedUnitContext,
   ExtractedFactionContext,
 } from '@/lib/competitiveContextParser';
+import { readSourceContent } from '@/lib/competitiveSourceContent';
 
 interface ParseContextBody {
   sourceId: string;
@@ -47,7 +48,10 @@ export async function POST(request: NextRequest) {
         );
       }
 
-      if (!source.content) {
+      // Plain, zstd-compressed or offloaded to Storage (SOURCE_CONTENT_STORAGE in the pipeline script)
+      const content = await readSourceContent(source);
+
+      if (!content) {
         return NextResponse.json(
           { error: 'Source has no content - fetch it first' },
           { status: 400 }
@@ -59,7 +63,7 @@ export async function POST(request: NextRequest) {
       // Parse the content
       const result = useChunking
         ? await parseCompetitiveContextChunked(
-            source.content,
+            content,
             source.contentTitle || 'Unknown',
             source.authorName || 'Unknown',
             source.gameVersion || undefined,
@@ -67,7 +71,7 @@ export async function POST(request: NextRequest) {
             maxChunkSize
           )
         : await parseCompetitiveContext(
-            source.content,
+            content,
             source.contentTitle || 'Unknown',
             source.authorName || 'Unknown',
             source.gameVersion || undefined,
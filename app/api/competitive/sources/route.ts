@@ -105,12 +105,14 @@ export async function GET(request: NextRequest) {
       prisma.competitiveSource.count({ where }),
     ]);
 
-    // Transform to hide full content
+    // Transform to hide full content (plain or compressed, see SOURCE_CONTENT_STORAGE in the pipeline script)
     const transformedSources = sources.map((source) => ({
       ...source,
-      contentLength: source.content?.length || 0,
+      contentLength: source.contentLength ?? (source.content?.length || 0),
       content: undefined,
-      hasContent: !!source.content,
+      contentCompressed: undefined,
+      rawContentCompressed: undefined,
+      hasContent: !!source.content || !!source.contentHash,
     }));
 
     return NextResponse.json({
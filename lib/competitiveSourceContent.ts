@@ -0,0 +1,85 @@
+/**
+ * Competitive Source Content
+ * 
+ * Reads and writes CompetitiveSource text in every storage mode used by
+ * scripts/youtube_transcribe.py (SOURCE_CONTENT_STORAGE):
+ *   inline - plain text in content
+ *   zstd   - zstd-compressed in contentCompressed
+ *   blob   - zstd-compressed object in a private Supabase Storage bucket, named by contentHash
+ */
+
+import 'server-only';
+
+import { createHash } from 'crypto';
+import zlib from 'zlib';
+import { createServiceClient } from '@/lib/supabase/service';
+
+const SOURCE_CONTENT_BUCKET = process.env.SOURCE_CONTENT_BUCKET || 'competitive-source-content';
+
+export interface StoredSourceContent {
+  content: string | null;
+  contentEncoding: string | null;
+  contentCompressed: Uint8Array | null;
+  contentHash: string | null;
+}
+
+function sha256(text: string): string {
+  return createHash('sha256').update(text, 'utf8').digest('hex');
+}
+
+function decompressZstd(data: Uint8Array): string {
+  // zlib gained zstd in Node.js 22.15 / 23.8
+  const zstdDecompressSync = (zlib as unknown as { zstdDecompressSync?: (buf: Buffer) => Buffer }).zstdDecompressSync;
+  if (!zstdDecompressSync) {
+    throw new Error('Reading compressed source content requires Node.js 22.15 or newer (zlib zstd support)');
+  }
+  return zstdDecompressSync(Buffer.from(data)).toString('utf8');
+}
+
+async function downloadContentBlob(contentHash: string): Promise<Uint8Array> {
+  const supabase = createServiceClient();
+  const { data, error } = await supabase.storage
+    .from(SOURCE_CONTENT_BUCKET)
+    .download(`${contentHash.slice(0, 2)}/${contentHash}.zst`);
+  if (error || !data) {
+    throw new Error(`Blob download failed: ${error?.message || 'no data'}`);
+  }
+  return new Uint8Array(await data.arrayBuffer());
+}
+
+/**
+ * Fetched text of a source, decompressed or downloaded as needed.
+ * Returns null when the source has no content yet.
+ */
+export async function readSourceContent(source: StoredSourceContent): Promise<string | null> {
+  if (!source.contentEncoding) {
+    return source.content;
+  }
+  if (source.contentEncoding === 'zstd') {
+    return source.contentCompressed ? decompressZstd(source.contentCompressed) : null;
+  }
+  if (source.contentEncoding === 'blob') {
+    if (!source.contentHash) return null;
+    const text = decompressZstd(await downloadContentBlob(source.contentHash));
+    if (sha256(text) !== source.contentHash) {
+      throw new Error(`Blob ${source.contentHash} does not match its hash`);
+    }
+    return text;
+  }
+  throw new Error(`Unknown contentEncoding: ${source.contentEncoding}`);
+}
+
+/**
+ * Prisma update fields that store edited text inline, replacing any
+ * compressed or offloaded copy (hash and length are recomputed).
+ */
+export function inlineContentFields(content: string | null) {
+  return {
+    content,
+    contentEncoding: null,
+    contentCompressed: null,
+    contentHash: content === null ? null : sha256(content),
+    // Code points, matching the pipeline's len()
+    contentLength: content === null ? null : Array.from(content).length,
+  };
+}
@@ -0,0 +1,16 @@
+-- Migration: Unique scope index for DatasheetCompetitiveContext
+-- Description: One context per (datasheet, faction, detachment) scope, with NULL scopes
+--   compared via COALESCE. scripts/youtube_transcribe.py upserts contexts with
+--   INSERT ... ON CONFLICT against this index (one statement per batch of units).
+--   Duplicate scopes are removed first, keeping the most recently updated row.
+-- Run this SQL manually if prisma migrate is not working due to drift
+
+DELETE FROM "DatasheetCompetitiveContext" a
+USING "DatasheetCompetitiveContext" b
+WHERE a."datasheetId" = b."datasheetId"
+  AND a."factionId" IS NOT DISTINCT FROM b."factionId"
+  AND a."detachmentId" IS NOT DISTINCT FROM b."detachmentId"
+  AND (a."updatedAt", a.id) < (b."updatedAt", b.id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS "DatasheetCompetitiveContext_scope_key"
+  ON "DatasheetCompetitiveContext" ("datasheetId", COALESCE("factionId", ''), COALESCE("detachmentId", ''));
@@ -0,0 +1,7 @@
+-- Migration: Track which source state each aggregated competitive context was built from
+-- Description: scripts/youtube_transcribe.py stores a fingerprint of the contributing
+--   DatasheetSource rows (ids + extractedAt + isOutdated) with each aggregation and skips
+--   re-aggregating units whose fingerprint is unchanged (override with --force).
+-- Run this SQL manually if prisma migrate is not working due to drift
+
+ALTER TABLE "DatasheetCompetitiveContext" ADD COLUMN IF NOT EXISTS "sourceFingerprint" TEXT;
@@ -0,0 +1,18 @@
+-- Migration: Compressed / offloaded storage for CompetitiveSource content
+-- Description: With SOURCE_CONTENT_STORAGE=zstd, scripts/youtube_transcribe.py stores fetched
+--   text zstd-compressed in contentCompressed/rawContentCompressed instead of content/rawContent.
+--   With SOURCE_CONTENT_STORAGE=blob, large bodies go to a private Supabase Storage bucket
+--   (SOURCE_CONTENT_BUCKET) addressed by contentHash (rawContentHash for the raw text).
+--   contentLength keeps the text length without reading it. Existing rows are converted with --convert-content-storage.
+-- Run this SQL manually if prisma migrate is not working due to drift
+
+ALTER TABLE "CompetitiveSource" ADD COLUMN IF NOT EXISTS "contentEncoding" TEXT;
+ALTER TABLE "CompetitiveSource" ADD COLUMN IF NOT EXISTS "contentCompressed" BYTEA;
+ALTER TABLE "CompetitiveSource" ADD COLUMN IF NOT EXISTS "rawContentCompressed" BYTEA;
+ALTER TABLE "CompetitiveSource" ADD COLUMN IF NOT EXISTS "contentHash" TEXT;
+ALTER TABLE "CompetitiveSource" ADD COLUMN IF NOT EXISTS "rawContentHash" TEXT;
+ALTER TABLE "CompetitiveSource" ADD COLUMN IF NOT EXISTS "contentLength" INTEGER;
+
+-- Backfill lengths of plain-text rows
+UPDATE "CompetitiveSource" SET "contentLength" = LENGTH(content)
+WHERE content IS NOT NULL AND "contentLength" IS NULL;
@@ -0,0 +1,7 @@
+-- Migration: Keep raw fetched text alongside compacted CompetitiveSource content
+-- Description: The fetch step (scripts/youtube_transcribe.py) now stores a compacted
+--   transcript in "content" (filler, sponsor reads and duplicate sentences removed)
+--   and the text as fetched in "rawContent".
+-- Run this SQL manually if prisma migrate is not working due to drift
+
+ALTER TABLE "CompetitiveSource" ADD COLUMN IF NOT EXISTS "rawContent" TEXT;
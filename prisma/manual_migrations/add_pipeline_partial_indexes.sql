@@ -0,0 +1,44 @@
+-- ============================================================================
+-- Partial / Expression Indexes for the Competitive Context Pipeline
+-- ============================================================================
+-- Indexes for the queries in scripts/youtube_transcribe.py that fall back to
+-- sequential scans once CompetitiveSource/DatasheetSource grow large, found with
+-- scripts/benchmark_pipeline_queries.py (--apply-indexes compares before/after).
+-- The queue indexes are partial: only the small pending part of each table is indexed.
+-- Run this SQL manually if prisma migrate is not working due to drift
+
+-- CompetitiveSource: fetch/curate queues (status = X ORDER BY createdAt, incl. claims)
+-- Used in: db_iter_pending_sources, db_count_sources, db_claim_sources
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "CompetitiveSource_queue_createdAt_idx"
+  ON "CompetitiveSource" ("status", "createdAt")
+  WHERE status IN ('pending', 'fetched');
+
+-- DatasheetSource: links pending extraction, grouped by source
+-- Used in: db_get_pending_datasheet_sources, db_claim_datasheet_sources,
+--          db_mark_sources_extracted (NOT EXISTS pending links)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "DatasheetSource_pending_source_idx"
+  ON "DatasheetSource" ("competitiveSourceId", "createdAt")
+  WHERE status = 'pending';
+
+-- DatasheetSource: extracted evidence per unit for aggregation
+-- Used in: db_iter_sources_for_aggregation, db_get_source_fingerprints,
+--          db_get_datasheets_with_sources
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "DatasheetSource_extracted_datasheet_idx"
+  ON "DatasheetSource" ("datasheetId")
+  WHERE status = 'extracted';
+
+-- Datasheet: case-insensitive lookup by name (+ faction)
+-- Used in: db_get_datasheet_by_name (LOWER(name) = LOWER(%s) [AND LOWER(faction) = ...])
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "Datasheet_lower_name_faction_idx"
+  ON "Datasheet" (LOWER(name), LOWER(faction));
+
+-- Datasheet: a faction's enabled datasheets in name order
+-- Used in: db_get_faction_datasheets, db_get_faction_datasheet_fingerprint (curation catalog)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "Datasheet_factionId_enabled_name_idx"
+  ON "Datasheet" ("factionId", name)
+  WHERE "isEnabled" = true;
+
+-- Update statistics for query planner
+ANALYZE "CompetitiveSource";
+ANALYZE "DatasheetSource";
+ANALYZE "Datasheet";
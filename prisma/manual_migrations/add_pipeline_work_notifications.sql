@@ -0,0 +1,31 @@
+-- Migration: Announce pipeline work with NOTIFY
+-- Description: scripts/youtube_transcribe.py --daemon LISTENs on 'pipeline_work' and runs
+--   the stage that has new work: CompetitiveSource 'pending' (fetch), 'fetched' (curate),
+--   'curated' (extract) and DatasheetSource 'pending' (extract). The payload carries only
+--   table and status, so Postgres collapses the notifications of one transaction (e.g. a
+--   multi-row link insert) into one. Sources added from the admin UI are picked up immediately.
+-- Run this SQL manually if prisma migrate is not working due to drift
+
+CREATE OR REPLACE FUNCTION notify_pipeline_work() RETURNS trigger AS $$
+BEGIN
+  PERFORM pg_notify(
+    'pipeline_work',
+    json_build_object('table', TG_TABLE_NAME, 'status', NEW.status)::text
+  );
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS "CompetitiveSource_notify_pipeline_work" ON "CompetitiveSource";
+CREATE TRIGGER "CompetitiveSource_notify_pipeline_work"
+  AFTER INSERT OR UPDATE OF status ON "CompetitiveSource"
+  FOR EACH ROW
+  WHEN (NEW.status IN ('pending', 'fetched', 'curated'))
+  EXECUTE FUNCTION notify_pipeline_work();
+
+DROP TRIGGER IF EXISTS "DatasheetSource_notify_pipeline_work" ON "DatasheetSource";
+CREATE TRIGGER "DatasheetSource_notify_pipeline_work"
+  AFTER INSERT OR UPDATE OF status ON "DatasheetSource"
+  FOR EACH ROW
+  WHEN (NEW.status = 'pending')
+  EXECUTE FUNCTION notify_pipeline_work();
@@ -0,0 +1,17 @@
+-- Migration: Work-queue leases for multi-worker pipeline runs
+-- Description: scripts/youtube_transcribe.py --claim-size N leases CompetitiveSource rows
+--   (fetch/curate) and DatasheetSource rows (extract) with FOR UPDATE SKIP LOCKED, recording
+--   the worker ID and lease expiry. Leases are renewed by a heartbeat while a batch is
+--   processed; expired leases are reclaimed by other workers.
+-- Run this SQL manually if prisma migrate is not working due to drift
+
+ALTER TABLE "CompetitiveSource" ADD COLUMN IF NOT EXISTS "leaseOwner" TEXT;
+ALTER TABLE "CompetitiveSource" ADD COLUMN IF NOT EXISTS "leaseExpiresAt" TIMESTAMP(3);
+
+ALTER TABLE "DatasheetSource" ADD COLUMN IF NOT EXISTS "leaseOwner" TEXT;
+ALTER TABLE "DatasheetSource" ADD COLUMN IF NOT EXISTS "leaseExpiresAt" TIMESTAMP(3);
+
+CREATE INDEX IF NOT EXISTS "CompetitiveSource_status_leaseExpiresAt_idx"
+  ON "CompetitiveSource"("status", "leaseExpiresAt");
+CREATE INDEX IF NOT EXISTS "DatasheetSource_status_leaseExpiresAt_idx"
+  ON "DatasheetSource"("status", "leaseExpiresAt");
@@ -34,20 +34,35 @@ Sources are added at the FACTION level (not per-unit), then the pipeline:
 4. AGGREGATE: Synthesizes all sources for a unit into final competitive context
 
 Pipeline Commands:
-  # Run all pipeline steps
+  # Run all pipeline steps (concurrently: a source is curated as soon as it is fetched)
   python3 scripts/youtube_transcribe.py --process-all
 
+  # Run all pipeline steps one after another over the whole backlog
+  python3 scripts/youtube_transcribe.py --process-all --sequential-stages
+
   # Run individual steps
   python3 scripts/youtube_transcribe.py --fetch-pending     # Step 1: Fetch content
   python3 scripts/youtube_transcribe.py --curate-pending    # Step 2: Identify units
   python3 scripts/youtube_transcribe.py --extract-pending   # Step 3: Extract context
 
+  # Extract every unit of a source in batched calls instead of one call per unit
+  python3 scripts/youtube_transcribe.py --extract-pending --batch-extract
+
+  # Run up to 16 extraction calls at once (backs off automatically when rate limited)
+  python3 scripts/youtube_transcribe.py --extract-pending --concurrency 16
+
+  # Send whole sources to extraction (default: only the passages around each unit's mentions)
+  python3 scripts/youtube_transcribe.py --extract-pending --full-transcript
+
   # Synthesize final context for a single unit
   python3 scripts/youtube_transcribe.py --aggregate --datasheet-name "Adrax Agatone"
   
   # Synthesize context for ALL units in a faction (batch mode)
   python3 scripts/youtube_transcribe.py --aggregate-all --faction-name "Space Wolves"
 
+  # Re-aggregate a whole faction with up to 8 units synthesized at once
+  python3 scripts/youtube_transcribe.py --aggregate-all --faction-name "Space Marines" --concurrency 8
+
 === MANUAL MODE ===
 
   # Interactive mode (prompts for URL)
@@ -76,23 +91,42 @@ Requirements:
   - OPENAI_API_KEY in .env.local (for Whisper fallback)
   - GOOGLE_API_KEY in .env.local (for Gemini unit context extraction)
   - ADMIN_API_KEY in .env.local (for database integration)
+
+Optional tuning (.env.local):
+  - GEMINI_CONTEXT_CACHE=remote|local|off  Cache each source's transcript once and reuse it
+                                           for curation and every unit extraction (default: remote)
+  - GEMINI_PROMPT_TOKEN_BUDGET=250000      Largest prompt sent in one call; bigger content is
+                                           compacted (extraction) or curated in parts
+
+Completed Gemini responses are cached in data/youtube-transcripts/_llm_cache.sqlite
+(30 days / 512 MB), so re-running a step repeats no identical calls. Use --no-llm-cache to bypass.
 """
 
 from __future__ import annotations
 
 import argparse
+import atexit
 import hashlib
 import json
 import os
+import queue
 import re
+import select
 import shutil
+import signal
+import socket
+import sqlite3
 import sys
 import tempfile
+import threading
 import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
+from itertools import count, groupby
 from pathlib import Path
 from typing import Any, Optional, Tuple
-from urllib.parse import urlparse
+from urllib.parse import parse_qsl, urlencode, urlparse
 
 import requests
 from yt_dlp import YoutubeDL
@@ -131,73 +165,323 @@ try:
 except Exception:
     pass
 
+# Optional zstd compression for stored source content (SOURCE_CONTENT_STORAGE)
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+    if os.getenv("SOURCE_CONTENT_STORAGE", "inline") != "inline":
+        print("⚠️ zstandard not installed. Compressed source content cannot be read or written.")
+        print("   Install with: pip install zstandard")
+
 # Database connection (direct Supabase PostgreSQL access)
 try:
     import psycopg2
-    from psycopg2.extras import RealDictCursor
+    from psycopg2.extras import RealDictCursor, execute_batch, execute_values
+    from psycopg2.pool import ThreadedConnectionPool
     HAS_PSYCOPG2 = True
 except ImportError:
     HAS_PSYCOPG2 = False
     print("⚠️ psycopg2 not installed. Database access will be limited.")
     print("   Install with: pip install psycopg2-binary")
 
-# Global database connection
-_db_conn = None
+# Pooled database connections: each thread checks one out per db_connection() block
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "8"))
+DB_POOL_CHECKOUT_TIMEOUT = float(os.getenv("DB_POOL_CHECKOUT_TIMEOUT", "60"))  # Wait for a free connection before failing
+DB_HEALTH_CHECK_IDLE_SECONDS = 30  # Connections idle longer than this are pinged before reuse
+DB_BULK_PAGE_SIZE = 1000  # Rows per multi-row INSERT statement
+DB_BATCH_PAGE_SIZE = 100  # Statements per round trip for batched UPDATEs
+DB_STREAM_ITERSIZE = int(os.getenv("DB_STREAM_ITERSIZE", "10"))  # Rows per page when paging through sources (rows carry transcripts)
+DB_AGGREGATION_PAGE_DATASHEETS = 25  # Datasheets whose sources are loaded per query when aggregating
+# Prisma-only connection string parameters that libpq rejects
+PRISMA_URL_PARAMS = {"pgbouncer", "connection_limit", "pool_timeout", "schema", "statement_cache_size", "socket_timeout"}
+
+_db_pool = None
+_db_pool_slots: Optional[threading.BoundedSemaphore] = None  # One per pooled connection: checkouts wait instead of failing
+_db_pool_lock = threading.Lock()
+_db_local = threading.local()  # Per-thread checkout: (connection, nesting depth)
+_db_last_used: dict = {}  # id(connection) -> time it was last returned to the pool
+
+
+def clean_database_url(db_url: str) -> str:
+    """Drop Prisma's connection string parameters (pgbouncer=true etc.), keeping libpq ones like sslmode."""
+    if "?" not in db_url:
+        return db_url
+    base, query = db_url.split("?", 1)
+    params = [(k, v) for k, v in parse_qsl(query, keep_blank_values=True) if k not in PRISMA_URL_PARAMS]
+    return f"{base}?{urlencode(params)}" if params else base
+
+
+def _get_db_pool():
+    """Create the connection pool on first use (DATABASE_URL from .env.local)."""
+    global _db_pool, _db_pool_slots
+    with _db_pool_lock:
+        if _db_pool is not None:
+            return _db_pool
+
+        if not HAS_PSYCOPG2:
+            raise RuntimeError("psycopg2 is required for database access")
+
+        db_url = os.getenv("DATABASE_URL")
+        if not db_url:
+            raise RuntimeError("DATABASE_URL not found in .env.local")
+
+        # Works behind pgbouncer in transaction mode: psycopg2 uses no server-side
+        # prepared statements, statements autocommit, and multi-statement work
+        # runs in explicit transactions (db_transaction) on a single checkout
+        _db_pool = ThreadedConnectionPool(
+            max(0, DB_POOL_MIN),
+            max(1, DB_POOL_MAX, DB_POOL_MIN),
+            clean_database_url(db_url),
+            cursor_factory=RealDictCursor
+        )
+        # ThreadedConnectionPool.getconn raises PoolError when exhausted rather than waiting
+        _db_pool_slots = threading.BoundedSemaphore(max(1, DB_POOL_MAX, DB_POOL_MIN))
+        print(f"✅ Connected to Supabase PostgreSQL directly (pool {DB_POOL_MIN}-{DB_POOL_MAX})")
+        return _db_pool
 
-def get_db_connection():
-    """Get or create a database connection using DATABASE_URL from .env.local"""
-    global _db_conn
-    if _db_conn is not None and not _db_conn.closed:
-        return _db_conn
 
-    if not HAS_PSYCOPG2:
-        raise RuntimeError("psycopg2 is required for database access")
+def _checkout_healthy_connection(pool):
+    """Take a connection from the pool, replacing it if it is closed or fails a ping."""
+    for _ in range(3):
+        conn = pool.getconn()
+        try:
+            if conn.closed:
+                raise psycopg2.InterfaceError("connection already closed")
+            if time.time() - _db_last_used.get(id(conn), 0) > DB_HEALTH_CHECK_IDLE_SECONDS:
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+            conn.autocommit = True
+            return conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            _db_last_used.pop(id(conn), None)
+            pool.putconn(conn, close=True)
+    raise RuntimeError("Could not get a healthy database connection")
+
+
+@contextmanager
+def db_connection():
+    """
+    Check out a pooled connection for the current thread (autocommit). Waits up
+    to DB_POOL_CHECKOUT_TIMEOUT when every connection is in use.
 
-    db_url = os.getenv("DATABASE_URL")
-    if not db_url:
-        raise RuntimeError("DATABASE_URL not found in .env.local")
+    Re-entrant: nested blocks on the same thread share the checkout, so helpers
+    can call other db_* functions. The connection goes back to the pool when the
+    outermost block exits (closed instead if it broke).
+    """
+    checkout = getattr(_db_local, "checkout", None)
+    if checkout is not None:
+        _db_local.checkout = (checkout[0], checkout[1] + 1)
+        try:
+            yield checkout[0]
+        finally:
+            conn, depth = _db_local.checkout
+            _db_local.checkout = (conn, depth - 1)
+        return
+
+    pool = _get_db_pool()
+    slots = _db_pool_slots
+    if not slots.acquire(timeout=DB_POOL_CHECKOUT_TIMEOUT):
+        raise RuntimeError(
+            f"No free database connection after {DB_POOL_CHECKOUT_TIMEOUT:.0f}s (pool of {DB_POOL_MAX}; raise DB_POOL_MAX)"
+        )
+    try:
+        conn = _checkout_healthy_connection(pool)
+    except BaseException:
+        slots.release()
+        raise
+    _db_local.checkout = (conn, 1)
+    try:
+        yield conn
+    finally:
+        _db_local.checkout = None
+        try:
+            if conn.closed:
+                _db_last_used.pop(id(conn), None)
+                pool.putconn(conn, close=True)
+            else:
+                if not conn.autocommit:
+                    conn.rollback()
+                    conn.autocommit = True
+                _db_last_used[id(conn)] = time.time()
+                pool.putconn(conn)
+        finally:
+            slots.release()
+
+
+@contextmanager
+def db_transaction():
+    """Run several statements as one transaction on this thread's connection (commit on success)."""
+    with db_connection() as conn:
+        if not conn.autocommit:
+            # Already inside a transaction - join it
+            yield conn
+            return
+        conn.autocommit = False
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.autocommit = True
+
+
+def db_iter_pages(query: str, params: tuple, key_sql: str, key_fields: tuple, itersize: int = DB_STREAM_ITERSIZE):
+    """
+    Yield a query's rows lazily, itersize rows per query (keyset pagination).
 
-    # Remove pgbouncer params for direct connection compatibility
-    # psycopg2 handles connection pooling differently
-    clean_url = db_url.split("?")[0]
+    query must end its WHERE clause with {after}, order by key_sql and end with
+    LIMIT %s; key_fields name the selected columns holding the key. Each page
+    is a short query on a pooled connection, so no transaction or connection
+    is held while the caller works on the rows (which may take hours for a
+    fetch stage) and rows updated meanwhile are simply not revisited.
+    """
+    last = None
+    while True:
+        if last is None:
+            page_query, page_params = query.format(after="TRUE"), (*params, itersize)
+        else:
+            page_query = query.format(after=f"({key_sql}) > ({', '.join(['%s'] * len(last))})")
+            page_params = (*params, *last, itersize)
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute(page_query, page_params)
+            rows = cur.fetchall()
+        yield from rows
+        if len(rows) < itersize:
+            return
+        last = tuple(rows[-1][field] for field in key_fields)
 
-    _db_conn = psycopg2.connect(clean_url, cursor_factory=RealDictCursor)
-    _db_conn.autocommit = True
-    print("✅ Connected to Supabase PostgreSQL directly")
-    return _db_conn
 
 def close_db_connection():
-    """Close the database connection"""
-    global _db_conn
-    if _db_conn is not None and not _db_conn.closed:
-        _db_conn.close()
-        _db_conn = None
+    """Close all pooled database connections"""
+    global _db_pool
+    with _db_pool_lock:
+        if _db_pool is not None:
+            _db_pool.closeall()
+            _db_pool = None
+            _db_last_used.clear()
 
 # ============================================================
 # DATABASE QUERY FUNCTIONS (replace API calls)
 # ============================================================
 
+def db_iter_pending_sources(status: str = "pending", itersize: int = DB_STREAM_ITERSIZE):
+    """
+    Page through competitive sources with the given status, oldest first (see
+    db_iter_pages) - the backlog's content is never held in memory at once.
+    """
+    yield from db_iter_pages("""
+        SELECT
+            cs.id, cs."sourceUrl", cs."sourceType", cs.content,
+            cs."contentEncoding", cs."contentCompressed", cs."contentHash",
+            cs."contentTitle", cs."authorName", cs."sourceId",
+            cs.status, cs."errorMessage", cs."factionId", cs."detachmentId",
+            f.name as "factionName", cs."createdAt"
+        FROM "CompetitiveSource" cs
+        LEFT JOIN "Faction" f ON cs."factionId" = f.id
+        WHERE cs.status = %s AND {after}
+        ORDER BY cs."createdAt" ASC, cs.id ASC
+        LIMIT %s
+    """, (status,), 'cs."createdAt", cs.id', ("createdAt", "id"), itersize)
+
 def db_get_pending_sources(status: str = "pending") -> list:
     """Get competitive sources with the given status"""
-    conn = get_db_connection()
-    with conn.cursor() as cur:
+    return list(db_iter_pending_sources(status))
+
+def db_count_sources(status: str) -> int:
+    """Count competitive sources with the given status"""
+    with db_connection() as conn, conn.cursor() as cur:
+        cur.execute('SELECT COUNT(*) AS n FROM "CompetitiveSource" WHERE status = %s', (status,))
+        return cur.fetchone()["n"]
+
+def db_claim_sources(status: str, limit: int, exclude_ids: list = ()) -> list:
+    """
+    Lease up to `limit` competitive sources in a status to this worker (same
+    rows as db_get_pending_sources). Rows leased by another live worker are
+    skipped (FOR UPDATE SKIP LOCKED + unexpired lease); expired leases are
+    reclaimed. exclude_ids: rows this run already attempted.
+    """
+    with db_connection() as conn, conn.cursor() as cur:
         cur.execute("""
-            SELECT
+            WITH claimable AS (
+                SELECT id FROM "CompetitiveSource"
+                WHERE status = %s
+                  AND ("leaseExpiresAt" IS NULL OR "leaseExpiresAt" < NOW())
+                  AND NOT (id = ANY(%s::text[]))
+                ORDER BY "createdAt" ASC
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            UPDATE "CompetitiveSource" cs
+            SET "leaseOwner" = %s, "leaseExpiresAt" = NOW() + make_interval(secs => %s)
+            FROM claimable
+            WHERE cs.id = claimable.id
+            RETURNING
                 cs.id, cs."sourceUrl", cs."sourceType", cs.content,
+                cs."contentEncoding", cs."contentCompressed", cs."contentHash",
                 cs."contentTitle", cs."authorName", cs."sourceId",
                 cs.status, cs."errorMessage", cs."factionId", cs."detachmentId",
-                f.name as "factionName"
-            FROM "CompetitiveSource" cs
-            LEFT JOIN "Faction" f ON cs."factionId" = f.id
-            WHERE cs.status = %s
-            ORDER BY cs."createdAt" ASC
-        """, (status,))
-        return cur.fetchall()
+                (SELECT f.name FROM "Faction" f WHERE f.id = cs."factionId") AS "factionName",
+                cs."createdAt"
+        """, (status, list(exclude_ids), limit, PIPELINE_WORKER_ID, PIPELINE_LEASE_SECONDS))
+        return sorted(cur.fetchall(), key=lambda row: row["createdAt"])
+
+def db_claim_datasheet_sources(limit: int, exclude_ids: list = ()) -> list:
+    """Lease up to `limit` DatasheetSources pending extraction (same rows as db_get_pending_datasheet_sources, see db_claim_sources)"""
+    with db_connection() as conn, conn.cursor() as cur:
+        cur.execute("""
+            WITH claimable AS (
+                SELECT ds.id, ds."datasheetId", ds."competitiveSourceId", ds."createdAt",
+                       cs."createdAt" AS "sourceCreatedAt"
+                FROM "DatasheetSource" ds
+                JOIN "CompetitiveSource" cs ON ds."competitiveSourceId" = cs.id
+                WHERE ds.status = 'pending' AND cs.status IN ('curated', 'extracted')
+                  AND (ds."leaseExpiresAt" IS NULL OR ds."leaseExpiresAt" < NOW())
+                  AND NOT (ds.id = ANY(%s::text[]))
+                ORDER BY cs."createdAt" ASC, cs.id, ds."createdAt" ASC
+                LIMIT %s
+                FOR UPDATE OF ds SKIP LOCKED
+            )
+            UPDATE "DatasheetSource" ds
+            SET "leaseOwner" = %s, "leaseExpiresAt" = NOW() + make_interval(secs => %s)
+            FROM claimable
+            JOIN "Datasheet" d ON claimable."datasheetId" = d.id
+            JOIN "CompetitiveSource" cs ON claimable."competitiveSourceId" = cs.id
+            WHERE ds.id = claimable.id
+            RETURNING
+                ds.id, ds."datasheetId", ds."competitiveSourceId" AS "sourceId", ds.status,
+                d.name as "datasheetName", d.faction, d."factionId" AS "datasheetFactionId",
+                cs."sourceUrl", cs."sourceType", cs."contentTitle", cs."authorName",
+                COALESCE(cs."contentLength", LENGTH(cs.content)) AS "contentLength",
+                claimable."sourceCreatedAt", claimable."createdAt"
+        """, (list(exclude_ids), limit, PIPELINE_WORKER_ID, PIPELINE_LEASE_SECONDS))
+        return sorted(cur.fetchall(), key=lambda row: (row["sourceCreatedAt"], row["sourceId"], row["createdAt"]))
+
+def db_renew_leases(table: str, ids: list) -> int:
+    """Extend this worker's leases on rows of a work-queue table. Returns the number still held."""
+    with db_connection() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            UPDATE "{table}" SET "leaseExpiresAt" = NOW() + make_interval(secs => %s)
+            WHERE id = ANY(%s::text[]) AND "leaseOwner" = %s
+        """, (PIPELINE_LEASE_SECONDS, list(ids), PIPELINE_WORKER_ID))
+        return cur.rowcount
+
+def db_release_leases(table: str, ids: list):
+    """Give up this worker's leases on rows of a work-queue table"""
+    with db_connection() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            UPDATE "{table}" SET "leaseOwner" = NULL, "leaseExpiresAt" = NULL
+            WHERE id = ANY(%s::text[]) AND "leaseOwner" = %s
+        """, (list(ids), PIPELINE_WORKER_ID))
 
 def db_get_faction_datasheets(faction_id: str) -> list:
     """Get all datasheets for a faction"""
-    conn = get_db_connection()
-    with conn.cursor() as cur:
+    with db_connection() as conn, conn.cursor() as cur:
         cur.execute("""
             SELECT id, name, faction, role, keywords
             FROM "Datasheet"
@@ -206,96 +490,243 @@ def db_get_faction_datasheets(faction_id: str) -> list:
         """, (faction_id,))
         return cur.fetchall()
 
-def db_update_source_status(source_id: str, status: str, **kwargs):
-    """Update a competitive source's status and optional fields"""
-    conn = get_db_connection()
-
-    # Build dynamic update query
-    set_clauses = ['status = %s', '"updatedAt" = NOW()']
-    values = [status]
-
-    field_mapping = {
-        'content': 'content',
-        'contentTitle': '"contentTitle"',
-        'authorName': '"authorName"',
-        'sourceId': '"sourceId"',
-        'errorMessage': '"errorMessage"',
-        'duration': 'duration',
-        'publishedAt': '"publishedAt"',
-    }
+def db_get_faction_datasheet_fingerprint(faction_id: str) -> str:
+    """Get a cheap fingerprint of a faction's enabled datasheets (ids + lastUpdated)"""
+    with db_connection() as conn, conn.cursor() as cur:
+        cur.execute("""
+            SELECT
+                COUNT(*) AS count,
+                MD5(COALESCE(STRING_AGG(id || ':' || "lastUpdated"::text, ',' ORDER BY id), '')) AS digest
+            FROM "Datasheet"
+            WHERE "factionId" = %s AND "isEnabled" = true
+        """, (faction_id,))
+        row = cur.fetchone()
+        return f"{row['count']}:{row['digest']}"
+
+SET_NULL = object()  # Field value that clears a column in db_update_source_status (None leaves it unchanged)
+
+SOURCE_STATUS_FIELDS = {
+    'content': 'content',
+    'rawContent': '"rawContent"',
+    'contentEncoding': '"contentEncoding"',
+    'contentCompressed': '"contentCompressed"',
+    'rawContentCompressed': '"rawContentCompressed"',
+    'rawContentHash': '"rawContentHash"',
+    'contentHash': '"contentHash"',
+    'contentLength': '"contentLength"',
+    'contentTitle': '"contentTitle"',
+    'authorName': '"authorName"',
+    'sourceId': '"sourceId"',
+    'errorMessage': '"errorMessage"',
+    'duration': 'duration',
+    'publishedAt': '"publishedAt"',
+}
 
-    for key, col in field_mapping.items():
-        if key in kwargs and kwargs[key] is not None:
+def _source_status_update(source_id: str, status: Optional[str], fields: dict) -> tuple:
+    """(query, values) updating a competitive source's status (kept if None); fields that are None are left unchanged."""
+    set_clauses = ['"updatedAt" = NOW()']
+    values = []
+    if status is not None:
+        set_clauses.insert(0, 'status = %s')
+        values.append(status)
+
+    for key, col in SOURCE_STATUS_FIELDS.items():
+        if fields.get(key) is not None:
             set_clauses.append(f'{col} = %s')
-            values.append(kwargs[key])
+            values.append(None if fields[key] is SET_NULL else fields[key])
 
     values.append(source_id)
+    return f'UPDATE "CompetitiveSource" SET {", ".join(set_clauses)} WHERE id = %s', values
 
-    with conn.cursor() as cur:
-        query = f'UPDATE "CompetitiveSource" SET {", ".join(set_clauses)} WHERE id = %s'
+def db_update_source_status(source_id: str, status: str, **kwargs):
+    """Update a competitive source's status and optional fields"""
+    query, values = _source_status_update(source_id, status, kwargs)
+    with db_connection() as conn, conn.cursor() as cur:
         cur.execute(query, values)
 
-def db_create_datasheet_links(source_id: str, links: list):
-    """Create DatasheetSource links for a competitive source"""
-    conn = get_db_connection()
-    with conn.cursor() as cur:
+def db_update_source_content(source_id: str, fields: dict) -> bool:
+    """
+    Re-store a plain-text source's content (fields from stored_content_fields)
+    without touching its status. Returns False if it was re-stored meanwhile.
+    """
+    query, values = _source_status_update(source_id, None, fields)
+    with db_connection() as conn, conn.cursor() as cur:
+        cur.execute(query + ' AND "contentEncoding" IS NULL', values)
+        return cur.rowcount == 1
+
+def db_apply_status_writes(source_updates: dict, link_updates: dict, extracted_source_ids) -> None:
+    """
+    Apply a batch of pipeline writes in one transaction (see StatusWriteBuffer).
+
+    source_updates: {source_id: (status, fields)} as for db_update_source_status.
+    link_updates: {link_id: (extracted_context, confidence, status)} as for
+    db_update_datasheet_source_extraction.
+    extracted_source_ids: sources to advance through db_mark_sources_extracted,
+    applied after the link updates so their links are no longer pending.
+    """
+    statements: dict[str, list] = {}
+    for source_id, (status, fields) in source_updates.items():
+        query, values = _source_status_update(source_id, status, fields)
+        statements.setdefault(query, []).append(values)
+
+    with db_transaction() as conn, conn.cursor() as cur:
+        for query, rows in statements.items():
+            execute_batch(cur, query, rows, page_size=DB_BATCH_PAGE_SIZE)
+        if link_updates:
+            execute_batch(cur, LINK_EXTRACTION_UPDATE, [
+                (json.dumps(extracted_context), confidence, status, link_id)
+                for link_id, (extracted_context, confidence, status) in link_updates.items()
+            ], page_size=DB_BATCH_PAGE_SIZE)
+        if extracted_source_ids:
+            db_mark_sources_extracted(list(extracted_source_ids))
+
+def _merge_link_rows(links_by_source: dict) -> list:
+    """
+    Flatten {source_id: [link, ...]} into upsert rows, one per (datasheet, source).
+
+    Duplicates are merged like curation parts (ON CONFLICT cannot touch the same
+    row twice in one statement): mention counts add up, the most relevant
+    summary wins.
+    """
+    merged: dict = {}
+    for source_id, links in links_by_source.items():
         for link in links:
-            cur.execute("""
-                INSERT INTO "DatasheetSource" (
-                    id, "datasheetId", "competitiveSourceId", "relevanceScore",
-                    "mentionCount", "mentionSummary", status, "createdAt", "updatedAt"
-                )
-                VALUES (
-                    gen_random_uuid(), %s, %s, %s, %s, %s, 'pending', NOW(), NOW()
-                )
-                ON CONFLICT ("datasheetId", "competitiveSourceId") DO UPDATE SET
-                    "relevanceScore" = EXCLUDED."relevanceScore",
-                    "mentionCount" = EXCLUDED."mentionCount",
-                    "mentionSummary" = EXCLUDED."mentionSummary",
-                    "updatedAt" = NOW()
-            """, (
-                link['datasheetId'],
-                source_id,
-                link.get('relevanceScore', 0.5),
-                link.get('mentionCount', 1),
-                link.get('mentionSummary', '')
-            ))
-
-def db_get_pending_datasheet_sources() -> list:
-    """Get DatasheetSource records pending extraction"""
-    conn = get_db_connection()
-    with conn.cursor() as cur:
+            key = (link['datasheetId'], source_id)
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = {
+                    'relevanceScore': link.get('relevanceScore', 0.5),
+                    'mentionCount': link.get('mentionCount', 1),
+                    'mentionSummary': link.get('mentionSummary', ''),
+                }
+                continue
+            existing['mentionCount'] += link.get('mentionCount', 1)
+            if link.get('relevanceScore', 0.5) > existing['relevanceScore']:
+                existing['relevanceScore'] = link.get('relevanceScore', 0.5)
+                existing['mentionSummary'] = link.get('mentionSummary', existing['mentionSummary'])
+    return [
+        (datasheet_id, source_id, m['relevanceScore'], m['mentionCount'], m['mentionSummary'])
+        for (datasheet_id, source_id), m in merged.items()
+    ]
+
+def db_create_datasheet_links_bulk(links_by_source: dict) -> int:
+    """
+    Upsert DatasheetSource links for one or more competitive sources with a
+    multi-row INSERT ... ON CONFLICT in a single transaction.
+
+    links_by_source: {source_id: [link, ...]}. Returns the number of links written.
+    """
+    rows = _merge_link_rows(links_by_source)
+    if not rows:
+        return 0
+    with db_transaction() as conn, conn.cursor() as cur:
+        written = execute_values(cur, """
+            INSERT INTO "DatasheetSource" (
+                id, "datasheetId", "competitiveSourceId", "relevanceScore",
+                "mentionCount", "mentionSummary", status, "createdAt", "updatedAt"
+            )
+            VALUES %s
+            ON CONFLICT ("datasheetId", "competitiveSourceId") DO UPDATE SET
+                "relevanceScore" = EXCLUDED."relevanceScore",
+                "mentionCount" = EXCLUDED."mentionCount",
+                "mentionSummary" = EXCLUDED."mentionSummary",
+                "updatedAt" = NOW()
+            RETURNING 1
+        """, rows,
+            template="(gen_random_uuid(), %s, %s, %s, %s, %s, 'pending', NOW(), NOW())",
+            page_size=DB_BULK_PAGE_SIZE,
+            fetch=True
+        )
+        return len(written)
+
+def db_create_datasheet_links(source_id: str, links: list) -> int:
+    """Create DatasheetSource links for a competitive source (one statement). Returns the number of links written."""
+    return db_create_datasheet_links_bulk({source_id: links})
+
+def db_get_pending_datasheet_sources(source_ids: list = None) -> list:
+    """
+    Get DatasheetSource records pending extraction, grouped by source.
+    With source_ids, only the links of those (curated) sources.
+
+    Content is not included (a transcript linked to 50 units would be shipped 50
+    times) - load it once per source with db_get_source_content().
+    """
+    with db_connection() as conn, conn.cursor() as cur:
         cur.execute("""
             SELECT
                 ds.id, ds."datasheetId", ds."competitiveSourceId" AS "sourceId", ds.status,
-                d.name as "datasheetName", d.faction,
-                cs."sourceUrl", cs."sourceType", cs.content, cs."contentTitle"
+                d.name as "datasheetName", d.faction, d."factionId" AS "datasheetFactionId",
+                cs."sourceUrl", cs."sourceType", cs."contentTitle", cs."authorName",
+                COALESCE(cs."contentLength", LENGTH(cs.content)) AS "contentLength"
             FROM "DatasheetSource" ds
             JOIN "Datasheet" d ON ds."datasheetId" = d.id
             JOIN "CompetitiveSource" cs ON ds."competitiveSourceId" = cs.id
             WHERE ds.status = 'pending' AND cs.status IN ('curated', 'extracted')
-            ORDER BY ds."createdAt" ASC
-        """)
+              AND (%s::text[] IS NULL OR cs.id = ANY(%s::text[]))
+            ORDER BY cs."createdAt" ASC, cs.id, ds."createdAt" ASC
+        """, (source_ids, source_ids))
         return cur.fetchall()
 
+def db_mark_sources_extracted(source_ids: list) -> int:
+    """Set sources to 'extracted' unless some of their links are still pending. Returns the number updated."""
+    if not source_ids:
+        return 0
+    with db_connection() as conn, conn.cursor() as cur:
+        cur.execute("""
+            UPDATE "CompetitiveSource" cs
+            SET status = 'extracted', "updatedAt" = NOW()
+            WHERE cs.id = ANY(%s::text[])
+              AND NOT EXISTS (
+                  SELECT 1 FROM "DatasheetSource" ds
+                  WHERE ds."competitiveSourceId" = cs.id AND ds.status = 'pending'
+              )
+        """, (list(source_ids),))
+        return cur.rowcount
+
+def db_get_source_content(source_id: str) -> Optional[str]:
+    """Get the fetched text content of a CompetitiveSource (decoded, see source_content_text)"""
+    with db_connection() as conn, conn.cursor() as cur:
+        cur.execute("""
+            SELECT content, "contentEncoding", "contentCompressed", "contentHash"
+            FROM "CompetitiveSource" WHERE id = %s
+        """, (source_id,))
+        row = cur.fetchone()
+    return source_content_text(row) if row else None
+
+def db_iter_inline_source_content(itersize: int = DB_STREAM_ITERSIZE):
+    """Page through sources whose content is still stored as plain text (see db_iter_pages)"""
+    yield from db_iter_pages("""
+        SELECT id, status, content, "rawContent", "createdAt"
+        FROM "CompetitiveSource"
+        WHERE "contentEncoding" IS NULL AND content IS NOT NULL AND {after}
+        ORDER BY "createdAt" ASC, id ASC
+        LIMIT %s
+    """, (), '"createdAt", id', ("createdAt", "id"), itersize)
+
+LINK_EXTRACTION_UPDATE = """
+    UPDATE "DatasheetSource"
+    SET "extractedContext" = %s,
+        confidence = %s,
+        status = %s,
+        "extractedAt" = NOW(),
+        "updatedAt" = NOW()
+    WHERE id = %s
+"""
+
 def db_update_datasheet_source_extraction(ds_id: str, extracted_context: dict, confidence: int, status: str = "extracted"):
     """Update a DatasheetSource with extracted context"""
-    conn = get_db_connection()
-    with conn.cursor() as cur:
-        cur.execute("""
-            UPDATE "DatasheetSource"
-            SET "extractedContext" = %s,
-                confidence = %s,
-                status = %s,
-                "extractedAt" = NOW(),
-                "updatedAt" = NOW()
-            WHERE id = %s
-        """, (json.dumps(extracted_context), confidence, status, ds_id))
+    with db_connection() as conn, conn.cursor() as cur:
+        cur.execute(LINK_EXTRACTION_UPDATE, (json.dumps(extracted_context), confidence, status, ds_id))
+
+def db_get_datasheet(datasheet_id: str) -> dict:
+    """Get a datasheet's id, name and faction"""
+    with db_connection() as conn, conn.cursor() as cur:
+        cur.execute('SELECT id, name, faction FROM "Datasheet" WHERE id = %s', (datasheet_id,))
+        return cur.fetchone()
 
 def db_get_datasheet_by_name(name: str, faction: str = None) -> dict:
     """Find a datasheet by name, optionally filtered by faction"""
-    conn = get_db_connection()
-    with conn.cursor() as cur:
+    with db_connection() as conn, conn.cursor() as cur:
         if faction:
             cur.execute("""
                 SELECT id, name, faction, "factionId"
@@ -312,23 +743,111 @@ def db_get_datasheet_by_name(name: str, faction: str = None) -> dict:
             """, (name,))
         return cur.fetchone()
 
-def db_get_datasheet_sources_for_aggregation(datasheet_id: str) -> list:
-    """Get all extracted sources for a datasheet for aggregation"""
-    conn = get_db_connection()
-    with conn.cursor() as cur:
-        cur.execute("""
-            SELECT
-                ds."extractedContext", ds.confidence,
-                cs."sourceType", cs."contentTitle" AS "sourceTitle",
-                cs."authorName", cs."publishedAt", cs."gameVersion"
-            FROM "DatasheetSource" ds
-            JOIN "CompetitiveSource" cs ON ds."competitiveSourceId" = cs.id
-            WHERE ds."datasheetId" = %s
-              AND ds.status = 'extracted'
-              AND ds."isOutdated" = false
-            ORDER BY cs."publishedAt" DESC NULLS LAST
-        """, (datasheet_id,))
-        return cur.fetchall()
+def _parse_extracted_context(row: dict) -> dict:
+    """Decode a DatasheetSource row's extractedContext JSON in place (once, at load time)."""
+    extracted = row.get("extractedContext")
+    if isinstance(extracted, str):
+        try:
+            row["extractedContext"] = json.loads(extracted)
+        except json.JSONDecodeError:
+            row["extractedContext"] = {"raw": extracted}
+    return row
+
+def db_iter_sources_for_aggregation(datasheet_ids: list, include_outdated: bool = False,
+                                    page_datasheets: int = DB_AGGREGATION_PAGE_DATASHEETS):
+    """
+    Load the extracted sources of many datasheets, one query per page of
+    page_datasheets datasheets (only one page is held in memory).
+
+    Yields (datasheet_id, rows) grouped by datasheet, in datasheet_ids order
+    (datasheets without sources are not yielded), sources newest first with
+    extractedContext already decoded. Each row carries the source's
+    faction/detachment (for scope partitioning) and its fingerprint token
+    (same format as db_get_source_fingerprints). include_outdated=True also
+    returns outdated rows, so per-scope fingerprints can be computed locally -
+    callers must drop them before synthesis.
+    """
+    datasheet_ids = list(datasheet_ids)
+    for start in range(0, len(datasheet_ids), page_datasheets):
+        page = datasheet_ids[start:start + page_datasheets]
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT
+                    ds."datasheetId", ds.id, ds."extractedContext", ds.confidence, ds."isOutdated",
+                    ds.id || ':' || COALESCE(ds."extractedAt"::text, '') || ':' || ds."isOutdated"::text
+                        AS "fingerprintToken",
+                    cs."sourceType", cs."contentTitle" AS "sourceTitle",
+                    cs."authorName", cs."publishedAt", cs."gameVersion",
+                    cs."factionId" AS "sourceFactionId", cs."detachmentId" AS "sourceDetachmentId"
+                FROM "DatasheetSource" ds
+                JOIN "CompetitiveSource" cs ON ds."competitiveSourceId" = cs.id
+                WHERE ds."datasheetId" = ANY(%s)
+                  AND ds.status = 'extracted'
+                  AND (%s OR ds."isOutdated" = false)
+                ORDER BY array_position(%s::text[], ds."datasheetId"), cs."publishedAt" DESC NULLS LAST
+            """, (page, include_outdated, page))
+            rows = cur.fetchall()
+        for datasheet_id, group in groupby(rows, key=lambda row: row["datasheetId"]):
+            yield datasheet_id, [_parse_extracted_context(row) for row in group]
+
+def db_get_datasheet_sources_for_aggregation(datasheet_id: str, include_outdated: bool = False) -> list:
+    """Get all extracted sources for a datasheet for aggregation (see db_iter_sources_for_aggregation)"""
+    for _, rows in db_iter_sources_for_aggregation([datasheet_id], include_outdated):
+        return rows
+    return []
+
+COMPETITIVE_CONTEXT_COLUMNS = [
+    'competitiveTier', 'tierReasoning', 'bestTargets', 'counters',
+    'synergies', 'playstyleNotes', 'deploymentTips', 'competitiveNotes',
+    'sourceCount', 'conflicts', 'sourceFingerprint',
+]
+
+def db_upsert_datasheet_competitive_contexts(contexts: list) -> int:
+    """
+    Upsert aggregated competitive contexts with one multi-row INSERT ... ON CONFLICT
+    in a single transaction (conflicts resolve on the COALESCE scope index from
+    prisma/manual_migrations/add_competitive_context_scope_unique_index.sql).
+
+    contexts: [{"datasheetId", "factionId", "detachmentId", <context columns>...}].
+    Existing rows only get the context columns present in the given dicts.
+    Returns the number of contexts written.
+    """
+    # One row per scope (last wins) - a statement cannot update the same row twice
+    by_scope = {}
+    for ctx in contexts:
+        by_scope[(ctx["datasheetId"], ctx.get("factionId"), ctx.get("detachmentId"))] = ctx
+    if not by_scope:
+        return 0
+
+    update_columns = [c for c in COMPETITIVE_CONTEXT_COLUMNS if any(c in ctx for ctx in by_scope.values())]
+    rows = [
+        (datasheet_id, faction_id, detachment_id) + tuple(
+            ctx.get(c, 0 if c == 'sourceCount' else None) for c in COMPETITIVE_CONTEXT_COLUMNS
+        )
+        for (datasheet_id, faction_id, detachment_id), ctx in by_scope.items()
+    ]
+    columns = ", ".join(f'"{c}"' for c in COMPETITIVE_CONTEXT_COLUMNS)
+    set_clauses = ", ".join(
+        ['"updatedAt" = NOW()', '"lastAggregated" = NOW()'] + [f'"{c}" = EXCLUDED."{c}"' for c in update_columns]
+    )
+    placeholders = ", ".join(["%s"] * (3 + len(COMPETITIVE_CONTEXT_COLUMNS)))
+
+    with db_transaction() as conn, conn.cursor() as cur:
+        written = execute_values(cur, f"""
+            INSERT INTO "DatasheetCompetitiveContext" (
+                id, "datasheetId", "factionId", "detachmentId", {columns},
+                "lastAggregated", "createdAt", "updatedAt"
+            )
+            VALUES %s
+            ON CONFLICT ("datasheetId", COALESCE("factionId", ''), COALESCE("detachmentId", ''))
+            DO UPDATE SET {set_clauses}
+            RETURNING 1
+        """, rows,
+            template=f"(gen_random_uuid(), {placeholders}, NOW(), NOW(), NOW())",
+            page_size=DB_BULK_PAGE_SIZE,
+            fetch=True
+        )
+        return len(written)
 
 def db_upsert_datasheet_competitive_context(
     datasheet_id: str,
@@ -336,81 +855,82 @@ def db_upsert_datasheet_competitive_context(
     detachment_id: str = None,
     **context_data
 ):
-    """Upsert aggregated competitive context for a datasheet"""
-    conn = get_db_connection()
-    with conn.cursor() as cur:
-        # Check if exists
+    """Upsert aggregated competitive context for a datasheet (one statement)"""
+    context = {k: v for k, v in context_data.items() if k in COMPETITIVE_CONTEXT_COLUMNS}
+    db_upsert_datasheet_competitive_contexts([
+        {"datasheetId": datasheet_id, "factionId": faction_id, "detachmentId": detachment_id, **context}
+    ])
+
+def db_get_source_fingerprints(datasheet_ids: list) -> dict:
+    """
+    Fingerprint of the extracted DatasheetSources behind each datasheet
+    (ids + extractedAt + isOutdated), to detect new evidence since the last aggregation.
+    """
+    if not datasheet_ids:
+        return {}
+    with db_connection() as conn, conn.cursor() as cur:
+        cur.execute("""
+            SELECT
+                ds."datasheetId",
+                COUNT(*) AS n,
+                md5(STRING_AGG(
+                    ds.id || ':' || COALESCE(ds."extractedAt"::text, '') || ':' || ds."isOutdated"::text,
+                    ',' ORDER BY ds.id
+                )) AS digest
+            FROM "DatasheetSource" ds
+            WHERE ds."datasheetId" = ANY(%s)
+              AND ds.status = 'extracted'
+            GROUP BY ds."datasheetId"
+        """, (list(datasheet_ids),))
+        return {
+            row["datasheetId"]: f"{AGGREGATION_FINGERPRINT_VERSION}:{row['n']}:{row['digest']}"
+            for row in cur.fetchall()
+        }
+
+def db_get_context_fingerprints(datasheet_ids: list, faction_id: str = None, detachment_id: str = None) -> dict:
+    """Source fingerprint stored with each datasheet's aggregated context in this scope"""
+    if not datasheet_ids:
+        return {}
+    with db_connection() as conn, conn.cursor() as cur:
         cur.execute("""
-            SELECT id FROM "DatasheetCompetitiveContext"
-            WHERE "datasheetId" = %s
+            SELECT "datasheetId", "sourceFingerprint"
+            FROM "DatasheetCompetitiveContext"
+            WHERE "datasheetId" = ANY(%s)
               AND ("factionId" IS NOT DISTINCT FROM %s)
               AND ("detachmentId" IS NOT DISTINCT FROM %s)
-        """, (datasheet_id, faction_id, detachment_id))
-        existing = cur.fetchone()
-
-        if existing:
-            # Update
-            set_clauses = ['"updatedAt" = NOW()', '"lastAggregated" = NOW()']
-            values = []
-
-            for key, value in context_data.items():
-                if key in ['competitiveTier', 'tierReasoning', 'bestTargets', 'counters',
-                           'synergies', 'playstyleNotes', 'deploymentTips', 'competitiveNotes',
-                           'sourceCount', 'conflicts']:
-                    col = f'"{key}"'
-                    set_clauses.append(f'{col} = %s')
-                    values.append(value)
-
-            values.append(existing['id'])
-            cur.execute(
-                f'UPDATE "DatasheetCompetitiveContext" SET {", ".join(set_clauses)} WHERE id = %s',
-                values
-            )
-        else:
-            # Insert
-            cur.execute("""
-                INSERT INTO "DatasheetCompetitiveContext" (
-                    id, "datasheetId", "factionId", "detachmentId",
-                    "competitiveTier", "tierReasoning", "bestTargets", "counters",
-                    "synergies", "playstyleNotes", "deploymentTips", "competitiveNotes",
-                    "sourceCount", "conflicts", "lastAggregated", "createdAt", "updatedAt"
-                )
-                VALUES (
-                    gen_random_uuid(), %s, %s, %s,
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW(), NOW()
-                )
-            """, (
-                datasheet_id, faction_id, detachment_id,
-                context_data.get('competitiveTier'),
-                context_data.get('tierReasoning'),
-                context_data.get('bestTargets'),
-                context_data.get('counters'),
-                context_data.get('synergies'),
-                context_data.get('playstyleNotes'),
-                context_data.get('deploymentTips'),
-                context_data.get('competitiveNotes'),
-                context_data.get('sourceCount', 0),
-                context_data.get('conflicts'),
-            ))
+        """, (list(datasheet_ids), faction_id, detachment_id))
+        return {row["datasheetId"]: row["sourceFingerprint"] for row in cur.fetchall()}
+
+def db_get_scope_fingerprints(datasheet_ids: list) -> dict:
+    """Stored source fingerprint of every aggregated scope: {(datasheetId, factionId, detachmentId): fingerprint}"""
+    if not datasheet_ids:
+        return {}
+    with db_connection() as conn, conn.cursor() as cur:
+        cur.execute("""
+            SELECT "datasheetId", "factionId", "detachmentId", "sourceFingerprint"
+            FROM "DatasheetCompetitiveContext"
+            WHERE "datasheetId" = ANY(%s)
+        """, (list(datasheet_ids),))
+        return {
+            (row["datasheetId"], row["factionId"], row["detachmentId"]): row["sourceFingerprint"]
+            for row in cur.fetchall()
+        }
 
 def db_get_all_factions() -> list:
     """Get all factions"""
-    conn = get_db_connection()
-    with conn.cursor() as cur:
+    with db_connection() as conn, conn.cursor() as cur:
         cur.execute('SELECT id, name FROM "Faction" ORDER BY name')
         return cur.fetchall()
 
 def db_get_faction_by_name(name: str) -> dict:
     """Get faction by name"""
-    conn = get_db_connection()
-    with conn.cursor() as cur:
+    with db_connection() as conn, conn.cursor() as cur:
         cur.execute('SELECT id, name FROM "Faction" WHERE LOWER(name) = LOWER(%s)', (name,))
         return cur.fetchone()
 
 def db_get_datasheets_with_sources(faction_id: str) -> list:
     """Get datasheets that have extracted sources for aggregation"""
-    conn = get_db_connection()
-    with conn.cursor() as cur:
+    with db_connection() as conn, conn.cursor() as cur:
         cur.execute("""
             SELECT DISTINCT d.id, d.name, d.faction
             FROM "Datasheet" d
@@ -1281,122 +1801,948 @@ def save_manifest(manifest: dict[str, Any]) -> None:
 
 
 # ============================================
-# UNIT CONTEXT EXTRACTION (Gemini AI)
+# FACTION DATASHEET CATALOG CACHE
 # ============================================
 
-# JSON Schema for unit-specific competitive context extraction
-UNIT_CONTEXT_SCHEMA = {
-    "type": "object",
-    "properties": {
-        "found": {
-            "type": "boolean",
-            "description": "Whether the unit was mentioned in the transcript"
-        },
-        "tierRank": {
-            "type": "string",
-            "enum": ["S", "A", "B", "C", "D", "F"],
-            "description": "Tier ranking if mentioned or implied"
-        },
-        "tierReasoning": {
-            "type": "string",
-            "description": "Why this tier was assigned based on the transcript"
-        },
-        "bestTargets": {
-            "type": "array",
-            "items": {"type": "string"},
-            "description": "What this unit is best against"
-        },
-        "counters": {
-            "type": "array",
-            "items": {"type": "string"},
-            "description": "What counters or threatens this unit"
-        },
-        "synergies": {
-            "type": "array",
-            "items": {
-                "type": "object",
-                "properties": {
-                    "unit": {"type": "string", "description": "Name of the synergistic unit, character, ability, or detachment rule"},
-                    "why": {"type": "string", "description": "Explanation of why this synergy works and how to leverage it"}
-                },
-                "required": ["unit", "why"]
-            },
-            "description": "Units, characters, or abilities that synergize well with explanations"
-        },
-        "playstyleNotes": {
-            "type": "string",
-            "description": "How to play this unit effectively"
-        },
-        "deploymentTips": {
-            "type": "string",
-            "description": "Deployment and positioning advice"
-        },
-        "detachmentNotes": {
-            "type": "string",
-            "description": "Notes about how this unit works in specific detachments"
-        },
-        "equipmentRecommendations": {
-            "type": "string",
-            "description": "Recommended loadouts or equipment choices"
-        },
-        "pointsEfficiency": {
-            "type": "string",
-            "description": "Notes on points cost and value"
-        },
-        "additionalNotes": {
-            "type": "string",
-            "description": "Any other relevant competitive insights"
-        },
-        "confidence": {
-            "type": "integer",
-            "minimum": 0,
-            "maximum": 100,
-            "description": "Confidence in the extracted data (0-100)"
-        }
-    },
-    "required": ["found", "confidence"]
-}
+# Datasheets, keywords, aliases and the pre-rendered curation prompt block per faction.
+# Persisted between runs and invalidated when the faction's datasheet fingerprint
+# (enabled ids + "lastUpdated") changes.
+CATALOG_CACHE_FILE = OUTPUT_DIR / "_catalog_cache.json"
+CATALOG_CACHE_FORMAT = 1
+CATALOG_REVALIDATE_SECONDS = 300  # How long an in-memory entry is trusted without re-checking the DB
 
+# Trailing words that creators usually drop when talking about a unit ("Intercessor Squad" -> "Intercessors")
+ALIAS_DROP_SUFFIXES = ("squad", "team", "unit")
 
-def build_unit_context_system_prompt() -> str:
-    """Build system prompt for unit context extraction."""
-    return """You are an expert Warhammer 40,000 competitive analyst. Extract competitive insights about a SPECIFIC unit from the provided content (video transcript, Reddit post, article, or forum discussion).
+_catalog_memory: dict[str, dict[str, Any]] = {}
+_catalog_checked_at: dict[str, float] = {}  # faction_id -> last fingerprint check (not persisted)
+_catalog_disk: Optional[dict[str, Any]] = None
+_catalog_lock = threading.Lock()  # Curation and extraction threads look up catalogs concurrently (--process-all)
 
-HANDLING VARIOUS CONTENT TYPES:
-1. The text may be a messy auto-transcript with heavy repetition (words or sentences repeated multiple times). Look past the repetition to find the actual content.
-2. The unit name may be phonetically misspelled (e.g., "Infernus" as "Infernace", "Vulkan He'stan" as "Vulcan Histan"). Use your knowledge of Warhammer 40k to identify the intended unit.
-3. Only extract information that is clearly about the target unit.
-4. The content may cover multiple units - focus ONLY on the requested unit.
-5. For Reddit/forum content, consider both the original post AND the comments/replies.
-6. For articles, focus on the author's main points and conclusions.
 
-IMPORTANT:
-1. If the unit is discussed in any meaningful way, set "found" to true.
-2. If the unit is absolutely not mentioned or only mentioned in passing without useful info, set "found" to false.
-3. Be specific with tactical advice - include actual numbers, ranges, and game mechanics when mentioned.
-4. Include detachment-specific interactions if discussed.
+def parse_datasheet_keywords(raw: Any) -> list:
+    """Parse the Datasheet.keywords JSON array (tolerates plain comma-separated strings)."""
+    if not raw:
+        return []
+    if isinstance(raw, list):
+        return [str(k) for k in raw]
+    try:
+        parsed = json.loads(raw)
+        if isinstance(parsed, list):
+            return [str(k) for k in parsed]
+    except (TypeError, json.JSONDecodeError):
+        pass
+    return [k.strip() for k in str(raw).split(",") if k.strip()]
 
-TIER RANKINGS (assign based on how the content discusses the unit):
-- S = Meta-defining, auto-include, extremely enthusiastic recommendation
-- A = Very strong, competitive staple, highly recommended  
-- B = Solid, viable choice, good in the right list
-- C = Situational, has niche uses, requires specific builds
-- D = Below average, rarely recommended
-- F = Avoid, advised against taking
 
-Extract quotes and specific advice from the content. If the unit isn't meaningfully discussed, return { "found": false, "confidence": 100 }."""
+def derive_unit_aliases(name: str) -> list:
+    """
+    Derive the spoken/written variants of a datasheet name.
+    e.g. "Vulkan He'stan" -> ["Vulkan Hestan"], "Intercessor Squad" -> ["Intercessor", "Intercessors"]
+    """
+    aliases: list[str] = []
+
+    def add(alias: str) -> None:
+        alias = re.sub(r"\s+", " ", alias).strip(" -")
+        if alias and alias.lower() != name.lower() and alias.lower() not in (a.lower() for a in aliases):
+            aliases.append(alias)
+
+    base = re.sub(r"\s*\(.*?\)\s*", " ", name).strip()
+    add(base)
+
+    # Drop loadout/armour qualifiers ("Captain In Terminator Armour", "Chaplain With Jump Pack")
+    qualifier = re.split(r"\s+(?:with|in|on)\s+", base, maxsplit=1, flags=re.IGNORECASE)
+    if len(qualifier) == 2 and qualifier[0]:
+        add(qualifier[0])
+
+    # Punctuation variants ("He'stan" -> "Hestan", "Fell-handed" -> "Fell handed")
+    add(base.replace("'", "").replace("’", ""))
+    add(base.replace("-", " "))
+
+    words = base.split()
+    if len(words) > 1 and words[-1].lower() in ALIAS_DROP_SUFFIXES:
+        stem = " ".join(words[:-1])
+        add(stem)
+        if not stem.lower().endswith("s"):
+            add(stem + "s")
+
+    return aliases
+
+
+def build_catalog_prompt_block(datasheets: list) -> str:
+    """Render the datasheet list used by the curation prompt (includes keywords for matching)."""
+    return "\n".join([
+        f"- {d['name']} (ID: {d['id']}) [Keywords: {d.get('keywords', '')}]"
+        for d in datasheets
+    ])
+
+
+def build_faction_catalog(faction_id: str, datasheets: list, fingerprint: str) -> dict[str, Any]:
+    """Build a catalog entry from raw Datasheet rows."""
+    entries = []
+    for d in datasheets:
+        entries.append({
+            "id": d["id"],
+            "name": d["name"],
+            "faction": d.get("faction"),
+            "role": d.get("role"),
+            "keywords": d.get("keywords", ""),
+            "keywordList": parse_datasheet_keywords(d.get("keywords")),
+            "aliases": derive_unit_aliases(d["name"]),
+        })
+    return {
+        "factionId": faction_id,
+        "fingerprint": fingerprint,
+        "builtAt": datetime.now().isoformat(),
+        "datasheets": entries,
+        "promptBlock": build_catalog_prompt_block(entries),
+    }
 
 
-def build_unit_context_user_prompt(transcript: str, unit_name: str, faction: Optional[str] = None) -> str:
-    """Build user prompt for unit context extraction."""
-    faction_str = f" ({faction})" if faction else ""
-    return f"""Extract competitive insights about "{unit_name}"{faction_str} from this content:
+def _load_catalog_disk() -> dict[str, Any]:
+    """Load the on-disk catalog cache (once per process)."""
+    global _catalog_disk
+    if _catalog_disk is None:
+        _catalog_disk = {"format": CATALOG_CACHE_FORMAT, "factions": {}}
+        if CATALOG_CACHE_FILE.exists():
+            try:
+                data = json.loads(CATALOG_CACHE_FILE.read_text(encoding="utf-8"))
+                if data.get("format") == CATALOG_CACHE_FORMAT:
+                    _catalog_disk = data
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"   ⚠️ Ignoring unreadable catalog cache: {e}")
+    return _catalog_disk
+
+
+def _save_catalog_disk() -> None:
+    """Persist the catalog cache (best effort - a failed write only costs a rebuild next run)."""
+    if _catalog_disk is None:
+        return
+    try:
+        CATALOG_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = CATALOG_CACHE_FILE.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(_catalog_disk, ensure_ascii=False), encoding="utf-8")
+        tmp_path.replace(CATALOG_CACHE_FILE)
+    except OSError as e:
+        print(f"   ⚠️ Could not save catalog cache: {e}")
 
----
-{transcript}
+
+def get_faction_catalog(faction_id: str) -> dict[str, Any]:
+    """
+    Get the datasheet catalog for a faction.
+
+    Lookup order: in-memory (trusted for CATALOG_REVALIDATE_SECONDS) → disk → database.
+    Disk and stale memory entries are only reused if the faction's datasheet
+    fingerprint still matches, so edits to datasheets are picked up automatically.
+    Thread-safe: lookups, rebuilds and cache writes are serialized.
+    """
+    with _catalog_lock:
+        now = time.time()
+        entry = _catalog_memory.get(faction_id)
+        if entry and now - _catalog_checked_at.get(faction_id, 0) < CATALOG_REVALIDATE_SECONDS:
+            return entry
+
+        fingerprint = db_get_faction_datasheet_fingerprint(faction_id)
+
+        if not entry or entry.get("fingerprint") != fingerprint:
+            entry = _load_catalog_disk()["factions"].get(faction_id)
+
+        if not entry or entry.get("fingerprint") != fingerprint:
+            datasheets = db_get_faction_datasheets(faction_id)
+            entry = build_faction_catalog(faction_id, datasheets, fingerprint)
+            _load_catalog_disk()["factions"][faction_id] = entry
+            _save_catalog_disk()
+
+        _catalog_checked_at[faction_id] = now
+        _catalog_memory[faction_id] = entry
+        return entry
+
+
+# ============================================
+# TOKEN BUDGETING
+# ============================================
+
+# Model limits (gemini-3-flash) and the budget we actually want to send per call -
+# calls near the input limit are slow and the most likely to truncate
+GEMINI_MAX_INPUT_TOKENS = 1_048_576
+GEMINI_MAX_OUTPUT_TOKENS = 65536
+PROMPT_TOKEN_BUDGET = int(os.getenv("GEMINI_PROMPT_TOKEN_BUDGET", "250000"))
+THINKING_TOKEN_ALLOWANCE = 8192  # Thinking tokens count against maxOutputTokens
+OUTPUT_TOKEN_HEADROOM = 2.0  # Output limit = allowance + expected output x headroom
+
+_WORD_TOKEN_RE = re.compile(r"[A-Za-z]+")
+_SYMBOL_TOKEN_RE = re.compile(r"[^\sA-Za-z]")
+
+# actual / estimated prompt tokens, refined from usageMetadata
+_token_calibration = 1.0
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Fast local token estimate: words count ~1 token per 5 letters, digits and
+    punctuation 1 each. Scaled by the calibration learned from real usage.
+    """
+    if not text:
+        return 0
+    words = sum((len(w) + 4) // 5 for w in _WORD_TOKEN_RE.findall(text))
+    symbols = len(_SYMBOL_TOKEN_RE.findall(text))
+    return int((words + symbols) * _token_calibration)
+
+
+def estimate_payload_tokens(payload: dict[str, Any]) -> int:
+    """Estimated prompt tokens of a generateContent payload (excluding any cachedContent)."""
+    total = 0
+    for content in [payload.get("systemInstruction") or {}] + list(payload.get("contents") or []):
+        for part in content.get("parts", []):
+            total += estimate_tokens(part.get("text", ""))
+    schema = (payload.get("generationConfig") or {}).get("responseSchema")
+    if schema:
+        total += estimate_tokens(json.dumps(schema))
+    return total
+
+
+def plan_output_tokens(expected_output_tokens: int) -> int:
+    """maxOutputTokens for a call expected to produce about this many tokens."""
+    planned = THINKING_TOKEN_ALLOWANCE + int(expected_output_tokens * OUTPUT_TOKEN_HEADROOM)
+    planned = -(-planned // 1024) * 1024  # Round up to 1K
+    return max(4096, min(GEMINI_MAX_OUTPUT_TOKENS, planned))
+
+
+def record_token_usage(payload: dict[str, Any], usage: dict[str, Any], finish_reason: Optional[str]) -> None:
+    """Log estimated vs actual usage and refine the estimator's calibration."""
+    global _token_calibration
+    estimated = estimate_payload_tokens(payload)
+    prompt_tokens = usage.get("promptTokenCount", 0)
+    cached_tokens = usage.get("cachedContentTokenCount", 0)
+    output_tokens = usage.get("candidatesTokenCount", 0) + usage.get("thoughtsTokenCount", 0)
+    output_limit = (payload.get("generationConfig") or {}).get("maxOutputTokens", GEMINI_MAX_OUTPUT_TOKENS)
+
+    uncached = prompt_tokens - cached_tokens
+    if estimated > 500 and uncached > 0:
+        ratio = uncached / (estimated / _token_calibration)
+        _token_calibration = max(0.5, min(2.0, 0.8 * _token_calibration + 0.2 * ratio))
+
+    cached_note = f" (+{cached_tokens:,} cached)" if cached_tokens else ""
+    print(f"   📏 Tokens: prompt ~{estimated:,} est / {uncached:,} actual{cached_note}, "
+          f"output {output_tokens:,}/{output_limit:,}{' ⚠️ MAX_TOKENS' if finish_reason == 'MAX_TOKENS' else ''}")
+
+
+def split_text_to_budget(text: str, max_tokens: int, overlap_chars: int = 1000) -> list:
+    """Split text into chunks of at most ~max_tokens (on whitespace, with a small overlap)."""
+    total = estimate_tokens(text)
+    if total <= max_tokens:
+        return [text]
+    chunk_chars = max(2000, int(len(text) * max_tokens / total))
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + chunk_chars)
+        if end < len(text):
+            ws = text.rfind(" ", start + chunk_chars // 2, end)
+            end = ws if ws > 0 else end
+        chunks.append(text[start:end])
+        if end >= len(text):
+            break
+        start = max(start + 1, end - overlap_chars)
+    return chunks
+
+
+def fit_text_to_budget(text: str, max_tokens: int, label: str = "content") -> str:
+    """
+    Make text fit max_tokens: compact first (see compact_transcript), then keep
+    the head and tail (dropping the middle with a marker) as a last resort.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    compacted, _ = compact_transcript(text)
+    if estimate_tokens(compacted) <= max_tokens:
+        print(f"   🗜️ Compacted {label}: {len(text):,} -> {len(compacted):,} chars")
+        return compacted
+    keep_chars = int(len(compacted) * max_tokens / max(1, estimate_tokens(compacted)))
+    head = compacted[:keep_chars // 2]
+    tail = compacted[-(keep_chars // 2):]
+    omitted = len(compacted) - len(head) - len(tail)
+    print(f"   ✂️ {label.capitalize()} over budget: omitted {omitted:,} chars from the middle")
+    return f"{head}\n[... {omitted:,} characters omitted to fit the prompt budget ...]\n{tail}"
+
+
+# ============================================
+# ADAPTIVE CONCURRENCY (AIMD)
+# ============================================
+
+GEMINI_THROTTLE_STATUSES = (429, 503)
+GEMINI_THROTTLE_RETRIES = 5
+GEMINI_THROTTLE_MAX_WAIT = 60  # Seconds
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    In-flight limit for Gemini calls that adapts to the API's rate limits:
+    grows additively (about +1 per window of successful calls) and is halved
+    when the API answers 429/503. One cut per cooldown, so a burst of throttled
+    responses from the same window only halves the limit once.
+    """
+
+    def __init__(self, max_limit: int, initial: Optional[int] = None, cooldown: float = 2.0):
+        self.max_limit = max(1, max_limit)
+        self.limit = float(min(self.max_limit, initial or self.max_limit))
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.successes = 0
+        self.throttles = 0
+        self._last_cut = 0.0
+        self._cond = threading.Condition()
+
+    def try_acquire(self) -> bool:
+        with self._cond:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def release(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def reacquire(self) -> None:
+        """Give up the caller's slot and wait for a new one under the (possibly lowered) limit."""
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def on_success(self) -> None:
+        with self._cond:
+            self.successes += 1
+            # Hold the limit for a cooldown after a cut (calls started before it still report back)
+            if time.time() - self._last_cut >= self.cooldown:
+                self.limit = min(float(self.max_limit), self.limit + 1.0 / max(1.0, self.limit))
+            self._cond.notify_all()
+
+    def on_throttle(self) -> None:
+        with self._cond:
+            self.throttles += 1
+            now = time.time()
+            if now - self._last_cut >= self.cooldown:
+                self._last_cut = now
+                self.limit = max(1.0, self.limit / 2)
+                print(f"   🐢 Gemini throttled - concurrency limit now {int(self.limit)}")
+
+
+# Limiter of the running concurrent extraction (gemini_generate reports throttling to it)
+_gemini_limiter: Optional[AdaptiveConcurrencyLimiter] = None
+# Set on pool worker threads while they hold a limiter slot (other threads, e.g. the
+# --process-all curate stage, call Gemini outside the pool and have no slot to give up)
+_gemini_slot = threading.local()
+
+
+def run_adaptive_pool(jobs, run_job, handle_result, max_concurrency: int) -> None:
+    """
+    Run jobs on a thread pool under an AdaptiveConcurrencyLimiter.
+
+    jobs is an iterator consumed lazily on the calling thread; run_job(job) runs
+    on a worker thread (db_* functions are safe there - pooled connections);
+    handle_result(job, result, error) is called on the calling thread as each job
+    completes, so results are written back as they arrive. With max_concurrency=1
+    jobs simply run one after another on the calling thread.
+    """
+    global _gemini_limiter
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    if max_concurrency <= 1:
+        for job in jobs:
+            try:
+                result = run_job(job)
+            except Exception as e:
+                handle_result(job, None, e)
+            else:
+                handle_result(job, result, None)
+        return
+
+    limiter = AdaptiveConcurrencyLimiter(max_concurrency)
+    _gemini_limiter = limiter
+
+    def worker(job):
+        _gemini_slot.limiter = limiter
+        try:
+            return run_job(job)
+        finally:
+            _gemini_slot.limiter = None
+            limiter.release()
+
+    jobs = iter(jobs)
+    exhausted = False
+    futures = {}
+    try:
+        with ThreadPoolExecutor(max_workers=limiter.max_limit) as pool:
+            while True:
+                while not exhausted and limiter.try_acquire():
+                    try:
+                        job = next(jobs)
+                    except StopIteration:
+                        limiter.release()
+                        exhausted = True
+                        break
+                    futures[pool.submit(worker, job)] = job
+                if not futures:
+                    break
+                done, _ = wait(list(futures), timeout=5, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = futures.pop(future)
+                    try:
+                        handle_result(job, future.result(), None)
+                    except Exception as e:
+                        handle_result(job, None, e)
+    finally:
+        _gemini_limiter = None
+
+    print(f"   ⚙️ Concurrency: final limit {int(limiter.limit)}/{limiter.max_limit}, "
+          f"{limiter.throttles} throttled response(s)")
+
+
+# ============================================
+# GEMINI RESPONSE CACHE
+# ============================================
+
+# Completed generateContent responses keyed by the full request (model, system
+# prompt, prompt, schema, temperature), so re-running a step after a crash or a
+# DB restore doesn't pay for identical calls again.
+LLM_CACHE_ENABLED = True
+LLM_CACHE_FILE = OUTPUT_DIR / "_llm_cache.sqlite"
+LLM_CACHE_MAX_AGE_DAYS = 30
+LLM_CACHE_MAX_BYTES = 512 * 1024 * 1024
+LLM_CACHE_EVICT_EVERY = 50  # Size check after this many writes
+
+_llm_cache_conn: Optional[sqlite3.Connection] = None
+_llm_cache_lock = threading.RLock()
+_llm_cache_stats = {"hits": 0, "misses": 0, "writes": 0}
+_context_content_keys: dict[str, str] = {}  # cachedContent name -> content hash
+
+
+class CachedGeminiResponse:
+    """Stand-in for requests.Response when a generateContent result comes from the cache."""
+
+    status_code = 200
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+
+def _llm_cache() -> Optional[sqlite3.Connection]:
+    """Open (once) the response cache and drop expired entries. None if disabled/unavailable."""
+    global _llm_cache_conn, LLM_CACHE_ENABLED
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _llm_cache_lock:
+        if _llm_cache_conn is None:
+            try:
+                LLM_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(str(LLM_CACHE_FILE), timeout=30, check_same_thread=False)
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS responses (
+                        key TEXT PRIMARY KEY,
+                        model TEXT NOT NULL,
+                        response TEXT NOT NULL,
+                        bytes INTEGER NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_used_at REAL NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used_at)")
+                conn.execute(
+                    "DELETE FROM responses WHERE created_at < ?",
+                    (time.time() - LLM_CACHE_MAX_AGE_DAYS * 86400,)
+                )
+                conn.commit()
+                _llm_cache_conn = conn
+            except sqlite3.Error as e:
+                print(f"⚠️ LLM response cache unavailable ({e})")
+                LLM_CACHE_ENABLED = False
+                return None
+    return _llm_cache_conn
+
+
+def _evict_llm_cache(conn: sqlite3.Connection) -> None:
+    """Drop least-recently-used entries until the cache fits in LLM_CACHE_MAX_BYTES."""
+    total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM responses").fetchone()[0]
+    if total <= LLM_CACHE_MAX_BYTES:
+        return
+    freed = 0
+    stale = []
+    for key, size in conn.execute("SELECT key, bytes FROM responses ORDER BY last_used_at"):
+        stale.append((key,))
+        freed += size
+        if total - freed <= LLM_CACHE_MAX_BYTES * 0.9:
+            break
+    conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+
+def llm_cache_key(payload: dict[str, Any]) -> str:
+    """Stable hash of a generateContent request."""
+    keyed = dict(payload)
+    cached_name = keyed.pop("cachedContent", None)
+    if cached_name:
+        # Cache names change between runs - key on the cached content itself
+        keyed["cachedContentKey"] = _context_content_keys.get(cached_name, cached_name)
+    canonical = json.dumps({"model": GEMINI_MODEL, "request": keyed}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _is_cacheable_response(response: requests.Response) -> bool:
+    """Only keep complete answers - errors and truncated output are retried next time."""
+    if response.status_code != 200:
+        return False
+    try:
+        candidates = response.json().get("candidates") or []
+    except ValueError:
+        return False
+    return bool(candidates) and candidates[0].get("finishReason") in (None, "STOP")
+
+
+def format_llm_cache_stats() -> str:
+    stats = _llm_cache_stats
+    total = stats["hits"] + stats["misses"]
+    rate = f"{stats['hits'] / total:.0%}" if total else "n/a"
+    return f"{stats['hits']} hit(s), {stats['misses']} miss(es), {stats['writes']} stored (hit rate {rate})"
+
+
+def print_llm_cache_stats() -> None:
+    if _llm_cache_stats["hits"] or _llm_cache_stats["misses"]:
+        print(f"\n♻️ Gemini response cache: {format_llm_cache_stats()}")
+
+
+def _post_generate(payload: dict[str, Any], api_key: str, timeout: int) -> requests.Response:
+    """POST generateContent, backing off (and reporting to the concurrency limiter) on 429/503."""
+    url = f"{GEMINI_API_BASE}/models/{GEMINI_MODEL}:generateContent?key={api_key}"
+    limiter = _gemini_limiter  # Read once: the pool clears it when it finishes
+    held_slot = getattr(_gemini_slot, "limiter", None)
+    for attempt in range(GEMINI_THROTTLE_RETRIES + 1):
+        response = requests_with_retry(
+            "POST", url,
+            headers={"Content-Type": "application/json"},
+            json=payload,
+            timeout=timeout  # 10 min timeout with retries
+        )
+        if response.status_code not in GEMINI_THROTTLE_STATUSES:
+            if limiter and response.status_code == 200:
+                limiter.on_success()
+            break
+        if limiter:
+            limiter.on_throttle()
+        if attempt == GEMINI_THROTTLE_RETRIES:
+            break
+        retry_after = response.headers.get("Retry-After", "") if response.headers else ""
+        wait_time = min(GEMINI_THROTTLE_MAX_WAIT, float(retry_after) if retry_after.isdigit() else 2 ** (attempt + 1))
+        print(f"   ⚠️ Gemini {response.status_code}, retrying in {wait_time:.0f}s... (attempt {attempt + 1}/{GEMINI_THROTTLE_RETRIES})")
+        time.sleep(wait_time)
+        if held_slot:
+            held_slot.reacquire()
+    return response
+
+
+def gemini_generate(payload: dict[str, Any], api_key: str, timeout: int = 600) -> requests.Response:
+    """
+    POST a generateContent request (shared by curation, extraction and aggregation).
+
+    Identical requests are answered from the local response cache
+    (disable with --no-llm-cache). Estimated vs actual token usage is logged,
+    and a call truncated by a budgeted maxOutputTokens is retried once at the
+    model maximum.
+    """
+    conn = _llm_cache()
+    key = llm_cache_key(payload) if conn else None
+
+    if conn:
+        with _llm_cache_lock:
+            row = conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row:
+                conn.execute("UPDATE responses SET last_used_at = ? WHERE key = ?", (time.time(), key))
+                conn.commit()
+                _llm_cache_stats["hits"] += 1
+                print("   ♻️ Gemini response served from cache")
+                return CachedGeminiResponse(row[0])
+            _llm_cache_stats["misses"] += 1
+
+    estimated = estimate_payload_tokens(payload)
+    if estimated > GEMINI_MAX_INPUT_TOKENS:
+        print(f"   ⚠️ Prompt is ~{estimated:,} tokens, above the model limit ({GEMINI_MAX_INPUT_TOKENS:,})")
+    elif estimated > PROMPT_TOKEN_BUDGET:
+        print(f"   ⚠️ Prompt is ~{estimated:,} tokens, above the budget ({PROMPT_TOKEN_BUDGET:,})")
+
+    response = _post_generate(payload, api_key, timeout)
+    try:
+        body = response.json() if response.status_code == 200 else None
+    except ValueError:
+        body = None
+    if body:
+        candidates = body.get("candidates") or []
+        finish_reason = candidates[0].get("finishReason") if candidates else None
+        record_token_usage(payload, body.get("usageMetadata") or {}, finish_reason)
+
+        # A budgeted output limit was too small - retry once at the model maximum
+        output_limit = (payload.get("generationConfig") or {}).get("maxOutputTokens", GEMINI_MAX_OUTPUT_TOKENS)
+        if finish_reason == "MAX_TOKENS" and output_limit < GEMINI_MAX_OUTPUT_TOKENS:
+            print(f"   ↗️ Output hit maxOutputTokens={output_limit:,}, retrying at {GEMINI_MAX_OUTPUT_TOKENS:,}")
+            retry_payload = dict(payload)
+            retry_payload["generationConfig"] = {
+                **payload["generationConfig"], "maxOutputTokens": GEMINI_MAX_OUTPUT_TOKENS
+            }
+            response = _post_generate(retry_payload, api_key, timeout)
+
+    if conn and _is_cacheable_response(response):
+        now = time.time()
+        with _llm_cache_lock:
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, response, bytes, created_at, last_used_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, GEMINI_MODEL, response.text, len(response.text), now, now)
+                )
+                _llm_cache_stats["writes"] += 1
+                if _llm_cache_stats["writes"] % LLM_CACHE_EVICT_EVERY == 0:
+                    _evict_llm_cache(conn)
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"   ⚠️ Could not cache Gemini response: {e}")
+
+    return response
+
+
+# ============================================
+# GEMINI API + SOURCE CONTEXT CACHING
+# ============================================
+
+GEMINI_API_BASE = "https://generativelanguage.googleapis.com/v1beta"
+
+# Context caching: a source's transcript is uploaded once as a Gemini cachedContent
+# and referenced by curation and every unit-level extraction call for that source.
+#   remote = Gemini cachedContents API (default)
+#   local  = in-process stand-in that inlines the cached prefix (for tests / offline runs)
+#   off    = always send the full transcript inline
+CONTEXT_CACHE_MODE = os.getenv("GEMINI_CONTEXT_CACHE", "remote").lower()
+CONTEXT_CACHE_TTL_SECONDS = 3600
+CONTEXT_CACHE_MIN_TOKENS = 4096  # Below the API minimum (and not worth it) - send inline instead
+CONTEXT_CACHE_REGISTRY_FILE = OUTPUT_DIR / "_context_cache.json"
+
+_context_registry: Optional[dict[str, Any]] = None
+_context_registry_lock = threading.Lock()  # Curation and extraction may create contexts concurrently (--process-all)
+_local_context_store: dict[str, dict[str, Any]] = {}
+
+
+def build_source_context_system_prompt() -> str:
+    """System prompt stored with a cached source (task instructions follow per request)."""
+    return """You are an expert Warhammer 40,000 competitive analyst. The first message contains the full text of ONE content source (video transcript, Reddit post, article, or forum discussion).
+
+HANDLING THE CONTENT:
+1. The text may be a messy auto-transcript with heavy repetition. Look past the repetition to find the actual content.
+2. Unit names may be phonetically misspelled (e.g., "Infernus" as "Infernace", "Vulkan He'stan" as "Vulcan Histan"). Use your knowledge of Warhammer 40k to identify the intended unit.
+3. For Reddit/forum content, consider both the original post AND the comments/replies.
+
+Every following message is a separate task about this source. Follow that task's instructions and output format exactly."""
+
+
+def build_source_context_prompt(title: Optional[str], content: str) -> str:
+    """The cached (shared) part of every request about a source."""
+    return f"""CONTENT SOURCE: "{title or 'Unknown'}"
+
+---
+{content}
+---"""
+
+
+def _load_context_registry() -> dict[str, Any]:
+    """Load the registry of live remote caches (lets a later run reuse caches from curation)."""
+    global _context_registry
+    if _context_registry is None:
+        _context_registry = {}
+        if CONTEXT_CACHE_REGISTRY_FILE.exists():
+            try:
+                _context_registry = json.loads(CONTEXT_CACHE_REGISTRY_FILE.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                _context_registry = {}
+        # Drop expired entries
+        now = time.time()
+        _context_registry = {k: v for k, v in _context_registry.items() if v.get("expiresAt", 0) > now}
+    return _context_registry
+
+
+def _save_context_registry() -> None:
+    try:
+        CONTEXT_CACHE_REGISTRY_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with _context_registry_lock:
+            CONTEXT_CACHE_REGISTRY_FILE.write_text(json.dumps(dict(_load_context_registry()), indent=2), encoding="utf-8")
+    except OSError as e:
+        print(f"   ⚠️ Could not save context cache registry: {e}")
+
+
+def get_source_context(
+    api_key: str,
+    source_key: str,
+    title: Optional[str],
+    content: str,
+) -> Optional[dict[str, Any]]:
+    """
+    Get (or create) the cached context for a source.
+
+    Returns a handle to pass to apply_source_context(), or None when caching is
+    disabled, the content is too small to be worth caching, or creation failed -
+    callers then fall back to sending the full transcript inline.
+    """
+    if CONTEXT_CACHE_MODE == "off" or not content:
+        return None
+
+    system_prompt = build_source_context_system_prompt()
+    source_prompt = build_source_context_prompt(title, content)
+    source_tokens = estimate_tokens(system_prompt + source_prompt)
+    if source_tokens < CONTEXT_CACHE_MIN_TOKENS or source_tokens > PROMPT_TOKEN_BUDGET:
+        return None  # Over budget: callers compact or split the content inline
+
+    cache_key = hashlib.sha256(
+        f"{GEMINI_MODEL}\n{source_key}\n{system_prompt}\n{source_prompt}".encode("utf-8")
+    ).hexdigest()
+
+    if CONTEXT_CACHE_MODE == "local":
+        if cache_key not in _local_context_store:
+            _local_context_store[cache_key] = {
+                "name": f"local/{cache_key[:16]}",
+                "mode": "local",
+                "key": cache_key,
+                "sourceKey": source_key,
+                "systemInstruction": {"parts": [{"text": system_prompt}]},
+                "contents": [{"role": "user", "parts": [{"text": source_prompt}]}],
+            }
+        return _local_context_store[cache_key]
+
+    registry = _load_context_registry()
+    entry = registry.get(cache_key)
+    if entry and entry.get("expiresAt", 0) > time.time() + 60:
+        _context_content_keys[entry["name"]] = cache_key
+        return entry
+
+    try:
+        response = requests_with_retry(
+            "POST", f"{GEMINI_API_BASE}/cachedContents?key={api_key}",
+            headers={"Content-Type": "application/json"},
+            json={
+                "model": f"models/{GEMINI_MODEL}",
+                "displayName": f"source-{source_key}"[:128],
+                "systemInstruction": {"parts": [{"text": system_prompt}]},
+                "contents": [{"role": "user", "parts": [{"text": source_prompt}]}],
+                "ttl": f"{CONTEXT_CACHE_TTL_SECONDS}s",
+            },
+            timeout=300
+        )
+        if response.status_code != 200:
+            print(f"   ⚠️ Context cache unavailable ({response.status_code}), sending content inline")
+            return None
+        name = response.json().get("name")
+        if not name:
+            return None
+    except Exception as e:
+        print(f"   ⚠️ Context cache creation failed ({e}), sending content inline")
+        return None
+
+    _context_content_keys[name] = cache_key
+    entry = {
+        "name": name,
+        "mode": "remote",
+        "key": cache_key,
+        "sourceKey": source_key,
+        "expiresAt": time.time() + CONTEXT_CACHE_TTL_SECONDS,
+    }
+    registry[cache_key] = entry
+    _save_context_registry()
+    print(f"   🗄️ Cached source context ({name})")
+    return entry
+
+
+def apply_source_context(payload: dict[str, Any], handle: Optional[dict[str, Any]]) -> dict[str, Any]:
+    """Return a copy of a generateContent payload that references the cached source prefix."""
+    if not handle:
+        return payload
+    payload = dict(payload)
+    if handle.get("mode") == "local":
+        # Stand-in: inline exactly what the remote cache would have provided
+        payload["systemInstruction"] = handle["systemInstruction"]
+        payload["contents"] = list(handle["contents"]) + list(payload.get("contents", []))
+    else:
+        # System instruction lives in the cache - the API rejects it on the request
+        payload.pop("systemInstruction", None)
+        payload["cachedContent"] = handle["name"]
+    return payload
+
+
+def release_source_context(api_key: str, handle: Optional[dict[str, Any]]) -> None:
+    """Delete a cached source context once all units for the source are extracted."""
+    if not handle:
+        return
+    if handle.get("mode") == "local":
+        _local_context_store.pop(handle.get("key"), None)
+        return
+    registry = _load_context_registry()
+    registry.pop(handle.get("key"), None)
+    _save_context_registry()
+    try:
+        requests_with_retry("DELETE", f"{GEMINI_API_BASE}/{handle['name']}?key={api_key}", timeout=30)
+    except Exception:
+        pass  # Expires on its own after CONTEXT_CACHE_TTL_SECONDS
+
+
+def release_source_contexts(api_key: str, source_keys) -> int:
+    """
+    Delete every cached context created for these sources - by curation or by
+    extraction, in this run or an earlier one. Returns the number released.
+    """
+    source_keys = set(source_keys)
+    if not source_keys:
+        return 0
+    handles = [h for h in list(_local_context_store.values()) if h.get("sourceKey") in source_keys]
+    if CONTEXT_CACHE_MODE != "local":
+        handles += [h for h in list(_load_context_registry().values()) if h.get("sourceKey") in source_keys]
+    for handle in handles:
+        release_source_context(api_key, handle)
+    return len(handles)
+
+
+# ============================================
+# UNIT CONTEXT EXTRACTION (Gemini AI)
+# ============================================
+
+# JSON Schema for unit-specific competitive context extraction
+UNIT_CONTEXT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "found": {
+            "type": "boolean",
+            "description": "Whether the unit was mentioned in the transcript"
+        },
+        "tierRank": {
+            "type": "string",
+            "enum": ["S", "A", "B", "C", "D", "F"],
+            "description": "Tier ranking if mentioned or implied"
+        },
+        "tierReasoning": {
+            "type": "string",
+            "description": "Why this tier was assigned based on the transcript"
+        },
+        "bestTargets": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "What this unit is best against"
+        },
+        "counters": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "What counters or threatens this unit"
+        },
+        "synergies": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "unit": {"type": "string", "description": "Name of the synergistic unit, character, ability, or detachment rule"},
+                    "why": {"type": "string", "description": "Explanation of why this synergy works and how to leverage it"}
+                },
+                "required": ["unit", "why"]
+            },
+            "description": "Units, characters, or abilities that synergize well with explanations"
+        },
+        "playstyleNotes": {
+            "type": "string",
+            "description": "How to play this unit effectively"
+        },
+        "deploymentTips": {
+            "type": "string",
+            "description": "Deployment and positioning advice"
+        },
+        "detachmentNotes": {
+            "type": "string",
+            "description": "Notes about how this unit works in specific detachments"
+        },
+        "equipmentRecommendations": {
+            "type": "string",
+            "description": "Recommended loadouts or equipment choices"
+        },
+        "pointsEfficiency": {
+            "type": "string",
+            "description": "Notes on points cost and value"
+        },
+        "additionalNotes": {
+            "type": "string",
+            "description": "Any other relevant competitive insights"
+        },
+        "confidence": {
+            "type": "integer",
+            "minimum": 0,
+            "maximum": 100,
+            "description": "Confidence in the extracted data (0-100)"
+        }
+    },
+    "required": ["found", "confidence"]
+}
+
+
+def build_unit_context_system_prompt() -> str:
+    """Build system prompt for unit context extraction."""
+    return """You are an expert Warhammer 40,000 competitive analyst. Extract competitive insights about a SPECIFIC unit from the provided content (video transcript, Reddit post, article, or forum discussion).
+
+HANDLING VARIOUS CONTENT TYPES:
+1. The text may be a messy auto-transcript with heavy repetition (words or sentences repeated multiple times). Look past the repetition to find the actual content.
+2. The unit name may be phonetically misspelled (e.g., "Infernus" as "Infernace", "Vulkan He'stan" as "Vulcan Histan"). Use your knowledge of Warhammer 40k to identify the intended unit.
+3. Only extract information that is clearly about the target unit.
+4. The content may cover multiple units - focus ONLY on the requested unit.
+5. For Reddit/forum content, consider both the original post AND the comments/replies.
+6. For articles, focus on the author's main points and conclusions.
+
+IMPORTANT:
+1. If the unit is discussed in any meaningful way, set "found" to true.
+2. If the unit is absolutely not mentioned or only mentioned in passing without useful info, set "found" to false.
+3. Be specific with tactical advice - include actual numbers, ranges, and game mechanics when mentioned.
+4. Include detachment-specific interactions if discussed.
+
+TIER RANKINGS (assign based on how the content discusses the unit):
+- S = Meta-defining, auto-include, extremely enthusiastic recommendation
+- A = Very strong, competitive staple, highly recommended  
+- B = Solid, viable choice, good in the right list
+- C = Situational, has niche uses, requires specific builds
+- D = Below average, rarely recommended
+- F = Avoid, advised against taking
+
+Extract quotes and specific advice from the content. If the unit isn't meaningfully discussed, return { "found": false, "confidence": 100 }."""
+
+
+def build_unit_context_user_prompt(transcript: str, unit_name: str, faction: Optional[str] = None) -> str:
+    """Build user prompt for unit context extraction."""
+    faction_str = f" ({faction})" if faction else ""
+    return f"""Extract competitive insights about "{unit_name}"{faction_str} from this content:
+
+---
+{transcript}
 ---
 
-Look for any information about:
+{build_unit_context_checklist(unit_name)}"""
+
+
+def build_unit_context_task_prompt(unit_name: str, faction: Optional[str] = None) -> str:
+    """Build the per-unit request sent after a cached source context (no transcript)."""
+    faction_str = f" ({faction})" if faction else ""
+    return f"""TASK INSTRUCTIONS:
+{build_unit_context_system_prompt()}
+
+Extract competitive insights about "{unit_name}"{faction_str} from the content source above.
+
+{build_unit_context_checklist(unit_name)}"""
+
+
+def build_unit_context_checklist(unit_name: str) -> str:
+    """What to look for about a unit (shared by the inline and cached prompt variants)."""
+    return f"""Look for any information about:
 - Tier rankings or power level assessments
 - Best targets / what the unit is good against
 - Counters / what threatens the unit
@@ -1418,11 +2764,15 @@ def extract_unit_context(
     transcript: str,
     unit_name: str,
     faction: Optional[str] = None,
-    video_info: Optional[dict[str, Any]] = None
+    video_info: Optional[dict[str, Any]] = None,
+    source_context: Optional[dict[str, Any]] = None
 ) -> dict[str, Any]:
     """
     Extract competitive context for a specific unit from a transcript using Gemini AI.
     
+    If source_context (from get_source_context) is given, the transcript is not
+    re-sent: the request only carries the unit-specific instructions.
+    
     Returns a dict with the extracted context or error information.
     """
     api_key = os.getenv("GOOGLE_API_KEY")
@@ -1434,9 +2784,17 @@ def extract_unit_context(
     
     print(f"\n🎯 Extracting context for \"{unit_name}\"...")
     
+    # Keep inline transcripts within the prompt budget (mention windows first, then compaction)
+    if not source_context and estimate_tokens(transcript) > PROMPT_TOKEN_BUDGET:
+        transcript = retrieve_unit_passages(transcript, [unit_name], video_info, max_coverage=1.0) or transcript
+        transcript = fit_text_to_budget(transcript, PROMPT_TOKEN_BUDGET, "transcript")
+
     # Build prompts
     system_prompt = build_unit_context_system_prompt()
-    user_prompt = build_unit_context_user_prompt(transcript, unit_name, faction)
+    if source_context:
+        user_prompt = build_unit_context_task_prompt(unit_name, faction)
+    else:
+        user_prompt = build_unit_context_user_prompt(transcript, unit_name, faction)
     
     # Create Langfuse trace
     trace = None
@@ -1451,17 +2809,12 @@ def extract_unit_context(
                 "sourceId": source_id,
                 "contentTitle": video_info.get("title") if video_info else None,
                 "transcriptLength": len(transcript),
+                "contextCache": source_context.get("name") if source_context else None,
             },
             tags=["extraction", f"unit-{unit_name.lower().replace(' ', '-')}"]
         )
     
     # Call Gemini API
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent?key={api_key}"
-    
-    headers = {
-        "Content-Type": "application/json"
-    }
-    
     payload = {
         "contents": [
             {
@@ -1474,11 +2827,14 @@ def extract_unit_context(
         },
         "generationConfig": {
             "temperature": 0.3,
-            "maxOutputTokens": 65536,
+            "maxOutputTokens": plan_output_tokens(int(_batch_output_tokens_per_unit)),
             "responseMimeType": "application/json",
             "responseSchema": UNIT_CONTEXT_SCHEMA
         }
     }
+    if source_context:
+        payload.pop("systemInstruction")  # Carried by the cached context
+        payload = apply_source_context(payload, source_context)
     
     # Create Langfuse generation span
     if trace:
@@ -1498,7 +2854,7 @@ def extract_unit_context(
     
     try:
         print(f"🤖 Calling Gemini ({GEMINI_MODEL})...")
-        response = requests_with_retry("POST", url, headers=headers, json=payload, timeout=600)  # 10 min timeout with retries
+        response = gemini_generate(payload, api_key)
         
         if response.status_code != 200:
             error_text = response.text[:500] if response.text else "No error details"
@@ -1564,34 +2920,7 @@ def extract_unit_context(
         print(f"✅ Successfully extracted context for \"{unit_name}\"")
         
         # Build the full output structure (uses generalized field names)
-        output = {
-            "success": True,
-            "found": True,
-            "unitName": unit_name,
-            "faction": faction or "Unknown",
-            "source": {
-                "sourceId": video_info.get("source_id") or video_info.get("video_id") if video_info else None,
-                "sourceType": video_info.get("source_type", "youtube") if video_info else "youtube",
-                "contentTitle": video_info.get("title") if video_info else None,
-                "authorName": video_info.get("author") or video_info.get("channel") if video_info else None,
-                "url": video_info.get("url") if video_info else None,
-                "fetchedAt": datetime.now().isoformat()
-            },
-            "context": {
-                "tierRank": parsed.get("tierRank"),
-                "tierReasoning": parsed.get("tierReasoning"),
-                "bestTargets": parsed.get("bestTargets", []),
-                "counters": parsed.get("counters", []),
-                "synergies": parsed.get("synergies", []),
-                "playstyleNotes": parsed.get("playstyleNotes"),
-                "deploymentTips": parsed.get("deploymentTips"),
-                "detachmentNotes": parsed.get("detachmentNotes"),
-                "equipmentRecommendations": parsed.get("equipmentRecommendations"),
-                "pointsEfficiency": parsed.get("pointsEfficiency"),
-                "additionalNotes": parsed.get("additionalNotes"),
-                "confidence": parsed.get("confidence", 50)
-            }
-        }
+        output = build_unit_context_output(parsed, unit_name, faction, video_info)
         
         # Log success to Langfuse
         if generation:
@@ -1612,13 +2941,439 @@ def extract_unit_context(
             "success": False,
             "error": "Gemini API request timed out"
         }
-    except Exception as e:
-        if generation:
-            generation.end(output={"error": str(e)}, level="ERROR")
-        return {
-            "success": False,
-            "error": f"Unexpected error calling Gemini: {e}"
+    except Exception as e:
+        if generation:
+            generation.end(output={"error": str(e)}, level="ERROR")
+        return {
+            "success": False,
+            "error": f"Unexpected error calling Gemini: {e}"
+        }
+
+
+def build_unit_context_output(
+    parsed: dict[str, Any],
+    unit_name: str,
+    faction: Optional[str] = None,
+    video_info: Optional[dict[str, Any]] = None
+) -> dict[str, Any]:
+    """Wrap a parsed UNIT_CONTEXT_SCHEMA object in the stored extraction structure."""
+    return {
+        "success": True,
+        "found": True,
+        "unitName": unit_name,
+        "faction": faction or "Unknown",
+        "source": {
+            "sourceId": video_info.get("source_id") or video_info.get("video_id") if video_info else None,
+            "sourceType": video_info.get("source_type", "youtube") if video_info else "youtube",
+            "contentTitle": video_info.get("title") if video_info else None,
+            "authorName": video_info.get("author") or video_info.get("channel") if video_info else None,
+            "url": video_info.get("url") if video_info else None,
+            "fetchedAt": datetime.now().isoformat()
+        },
+        "context": {
+            "tierRank": parsed.get("tierRank"),
+            "tierReasoning": parsed.get("tierReasoning"),
+            "bestTargets": parsed.get("bestTargets", []),
+            "counters": parsed.get("counters", []),
+            "synergies": parsed.get("synergies", []),
+            "playstyleNotes": parsed.get("playstyleNotes"),
+            "deploymentTips": parsed.get("deploymentTips"),
+            "detachmentNotes": parsed.get("detachmentNotes"),
+            "equipmentRecommendations": parsed.get("equipmentRecommendations"),
+            "pointsEfficiency": parsed.get("pointsEfficiency"),
+            "additionalNotes": parsed.get("additionalNotes"),
+            "confidence": parsed.get("confidence", 50)
+        }
+    }
+
+
+# ============================================
+# BATCHED MULTI-UNIT EXTRACTION
+# ============================================
+
+# One structured call returns an array of per-unit contexts for a source
+MULTI_UNIT_CONTEXT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "units": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "unitKey": {
+                        "type": "string",
+                        "description": "The key of the requested unit (e.g. \"U1\")"
+                    },
+                    **UNIT_CONTEXT_SCHEMA["properties"],
+                },
+                "required": ["unitKey"] + UNIT_CONTEXT_SCHEMA["required"]
+            },
+            "description": "Exactly one entry per requested unit"
+        }
+    },
+    "required": ["units"]
+}
+
+BATCH_EXTRACT_MAX_OUTPUT_TOKENS = 65536
+BATCH_EXTRACT_OUTPUT_HEADROOM = 0.75  # Plan batches to use at most 75% of the output limit
+BATCH_EXTRACT_MAX_UNITS = 15
+BATCH_EXTRACT_MIN_TOKENS_PER_UNIT = 600
+
+# Running estimate of output tokens per unit, refined from usageMetadata as batches complete
+_batch_output_tokens_per_unit = 2500.0
+
+
+def plan_extraction_batch_size() -> int:
+    """How many units fit in one batched call given the current output-token estimate."""
+    budget = BATCH_EXTRACT_MAX_OUTPUT_TOKENS * BATCH_EXTRACT_OUTPUT_HEADROOM
+    per_unit = max(BATCH_EXTRACT_MIN_TOKENS_PER_UNIT, _batch_output_tokens_per_unit)
+    return max(1, min(BATCH_EXTRACT_MAX_UNITS, int(budget // per_unit)))
+
+
+def record_batch_output_usage(unit_count: int, output_tokens: int, truncated: bool = False) -> None:
+    """Update the per-unit output estimate (moving average; jumps up on truncation)."""
+    global _batch_output_tokens_per_unit
+    if unit_count <= 0:
+        return
+    observed = output_tokens / unit_count
+    if truncated:
+        # The batch did not fit - assume units need at least 50% more than this run allowed
+        observed = max(observed, BATCH_EXTRACT_MAX_OUTPUT_TOKENS / unit_count) * 1.5
+        _batch_output_tokens_per_unit = max(_batch_output_tokens_per_unit, observed)
+    elif observed > 0:
+        _batch_output_tokens_per_unit = 0.7 * _batch_output_tokens_per_unit + 0.3 * observed
+
+
+def build_multi_unit_context_system_prompt() -> str:
+    """System prompt for extracting several units from one source in a single call."""
+    return build_unit_context_system_prompt() + """
+
+MULTIPLE UNITS:
+You will be asked about SEVERAL units at once. Treat each unit independently - only attribute information to a unit if it is clearly about that unit.
+Return exactly one entry in "units" per requested unit, using its "unitKey". For units that are not meaningfully discussed, return { "unitKey": "...", "found": false, "confidence": 100 }."""
+
+
+def build_multi_unit_request(units: list, faction: Optional[str] = None, cached_source: bool = False) -> str:
+    """List the requested units with their keys."""
+    faction_str = f" ({faction})" if faction else ""
+    lead = "From the content source above, extract" if cached_source else "Extract"
+    unit_lines = "\n".join(f"- {key}: \"{name}\"" for key, name in units)
+    return f"""{lead} competitive insights{faction_str} for EACH of these units:
+{unit_lines}
+
+{build_unit_context_checklist("each unit")}"""
+
+
+def extract_units_context_batch(
+    transcript: str,
+    units: list,
+    faction: Optional[str] = None,
+    video_info: Optional[dict[str, Any]] = None,
+    source_context: Optional[dict[str, Any]] = None,
+    _depth: int = 0
+) -> dict[str, dict[str, Any]]:
+    """
+    Extract competitive context for several units of one source in one Gemini call.
+
+    units: list of (unit_id, unit_name) tuples.
+    Returns {unit_id: result} where each result has the same shape as
+    extract_unit_context(). Batches whose output is truncated or unparseable are
+    split in half and retried; units missing from a response are retried once as their own batch.
+    """
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        return {uid: {"success": False, "error": "GOOGLE_API_KEY is not set in .env.local"} for uid, _ in units}
+    if not units:
+        return {}
+
+    # Keep an inline transcript within the prompt budget (splits/retries reuse the fitted text)
+    if not source_context and estimate_tokens(transcript) > PROMPT_TOKEN_BUDGET:
+        transcript = retrieve_unit_passages(
+            transcript, [name for _, name in units], video_info, max_coverage=1.0
+        ) or transcript
+        transcript = fit_text_to_budget(transcript, PROMPT_TOKEN_BUDGET, "transcript")
+
+    keyed = [(f"U{i}", uid, name) for i, (uid, name) in enumerate(units, 1)]
+    request = build_multi_unit_request([(key, name) for key, _, name in keyed], faction, bool(source_context))
+    system_prompt = build_multi_unit_context_system_prompt()
+
+    if source_context:
+        user_prompt = f"TASK INSTRUCTIONS:\n{system_prompt}\n\n{request}"
+    else:
+        user_prompt = f"Content:\n\n---\n{transcript}\n---\n\n{request}"
+
+    payload = {
+        "contents": [{"role": "user", "parts": [{"text": user_prompt}]}],
+        "generationConfig": {
+            "temperature": 0.3,
+            "maxOutputTokens": BATCH_EXTRACT_MAX_OUTPUT_TOKENS,
+            "responseMimeType": "application/json",
+            "responseSchema": MULTI_UNIT_CONTEXT_SCHEMA
         }
+    }
+    if source_context:
+        payload = apply_source_context(payload, source_context)
+    else:
+        payload["systemInstruction"] = {"parts": [{"text": system_prompt}]}
+
+    print(f"🤖 Calling Gemini ({GEMINI_MODEL}) for {len(units)} unit(s)...")
+    try:
+        response = gemini_generate(payload, api_key)
+    except Exception as e:
+        return {uid: {"success": False, "error": f"Unexpected error calling Gemini: {e}"} for uid, _ in units}
+
+    if response.status_code != 200:
+        error_text = response.text[:500] if response.text else "No error details"
+        return {uid: {"success": False, "error": f"Gemini API error {response.status_code}: {error_text}"} for uid, _ in units}
+
+    result = response.json()
+    candidates = result.get("candidates", [])
+    usage = result.get("usageMetadata", {})
+    finish_reason = candidates[0].get("finishReason") if candidates else None
+    response_text = ""
+    if candidates:
+        parts = candidates[0].get("content", {}).get("parts", [])
+        response_text = parts[0].get("text", "") if parts else ""
+
+    parsed = None
+    if response_text:
+        try:
+            parsed = json.loads(response_text)
+        except json.JSONDecodeError:
+            parsed = None
+
+    # Only MAX_TOKENS raises the output estimate; other unparseable answers are just retried smaller
+    truncated = finish_reason == "MAX_TOKENS"
+    output_tokens = usage.get("candidatesTokenCount", 0) + usage.get("thoughtsTokenCount", 0)
+    record_batch_output_usage(len(units), output_tokens, truncated=truncated)
+
+    if truncated or parsed is None:
+        if len(units) == 1:
+            return {units[0][0]: {"success": False, "error": f"Gemini response unusable (finishReason={finish_reason})"}}
+        half = len(units) // 2
+        problem = "truncated" if truncated else "unparseable"
+        print(f"   ⚠️ Batch of {len(units)} {problem}, splitting into {half} + {len(units) - half}")
+        results = extract_units_context_batch(transcript, units[:half], faction, video_info, source_context, _depth)
+        results.update(extract_units_context_batch(transcript, units[half:], faction, video_info, source_context, _depth))
+        return results
+
+    entries = {e.get("unitKey"): e for e in parsed.get("units", []) if isinstance(e, dict)}
+    results = {}
+    missing = []
+    for key, uid, name in keyed:
+        entry = entries.get(key)
+        if entry is None:
+            missing.append((uid, name))
+        elif entry.get("found", False):
+            results[uid] = build_unit_context_output(entry, name, faction, video_info)
+        else:
+            results[uid] = {"success": True, "found": False, "message": f"\"{name}\" was not found in the transcript"}
+
+    if missing:
+        if _depth == 0:
+            print(f"   ⚠️ {len(missing)} unit(s) missing from batch response, retrying them")
+            results.update(extract_units_context_batch(transcript, missing, faction, video_info, source_context, _depth + 1))
+        else:
+            for uid, name in missing:
+                results[uid] = {"success": False, "error": f"\"{name}\" missing from batched Gemini response"}
+
+    return results
+
+
+# ============================================
+# MENTION-WINDOW RETRIEVAL
+# ============================================
+
+# Send only the passages around a unit's mentions instead of the whole transcript
+RETRIEVAL_ENABLED = True
+RETRIEVAL_MIN_SOURCE_CHARS = 20000  # Shorter sources are sent whole
+RETRIEVAL_WINDOW_CHARS = 1500  # Context kept on each side of a mention
+RETRIEVAL_MAX_COVERAGE = 0.6  # If the windows cover more than this share of the source, send it all
+RETRIEVAL_FUZZY_THRESHOLD = 0.84
+RETRIEVAL_PHONETIC_MIN_SIMILARITY = 0.75  # Soundex alone is too loose: "Rhino" ~ "rain", "Reivers" ~ "Reaper"
+RETRIEVAL_MAX_KEYWORD_DATASHEETS = 3  # Keywords shared by more datasheets are too generic to locate a unit
+
+_WORD_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9']*")
+_SOUNDEX_CODES = {c: d for d, letters in {
+    "1": "bfpv", "2": "cgjkqsxz", "3": "dt", "4": "l", "5": "mn", "6": "r"
+}.items() for c in letters}
+
+
+def soundex(word: str) -> str:
+    """American Soundex code (phonetic match for mis-transcribed names, e.g. Vulkan/Vulcan)."""
+    word = re.sub(r"[^a-z]", "", word.lower())
+    if not word:
+        return ""
+    code = word[0].upper()
+    last = _SOUNDEX_CODES.get(word[0], "")
+    for c in word[1:]:
+        digit = _SOUNDEX_CODES.get(c, "")
+        if digit and digit != last:
+            code += digit
+            if len(code) == 4:
+                break
+        if c not in "hw":
+            last = digit
+    return code.ljust(4, "0")
+
+
+def _normalize_word(word: str) -> str:
+    word = word.lower().replace("'", "")
+    if len(word) > 4 and word.endswith("es") and word[-3] in "sxz":
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def get_unit_search_terms(
+    unit_name: str,
+    faction_id: Optional[str] = None,
+    datasheet_id: Optional[str] = None
+) -> list:
+    """Name, aliases and distinctive keywords to locate a unit in a transcript."""
+    terms = [unit_name] + derive_unit_aliases(unit_name)
+    if faction_id and datasheet_id:
+        try:
+            catalog = get_faction_catalog(faction_id)
+        except Exception:
+            catalog = None
+        if catalog:
+            entry = next((d for d in catalog["datasheets"] if d["id"] == datasheet_id), None)
+            if entry:
+                terms += entry.get("aliases", [])
+                frequency: dict[str, int] = {}
+                for d in catalog["datasheets"]:
+                    for k in set(kw.lower() for kw in d.get("keywordList", [])):
+                        frequency[k] = frequency.get(k, 0) + 1
+                terms += [
+                    kw for kw in entry.get("keywordList", [])
+                    if frequency.get(kw.lower(), 0) <= RETRIEVAL_MAX_KEYWORD_DATASHEETS
+                ]
+
+    seen = set()
+    unique = []
+    for term in terms:
+        key = " ".join(_normalize_word(w) for w in _WORD_RE.findall(term))
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(term)
+    return unique
+
+
+def find_unit_mentions(text: str, terms: list) -> list:
+    """
+    Locate mentions of any term: exact (plural-insensitive), phonetic (per word: same
+    Soundex code and a close spelling, e.g. Vulkan/Vulcan) or fuzzy (similarity of the
+    whole phrase). Returns a list of (start, end) char spans.
+
+    Runs one pass over the transcript's words per term; candidate positions are
+    pre-filtered by the Soundex code of the term's first word.
+    """
+    from difflib import SequenceMatcher
+
+    words = [(m.start(), m.end(), _normalize_word(m.group())) for m in _WORD_RE.finditer(text)]
+    if not words:
+        return []
+    codes = [soundex(w) for _, _, w in words]
+    by_code: dict[str, list] = {}
+    for i, code in enumerate(codes):
+        by_code.setdefault(code, []).append(i)
+
+    spans = []
+    for term in terms:
+        term_words = [_normalize_word(w) for w in _WORD_RE.findall(term)]
+        if not term_words:
+            continue
+        term_codes = [soundex(w) for w in term_words]
+        term_text = " ".join(term_words)
+        n = len(term_words)
+        # Single short words ("Ork") are only matched exactly
+        allow_inexact = n > 1 or len(term_words[0]) >= 5
+
+        for i in by_code.get(term_codes[0], []):
+            if i + n > len(words):
+                continue
+            window = [w for _, _, w in words[i:i + n]]
+            if window == term_words:
+                matched = True
+            elif not allow_inexact:
+                matched = False
+            elif codes[i:i + n] == term_codes and all(
+                w == t or SequenceMatcher(None, w, t).ratio() >= RETRIEVAL_PHONETIC_MIN_SIMILARITY
+                for w, t in zip(window, term_words)
+            ):
+                matched = True
+            else:
+                candidate = " ".join(window)
+                matched = (
+                    abs(len(candidate) - len(term_text)) <= max(2, len(term_text) // 4)
+                    and SequenceMatcher(None, candidate, term_text).ratio() >= RETRIEVAL_FUZZY_THRESHOLD
+                )
+            if matched:
+                spans.append((words[i][0], words[i + n - 1][1]))
+
+    return sorted(set(spans))
+
+
+def build_mention_context(text: str, spans: list, window: int = RETRIEVAL_WINDOW_CHARS) -> list:
+    """Expand mention spans into windows (snapped to word boundaries) and merge overlaps."""
+    windows = []
+    for start, end in spans:
+        lo = max(0, start - window)
+        hi = min(len(text), end + window)
+        # Snap to whitespace so words aren't cut in half
+        if lo > 0:
+            ws = text.find(" ", lo)
+            lo = ws + 1 if 0 <= ws < start else lo
+        if hi < len(text):
+            ws = text.rfind(" ", end, hi)
+            hi = ws if ws > end else hi
+        if windows and lo <= windows[-1][1]:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], hi))
+        else:
+            windows.append((lo, hi))
+    return windows
+
+
+def retrieve_unit_passages(
+    text: str,
+    unit_names: list,
+    source_info: Optional[dict[str, Any]] = None,
+    terms_by_unit: Optional[dict[str, list]] = None,
+    max_coverage: float = RETRIEVAL_MAX_COVERAGE
+) -> Optional[str]:
+    """
+    Build a compact context (short source header + windows around each unit's
+    mentions) for one or more units.
+
+    Returns None when the full text should be sent instead: retrieval disabled,
+    short source, a unit with no located mentions, or windows covering most of the source.
+    """
+    if not RETRIEVAL_ENABLED or not text or len(text) < RETRIEVAL_MIN_SOURCE_CHARS:
+        return None
+
+    all_spans = []
+    for name in unit_names:
+        terms = (terms_by_unit or {}).get(name) or get_unit_search_terms(name)
+        spans = find_unit_mentions(text, terms)
+        if not spans:
+            return None
+        all_spans.extend(spans)
+
+    windows = build_mention_context(text, sorted(all_spans))
+    covered = sum(hi - lo for lo, hi in windows)
+    if covered > len(text) * max_coverage:
+        return None
+
+    info = source_info or {}
+    header = f"""SOURCE: "{info.get('title') or 'Unknown'}" ({info.get('source_type') or 'unknown'}{', ' + info['author'] if info.get('author') else ''})
+NOTE: Excerpts around every mention of {', '.join(unit_names)} ({covered:,} of {len(text):,} chars). "[...]" marks omitted content."""
+
+    excerpts = "\n[...]\n".join(text[lo:hi].strip() for lo, hi in windows)
+    prefix = "[...]\n" if windows[0][0] > 0 else ""
+    suffix = "\n[...]" if windows[-1][1] < len(text) else ""
+    return f"{header}\n\n{prefix}{excerpts}{suffix}"
 
 
 def save_unit_context(
@@ -1824,7 +3579,7 @@ def process_pending_sources(api_url: str, no_whisper: bool = False) -> int:
         }
         
         context_result = extract_unit_context(
-            transcript=transcript,
+            transcript=retrieve_unit_passages(transcript, [datasheet_name], source_info) or transcript,
             unit_name=datasheet_name,
             faction=faction,
             video_info=source_info
@@ -2018,89 +3773,636 @@ TIER RANKINGS (synthesize based on overall sentiment):
 - D = Generally considered below average
 - F = Consensus to avoid
 
-OUTPUT: Provide a synthesized competitive context that represents the best understanding from ALL provided sources."""
+OUTPUT: Provide a synthesized competitive context that represents the best understanding from ALL provided sources."""
+
+
+# Local pre-aggregation: weighted tier distribution and clustered list entries,
+# sent to the model as a compact consensus instead of every source's raw lists
+TIER_ORDER = ["S", "A", "B", "C", "D", "F"]
+PREAGGREGATE_RECENCY_HALF_LIFE_DAYS = 180  # A source's weight halves every ~6 months
+PREAGGREGATE_UNDATED_WEIGHT = 0.75
+PREAGGREGATE_CLUSTER_SIMILARITY = 0.82
+PREAGGREGATE_MAX_ENTRIES = 12  # Per list in the consensus summary
+AGGREGATE_CONSENSUS_THRESHOLD = 0.8  # Weighted tier agreement needed to skip the LLM
+AGGREGATE_CONSENSUS_MIN_SOURCES = 3
+
+
+def _source_context_fields(source: dict[str, Any]) -> dict[str, Any]:
+    """The per-unit context dict of an extracted DatasheetSource (handles JSON strings)."""
+    extracted = source.get("extractedContext") or {}
+    if isinstance(extracted, str):
+        try:
+            extracted = json.loads(extracted)
+        except json.JSONDecodeError:
+            return {}
+    return extracted.get("context") or {}
+
+
+def source_weight(source: dict[str, Any], now: Optional[datetime] = None) -> float:
+    """Confidence x recency weight of one source."""
+    confidence = source.get("confidence")
+    if confidence is None:
+        confidence = _source_context_fields(source).get("confidence", 50)
+    weight = max(0.05, min(1.0, (confidence or 50) / 100))
+
+    published = source.get("publishedAt")
+    if isinstance(published, str):
+        try:
+            published = datetime.fromisoformat(published.replace("Z", "+00:00"))
+        except ValueError:
+            published = None
+    if published:
+        now = now or datetime.now(published.tzinfo)
+        age_days = max(0.0, (now - published).total_seconds() / 86400)
+        weight *= 0.5 ** (age_days / PREAGGREGATE_RECENCY_HALF_LIFE_DAYS)
+    else:
+        weight *= PREAGGREGATE_UNDATED_WEIGHT
+    return weight
+
+
+def _normalize_entry(text: str) -> str:
+    return " ".join(_normalize_word(w) for w in _WORD_RE.findall(str(text)))
+
+
+def cluster_entries(entries: list) -> list:
+    """
+    Group near-duplicate entries ("Elite infantry" / "elite infantry units" /
+    "Elite Infantry.") by normalized fuzzy similarity. Each source counts at
+    most once per cluster.
+
+    entries: list of (text, weight, source_index[, detail]) tuples.
+    Returns clusters sorted by weight: {label, weight, sources, details}.
+    """
+    from difflib import SequenceMatcher
+
+    clusters: list = []
+    for entry in sorted(entries, key=lambda e: -e[1]):
+        text, weight, source_index = entry[0], entry[1], entry[2]
+        detail = entry[3] if len(entry) > 3 else None
+        key = _normalize_entry(text)
+        if not key:
+            continue
+        key_words = set(key.split())
+        match = None
+        for cluster in clusters:
+            ckey = cluster["key"]
+            if (
+                key == ckey
+                or key_words == cluster["words"]
+                or (min(len(key_words), len(cluster["words"])) >= 2
+                    and (key_words <= cluster["words"] or cluster["words"] <= key_words))
+                or SequenceMatcher(None, key, ckey).ratio() >= PREAGGREGATE_CLUSTER_SIMILARITY
+            ):
+                match = cluster
+                break
+        if match is None:
+            match = {"key": key, "words": key_words, "label": str(text).strip(), "sources": {}, "details": []}
+            clusters.append(match)
+        match["sources"][source_index] = max(weight, match["sources"].get(source_index, 0.0))
+        if detail:
+            match["details"].append((weight, detail))
+
+    result = []
+    for cluster in sorted(clusters, key=lambda c: -sum(c["sources"].values())):
+        result.append({
+            "label": cluster["label"],
+            "weight": round(sum(cluster["sources"].values()), 3),
+            "sources": len(cluster["sources"]),
+            # Best-supported explanation first
+            "details": [d for _, d in sorted(cluster["details"], key=lambda x: -x[0])],
+        })
+    return result
+
+
+def preaggregate_sources(sources: list) -> dict[str, Any]:
+    """
+    Confidence- and recency-weighted consensus across a datasheet's sources:
+    tier distribution, agreement, and clustered targets/counters/synergies.
+    """
+    tier_weights: dict[str, float] = {}
+    targets, counters, synergies = [], [], []
+    weights = []
+
+    for index, source in enumerate(sources):
+        ctx = _source_context_fields(source)
+        weight = source_weight(source)
+        weights.append(weight)
+        tier = str(ctx.get("tierRank") or "").strip().upper()[:1]
+        if tier in TIER_ORDER:
+            tier_weights[tier] = tier_weights.get(tier, 0.0) + weight
+        targets += [(t, weight, index) for t in ctx.get("bestTargets") or []]
+        counters += [(c, weight, index) for c in ctx.get("counters") or []]
+        for synergy in ctx.get("synergies") or []:
+            if isinstance(synergy, dict) and synergy.get("unit"):
+                synergies.append((synergy["unit"], weight, index, synergy.get("why", "")))
+            elif isinstance(synergy, str):
+                synergies.append((synergy, weight, index))
+
+    total_tier_weight = sum(tier_weights.values())
+    distribution = {
+        tier: round(tier_weights[tier] / total_tier_weight, 3)
+        for tier in TIER_ORDER if tier in tier_weights
+    } if total_tier_weight else {}
+    consensus_tier = max(distribution, key=distribution.get) if distribution else None
+
+    return {
+        "sourceCount": len(sources),
+        "rankedSourceCount": sum(1 for s in sources if str(_source_context_fields(s).get("tierRank") or "")[:1].upper() in TIER_ORDER),
+        "weights": weights,
+        "tierDistribution": distribution,
+        "consensusTier": consensus_tier,
+        "tierAgreement": distribution.get(consensus_tier, 0.0) if consensus_tier else 0.0,
+        "bestTargets": cluster_entries(targets),
+        "counters": cluster_entries(counters),
+        "synergies": cluster_entries(synergies),
+    }
+
+
+def build_consensus_summary(pre: dict[str, Any]) -> str:
+    """Compact text rendering of preaggregate_sources() for the aggregation prompt."""
+    lines = ["LOCAL CONSENSUS (weighted by source confidence and recency):"]
+    if pre["tierDistribution"]:
+        dist = ", ".join(f"{tier} {share:.0%}" for tier, share in pre["tierDistribution"].items())
+        lines.append(f"Tier distribution: {dist} (consensus {pre['consensusTier']}, agreement {pre['tierAgreement']:.0%})")
+
+    def render(title: str, clusters: list, with_details: bool = False) -> None:
+        if not clusters:
+            return
+        lines.append(f"{title}:")
+        for cluster in clusters[:PREAGGREGATE_MAX_ENTRIES]:
+            line = f"  - {cluster['label']} [{cluster['sources']}/{pre['sourceCount']} sources, weight {cluster['weight']:.2f}]"
+            if with_details and cluster["details"]:
+                line += f": {cluster['details'][0]}"
+            lines.append(line)
+        if len(clusters) > PREAGGREGATE_MAX_ENTRIES:
+            lines.append(f"  ... {len(clusters) - PREAGGREGATE_MAX_ENTRIES} less-supported entries omitted")
+
+    render("Best targets", pre["bestTargets"])
+    render("Counters", pre["counters"])
+    render("Synergies", pre["synergies"], with_details=True)
+    return "\n".join(lines) + "\n"
+
+
+def has_local_consensus(pre: dict[str, Any]) -> bool:
+    """True when enough sources agree on the tier that the LLM synthesis can be skipped."""
+    return (
+        pre["rankedSourceCount"] >= AGGREGATE_CONSENSUS_MIN_SOURCES
+        and pre["tierAgreement"] >= AGGREGATE_CONSENSUS_THRESHOLD
+    )
+
+
+def build_consensus_context(pre: dict[str, Any], sources: list) -> dict[str, Any]:
+    """
+    Aggregated context (AGGREGATED_CONTEXT_SCHEMA shape) built locally from the
+    consensus: lists from the best-supported clusters, prose from the
+    highest-weighted source that agrees with the consensus tier.
+    """
+    agreeing = [
+        (pre["weights"][i], _source_context_fields(s)) for i, s in enumerate(sources)
+        if str(_source_context_fields(s).get("tierRank") or "")[:1].upper() == pre["consensusTier"]
+    ]
+    best = max(agreeing, key=lambda x: x[0])[1] if agreeing else {}
+    dist = ", ".join(f"{tier} {share:.0%}" for tier, share in pre["tierDistribution"].items())
+
+    return {
+        "competitiveTier": pre["consensusTier"],
+        "tierReasoning": (best.get("tierReasoning") or "").strip()
+                         + f" (Consensus of {pre['rankedSourceCount']} sources: {dist}.)",
+        "bestTargets": [c["label"] for c in pre["bestTargets"][:PREAGGREGATE_MAX_ENTRIES]],
+        "counters": [c["label"] for c in pre["counters"][:PREAGGREGATE_MAX_ENTRIES]],
+        "synergies": [
+            {"unit": c["label"], "why": c["details"][0] if c["details"] else ""}
+            for c in pre["synergies"][:PREAGGREGATE_MAX_ENTRIES]
+        ],
+        "playstyleNotes": best.get("playstyleNotes"),
+        "deploymentTips": best.get("deploymentTips"),
+        "competitiveNotes": best.get("additionalNotes"),
+        "conflicts": [],
+    }
+
+
+AGGREGATE_WRITE_BATCH_SIZE = 25  # Faction-wide aggregation upserts contexts this many at a time
+AGGREGATE_PROMPT_TOKEN_BUDGET = 60000
+# Part of every stored source fingerprint - bump to re-aggregate everything after prompt/schema changes
+AGGREGATION_FINGERPRINT_VERSION = f"{GEMINI_MODEL}/1"
+AGGREGATE_EXPECTED_OUTPUT_TOKENS = 4000
+AGGREGATE_FIELD_CHAR_LIMITS = (None, 1500, 600, 250)  # Progressively tighter per-field caps
+
+
+def _clip(text: str, limit: Optional[int]) -> str:
+    text = str(text)
+    if limit is None or len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + "..."
+
+
+def build_aggregate_source_block(
+    index: int,
+    source: dict[str, Any],
+    field_limit: Optional[int] = None,
+    include_lists: bool = True
+) -> str:
+    """
+    One source's section of the aggregation prompt (long text fields clipped to
+    field_limit). include_lists=False leaves out targets/counters/synergies when
+    they are already covered by the consensus summary.
+    """
+    source_type = source.get("sourceType", "unknown")
+    source_title = source.get("sourceTitle", "Unknown")
+    extracted = source.get("extractedContext", {})
+
+    # Parse extracted context if it's a string
+    if isinstance(extracted, str):
+        try:
+            extracted = json.loads(extracted)
+        except:
+            extracted = {"raw": extracted}
+
+    block = f"""
+--- SOURCE {index}: {source_type.upper()} ---
+Title: {source_title}
+"""
+
+    # Add the extracted context details
+    if extracted.get("context"):
+        ctx = extracted["context"]
+        if ctx.get("tierRank"):
+            block += f"Tier: {ctx['tierRank']}\n"
+        if ctx.get("tierReasoning"):
+            block += f"Reasoning: {_clip(ctx['tierReasoning'], field_limit)}\n"
+        if include_lists and ctx.get("bestTargets"):
+            block += f"Best Targets: {', '.join(ctx['bestTargets'])}\n"
+        if include_lists and ctx.get("counters"):
+            block += f"Counters: {', '.join(ctx['counters'])}\n"
+        if include_lists and ctx.get("synergies"):
+            # Handle both old string format and new structured format
+            synergies = ctx['synergies']
+            if synergies and isinstance(synergies[0], dict):
+                synergy_strs = [f"{s['unit']}: {_clip(s['why'], field_limit)}" for s in synergies if isinstance(s, dict)]
+                block += f"Synergies:\n" + "\n".join(f"  - {s}" for s in synergy_strs) + "\n"
+            else:
+                block += f"Synergies: {', '.join(synergies)}\n"
+        if ctx.get("playstyleNotes"):
+            block += f"Playstyle: {_clip(ctx['playstyleNotes'], field_limit)}\n"
+        if ctx.get("deploymentTips"):
+            block += f"Deployment: {_clip(ctx['deploymentTips'], field_limit)}\n"
+        if ctx.get("additionalNotes"):
+            block += f"Notes: {_clip(ctx['additionalNotes'], field_limit)}\n"
+    elif extracted.get("raw"):
+        block += f"Raw context: {extracted['raw'][:min(1000, field_limit or 1000)]}\n"
+
+    return block + "\n"
+
+
+def build_aggregate_user_prompt(
+    unit_name: str,
+    faction: str,
+    sources_data: list,
+    max_tokens: int = AGGREGATE_PROMPT_TOKEN_BUDGET,
+    consensus_summary: Optional[str] = None
+) -> str:
+    """
+    Build user prompt with all source contexts.
+
+    With a consensus_summary (build_consensus_summary), the clustered
+    targets/counters/synergies replace each source's raw lists.
+
+    Stays within max_tokens: long per-source text fields are clipped progressively,
+    and if that is not enough the remaining sources (ordered newest first) are
+    dropped from the end.
+    """
+    include_lists = consensus_summary is None
+    if consensus_summary:
+        max_tokens -= estimate_tokens(consensus_summary)
+    for field_limit in AGGREGATE_FIELD_CHAR_LIMITS:
+        blocks = [
+            build_aggregate_source_block(i, s, field_limit, include_lists)
+            for i, s in enumerate(sources_data, 1)
+        ]
+        if estimate_tokens("".join(blocks)) <= max_tokens:
+            break
+
+    kept = []
+    used = 0
+    for block in blocks:
+        tokens = estimate_tokens(block)
+        if kept and used + tokens > max_tokens:
+            break
+        kept.append(block)
+        used += tokens
+    omitted = len(blocks) - len(kept)
+    if omitted:
+        print(f"   ✂️ Aggregation prompt over budget: omitted {omitted} oldest source(s)")
+    if field_limit:
+        print(f"   🗜️ Aggregation prompt clipped to {field_limit} chars per field")
+
+    prompt = f"""Synthesize competitive context for "{unit_name}" ({faction}) from the following {len(kept)} sources:
+
+"""
+    if consensus_summary:
+        prompt += consensus_summary + "\nPER-SOURCE ASSESSMENTS:\n"
+    prompt += "".join(kept)
+
+    prompt += """
+---
+
+Now synthesize all these perspectives into a single comprehensive competitive assessment. Note any conflicts between sources and explain your resolution.
+
+IMPORTANT - Synergy format: For synergies, provide structured objects with "unit" (name) and "why" (explanation). Example:
+{"unit": "Wolf Guard Battle Leader", "why": "Wolf-touched enhancement grants +1 to wound, complementing Anti-keywords"}"""
+
+    return prompt
+
+
+def synthesize_datasheet_context(
+    datasheet: dict[str, Any],
+    sources: list,
+    gemini_key: str,
+    local_consensus: bool = False
+) -> dict[str, Any]:
+    """
+    Synthesize one datasheet's sources into a competitive context with Gemini.
+
+    Sources are pre-aggregated locally (weighted tier distribution, clustered
+    lists) and the model gets the compact consensus. With local_consensus=True,
+    a strong tier agreement is written directly without calling the model.
+
+    No database access, so it can run on worker threads.
+    Returns {"success": True, "aggregated": {...}, "local": bool} or {"success": False, "error": "..."}.
+    """
+    pre = preaggregate_sources(sources)
+    if local_consensus and has_local_consensus(pre):
+        return {"success": True, "aggregated": build_consensus_context(pre, sources), "local": True}
+
+    system_prompt = build_aggregate_system_prompt()
+    user_prompt = build_aggregate_user_prompt(
+        datasheet.get("name", "Unknown"),
+        datasheet.get("faction", "Unknown"),
+        sources,
+        consensus_summary=build_consensus_summary(pre)
+    )
+    payload = {
+        "contents": [
+            {
+                "role": "user",
+                "parts": [{"text": user_prompt}]
+            }
+        ],
+        "systemInstruction": {
+            "parts": [{"text": system_prompt}]
+        },
+        "generationConfig": {
+            "temperature": 0.3,
+            "maxOutputTokens": plan_output_tokens(AGGREGATE_EXPECTED_OUTPUT_TOKENS),
+            "responseMimeType": "application/json",
+            "responseSchema": AGGREGATED_CONTEXT_SCHEMA
+        }
+    }
+
+    try:
+        response = gemini_generate(payload, gemini_key)
+
+        if response.status_code != 200:
+            return {"success": False, "error": f"Gemini API error {response.status_code}: {response.text[:500]}"}
+
+        result = response.json()
+        candidates = result.get("candidates", [])
+        if not candidates:
+            return {"success": False, "error": "No response from Gemini"}
+
+        response_text = candidates[0].get("content", {}).get("parts", [{}])[0].get("text", "")
+        if not response_text:
+            return {"success": False, "error": "Empty response from Gemini"}
+
+        return {"success": True, "aggregated": json.loads(response_text), "local": False}
+
+    except Exception as e:
+        return {"success": False, "error": f"Error calling Gemini: {e}"}
+
+
+def print_aggregated_context(aggregated: dict[str, Any]) -> None:
+    """Display a synthesized competitive context."""
+    print(f"\n{'=' * 50}")
+    print(f"📊 SYNTHESIZED COMPETITIVE CONTEXT")
+    print("=" * 50)
+    
+    if aggregated.get("competitiveTier"):
+        print(f"\n🏆 Tier: {aggregated['competitiveTier']}")
+    if aggregated.get("tierReasoning"):
+        print(f"   {aggregated['tierReasoning']}")
+    
+    if aggregated.get("bestTargets"):
+        print(f"\n🎯 Best Targets: {', '.join(aggregated['bestTargets'])}")
+    if aggregated.get("counters"):
+        print(f"⚠️ Counters: {', '.join(aggregated['counters'])}")
+    if aggregated.get("synergies"):
+        synergies = aggregated['synergies']
+        if synergies and isinstance(synergies[0], dict):
+            print(f"🤝 Synergies:")
+            for s in synergies:
+                if isinstance(s, dict):
+                    print(f"   • {s.get('unit', 'Unknown')}: {s.get('why', 'No explanation')}")
+        else:
+            print(f"🤝 Synergies: {', '.join(synergies)}")
+
+    if aggregated.get("playstyleNotes"):
+        print(f"\n📖 Playstyle: {aggregated['playstyleNotes']}")
+    if aggregated.get("deploymentTips"):
+        print(f"📍 Deployment: {aggregated['deploymentTips']}")
+    
+    # Show conflicts if any
+    conflicts = aggregated.get("conflicts", [])
+    if conflicts:
+        print(f"\n⚡ DETECTED CONFLICTS ({len(conflicts)}):")
+        for c in conflicts:
+            print(f"   • {c.get('field', 'Unknown')}: {c.get('disagreement', '')}")
+            print(f"     → Resolution: {c.get('resolution', '')}")
+
+
+def fingerprint_sources(sources: list) -> Optional[str]:
+    """Local equivalent of db_get_source_fingerprints for a subset of sources (rows with fingerprintToken)."""
+    tokens = sorted(s["fingerprintToken"] for s in sources if s.get("fingerprintToken"))
+    if not tokens:
+        return None
+    digest = hashlib.md5(",".join(tokens).encode("utf-8")).hexdigest()
+    return f"{AGGREGATION_FINGERPRINT_VERSION}:{len(tokens)}:{digest}"
+
+
+def describe_scope(scope: tuple) -> str:
+    faction_id, detachment_id = scope
+    if detachment_id:
+        return f"detachment {detachment_id}"
+    if faction_id:
+        return f"faction {faction_id}"
+    return "generic"
+
+
+def partition_sources_by_scope(sources: list) -> dict:
+    """
+    Every (factionId, detachmentId) scope the active (non-outdated) sources
+    support, with the sources that apply to it:
+    - (None, None): generic context, all sources
+    - (faction, None): the faction's sources plus faction-less ones
+    - (faction, detachment): the faction scope's non-detachment sources plus
+      that detachment's guides (only for detachments with their own sources)
+    """
+    scopes = {(None, None): list(sources)}
+    active = [s for s in sources if not s.get("isOutdated")]
+    factions = sorted({s["sourceFactionId"] for s in active if s.get("sourceFactionId")})
+    for faction_id in factions:
+        in_faction = [s for s in sources if s.get("sourceFactionId") in (None, faction_id)]
+        scopes[(faction_id, None)] = [s for s in in_faction if not s.get("sourceDetachmentId")]
+        detachments = sorted({
+            s["sourceDetachmentId"] for s in active
+            if s.get("sourceDetachmentId") and s.get("sourceFactionId") == faction_id
+        })
+        for detachment_id in detachments:
+            scopes[(faction_id, detachment_id)] = [
+                s for s in in_faction if s.get("sourceDetachmentId") in (None, detachment_id)
+            ]
+    return scopes
+
 
+def plan_scope_syntheses(
+    datasheet_id: str,
+    sources: list,
+    stored_fingerprints: dict,
+    force: bool = False,
+    faction_id: Optional[str] = None
+) -> tuple:
+    """
+    Group a datasheet's stale scopes by identical active source sets, so each
+    distinct set is synthesized once and saved to every scope that uses it.
+
+    sources: rows from db_get_datasheet_sources_for_aggregation(include_outdated=True).
+    stored_fingerprints: from db_get_scope_fingerprints.
+    faction_id: only plan the generic scope and this faction's scopes.
+    Returns (groups, unchanged_scopes); each group is
+    {"scopes": [scope, ...], "sources": [...], "fingerprints": {scope: fingerprint}}.
+    """
+    groups: dict = {}
+    unchanged = []
+    for scope, scope_sources in partition_sources_by_scope(sources).items():
+        if faction_id and scope[0] not in (None, faction_id):
+            continue
+        active = [s for s in scope_sources if not s.get("isOutdated")]
+        if not active:
+            continue
+        fingerprint = fingerprint_sources(scope_sources)
+        if not force and fingerprint and fingerprint == stored_fingerprints.get((datasheet_id, *scope)):
+            unchanged.append(scope)
+            continue
+        key = frozenset(s["id"] for s in active)
+        group = groups.setdefault(key, {"scopes": [], "sources": active, "fingerprints": {}})
+        group["scopes"].append(scope)
+        group["fingerprints"][scope] = fingerprint
+    return list(groups.values()), unchanged
 
-def build_aggregate_user_prompt(unit_name: str, faction: str, sources_data: list) -> str:
-    """Build user prompt with all source contexts."""
-    prompt = f"""Synthesize competitive context for "{unit_name}" ({faction}) from the following {len(sources_data)} sources:
 
-"""
-    for i, source in enumerate(sources_data, 1):
-        source_type = source.get("sourceType", "unknown")
-        source_title = source.get("sourceTitle", "Unknown")
-        extracted = source.get("extractedContext", {})
-        
-        # Parse extracted context if it's a string
-        if isinstance(extracted, str):
-            try:
-                extracted = json.loads(extracted)
-            except:
-                extracted = {"raw": extracted}
-        
-        prompt += f"""
---- SOURCE {i}: {source_type.upper()} ---
-Title: {source_title}
-"""
-        
-        # Add the extracted context details
-        if extracted.get("context"):
-            ctx = extracted["context"]
-            if ctx.get("tierRank"):
-                prompt += f"Tier: {ctx['tierRank']}\n"
-            if ctx.get("tierReasoning"):
-                prompt += f"Reasoning: {ctx['tierReasoning']}\n"
-            if ctx.get("bestTargets"):
-                prompt += f"Best Targets: {', '.join(ctx['bestTargets'])}\n"
-            if ctx.get("counters"):
-                prompt += f"Counters: {', '.join(ctx['counters'])}\n"
-            if ctx.get("synergies"):
-                # Handle both old string format and new structured format
-                synergies = ctx['synergies']
-                if synergies and isinstance(synergies[0], dict):
-                    synergy_strs = [f"{s['unit']}: {s['why']}" for s in synergies if isinstance(s, dict)]
-                    prompt += f"Synergies:\n" + "\n".join(f"  - {s}" for s in synergy_strs) + "\n"
-                else:
-                    prompt += f"Synergies: {', '.join(synergies)}\n"
-            if ctx.get("playstyleNotes"):
-                prompt += f"Playstyle: {ctx['playstyleNotes']}\n"
-            if ctx.get("deploymentTips"):
-                prompt += f"Deployment: {ctx['deploymentTips']}\n"
-            if ctx.get("additionalNotes"):
-                prompt += f"Notes: {ctx['additionalNotes']}\n"
-        elif extracted.get("raw"):
-            prompt += f"Raw context: {extracted['raw'][:1000]}\n"
-        
-        prompt += "\n"
-    
-    prompt += """
----
+def aggregated_context_row(
+    datasheet_id: str,
+    faction_id: Optional[str],
+    detachment_id: Optional[str],
+    aggregated: dict[str, Any],
+    source_count: int,
+    source_fingerprint: Optional[str] = None
+) -> dict:
+    """DatasheetCompetitiveContext row (see db_upsert_datasheet_competitive_contexts) for a synthesis."""
+    conflicts = aggregated.get("conflicts", [])
+    return {
+        "datasheetId": datasheet_id,
+        "factionId": faction_id,
+        "detachmentId": detachment_id,
+        "competitiveTier": aggregated.get("competitiveTier"),
+        "tierReasoning": aggregated.get("tierReasoning"),
+        "bestTargets": json.dumps(aggregated.get("bestTargets", [])),
+        "counters": json.dumps(aggregated.get("counters", [])),
+        "synergies": json.dumps(aggregated.get("synergies", [])),
+        "playstyleNotes": aggregated.get("playstyleNotes"),
+        "deploymentTips": aggregated.get("deploymentTips"),
+        "competitiveNotes": aggregated.get("competitiveNotes"),
+        "sourceCount": source_count,
+        "conflicts": json.dumps(conflicts) if conflicts else None,
+        "sourceFingerprint": source_fingerprint,
+    }
 
-Now synthesize all these perspectives into a single comprehensive competitive assessment. Note any conflicts between sources and explain your resolution.
 
-IMPORTANT - Synergy format: For synergies, provide structured objects with "unit" (name) and "why" (explanation). Example:
-{"unit": "Wolf Guard Battle Leader", "why": "Wolf-touched enhancement grants +1 to wound, complementing Anti-keywords"}"""
+def save_aggregated_contexts(entries: list) -> bool:
+    """
+    Store several syntheses in one batched statement / transaction.
 
-    return prompt
+    entries: [(row, aggregated)] with row from aggregated_context_row(). If the write
+    fails, each synthesis falls back to a local JSON file. Returns True if written to the DB.
+    """
+    if not entries:
+        return True
+    try:
+        db_upsert_datasheet_competitive_contexts([row for row, _ in entries])
+        return True
+    except Exception as e:
+        print(f"⚠️ Could not update database: {e}")
+        # Save locally as fallback
+        for row, aggregated in entries:
+            fallback_path = OUTPUT_DIR / f"{row['datasheetId']}_aggregated_context.json"
+            fallback_path.write_text(json.dumps(aggregated, indent=2), encoding="utf-8")
+            print(f"   Saved locally to: {fallback_path}")
+        return False
+
+
+def save_aggregated_context(
+    datasheet_id: str,
+    faction_id: Optional[str],
+    detachment_id: Optional[str],
+    aggregated: dict[str, Any],
+    source_count: int,
+    source_fingerprint: Optional[str] = None
+) -> bool:
+    """Store a synthesized context (falls back to a local JSON file). Returns True if written to the DB."""
+    row = aggregated_context_row(datasheet_id, faction_id, detachment_id, aggregated, source_count, source_fingerprint)
+    if not save_aggregated_contexts([(row, aggregated)]):
+        return False
+    print("✅ Datasheet context updated successfully!")
+    return True
 
 
 def aggregate_all_for_faction(
     api_url: str = None,
     faction_id: Optional[str] = None,
     faction_name: Optional[str] = None,
-    detachment_id: Optional[str] = None
+    detachment_id: Optional[str] = None,
+    concurrency: int = 1,
+    force: bool = False,
+    local_consensus: bool = False,
+    all_scopes: bool = False,
+    pack: bool = False
 ) -> int:
     """
     Aggregate competitive context for ALL datasheets with extracted context for a faction.
     Uses direct database connection (api_url parameter is kept for backward compatibility but ignored).
 
     This finds all datasheets that have at least one extracted DatasheetSource
-    for the specified faction, then runs aggregation for each one.
+    for the specified faction, then runs aggregation for each one. Up to
+    `concurrency` Gemini syntheses run at once (adaptive, see run_adaptive_pool);
+    database reads and writes stay on the calling thread. Units whose sources are
+    unchanged since their last aggregation are skipped unless force=True.
+
+    With all_scopes=True, each unit's sources are loaded once and partitioned by
+    the sources' faction/detachment (partition_sources_by_scope); the generic,
+    faction and detachment scopes that are stale are written, and scopes with
+    the same source set share one synthesis.
+
+    With pack=True, units with few sources are synthesized several per Gemini
+    call (pack_aggregation_jobs); results are still saved per unit.
     """
     print("\n🔄 AGGREGATE ALL UNITS FOR FACTION")
     print("=" * 50)
     print("Using direct database connection")
 
+    gemini_key = os.getenv("GOOGLE_API_KEY")
+    if not gemini_key:
+        print("⚠️ GOOGLE_API_KEY not found in .env.local")
+        return 1
+
     # Resolve faction ID from name if needed
     resolved_faction_id = faction_id
     resolved_faction_name = faction_name
@@ -2120,7 +4422,9 @@ def aggregate_all_for_faction(
             return 1
 
     print(f"Faction: {resolved_faction_name or resolved_faction_id}")
-    if detachment_id:
+    if all_scopes:
+        print("Scopes: all (generic, faction and detachment contexts from one pass)")
+    elif detachment_id:
         print(f"Detachment: {detachment_id}")
 
     # Get all datasheets with extracted context for this faction
@@ -2136,34 +4440,159 @@ def aggregate_all_for_faction(
             print(f"   • {ds['name']}")
 
         print(f"\n{'=' * 50}")
-        print("Starting aggregation...\n")
+        print(f"Starting aggregation (up to {concurrency} unit(s) at a time)...\n")
+
+        started = time.time()
+        ordered = sorted(datasheets, key=lambda x: x["name"])
+        succeeded = []
+        failed = []  # (name, error)
+        skipped = []
+        merged_locally = []
+        pending_writes = []  # (name, scope, row, aggregated) awaiting the next batched upsert
+        progress = count(1)
+
+        # Only units with new evidence since their last aggregation (one query each for the faction)
+        ids = [ds["id"] for ds in ordered]
+        unchanged = set()
+        unchanged_scopes = 0
+        if all_scopes:
+            # Per-scope fingerprints are computed from the loaded sources
+            source_fingerprints = {}
+            stored_fingerprints = {} if force else db_get_scope_fingerprints(ids)
+        else:
+            source_fingerprints = db_get_source_fingerprints(ids)
+            stored_fingerprints = {} if force else db_get_context_fingerprints(ids, resolved_faction_id, detachment_id)
+            unchanged = {
+                ds["id"] for ds in ordered
+                if source_fingerprints.get(ds["id"]) and source_fingerprints[ds["id"]] == stored_fingerprints.get(ds["id"])
+            }
+        if unchanged:
+            print(f"⏭️ {len(unchanged)} unit(s) unchanged since their last aggregation (use --force to include)")
+            ordered = [ds for ds in ordered if ds["id"] not in unchanged]
+
+        def jobs():
+            # Source loading stays on this thread: pages of units' sources,
+            # grouped by datasheet in `ordered` order and consumed as the pool
+            # asks for jobs. A job is one datasheet plus the scope(s) its
+            # synthesis is saved to.
+            nonlocal unchanged_scopes
+            loaded = db_iter_sources_for_aggregation([ds["id"] for ds in ordered], include_outdated=all_scopes)
+            next_group = None  # (datasheet_id, rows) read ahead; units without sources are not yielded
+            for index, ds in enumerate(ordered):
+                try:
+                    if next_group is None:
+                        next_group = next(loaded, (None, []))
+                except Exception as e:
+                    failed.extend((rest["name"], f"Could not load sources: {e}") for rest in ordered[index:])
+                    return
+                sources = []
+                if next_group[0] == ds["id"]:
+                    sources = next_group[1]
+                    next_group = None
+                if all_scopes:
+                    groups, unchanged_here = plan_scope_syntheses(
+                        ds["id"], sources, stored_fingerprints, force, resolved_faction_id
+                    )
+                    unchanged_scopes += len(unchanged_here)
+                    if not groups and unchanged_here:
+                        unchanged.add(ds["id"])
+                        continue
+                else:
+                    scope = (resolved_faction_id, detachment_id)
+                    groups = [{
+                        "scopes": [scope],
+                        "sources": sources,
+                        "fingerprints": {scope: source_fingerprints.get(ds["id"])},
+                    }] if sources else []
+                if not groups:
+                    skipped.append(ds["name"])
+                    continue
+                for group in groups:
+                    yield ds, group
+
+        def handle_one(job, synthesis, error):
+            ds, group = job
+            sources = group["sources"]
+            if all_scopes:
+                print(f"\n{ds['name']} ({len(sources)} source(s), {len(group['scopes'])} scope(s))")
+            else:
+                done = next(progress)
+                print(f"\n[{done}/{len(ordered)}] {ds['name']} ({len(sources)} source(s))")
+            if error or not synthesis.get("success"):
+                message = str(error) if error else synthesis.get("error")
+                print(f"   ❌ {message}")
+                failed.append((ds["name"], message))
+                return
+            aggregated = synthesis["aggregated"]
+            tier_note = ""
+            if synthesis.get("local"):
+                merged_locally.append(ds["name"])
+                tier_note = " (local consensus)"
+            print(f"   🏆 Tier: {aggregated.get('competitiveTier', '?')}{tier_note}")
+            for scope in group["scopes"]:
+                if all_scopes:
+                    print(f"   📤 Scope: {describe_scope(scope)}")
+                row = aggregated_context_row(
+                    ds["id"], scope[0], scope[1], aggregated, len(sources), group["fingerprints"].get(scope)
+                )
+                pending_writes.append((ds["name"], scope, row, aggregated))
+            if len(pending_writes) >= AGGREGATE_WRITE_BATCH_SIZE:
+                flush_writes()
+
+        def flush_writes():
+            # One batched upsert (one transaction) for the buffered contexts
+            if not pending_writes:
+                return
+            batch = list(pending_writes)
+            pending_writes.clear()
+            if save_aggregated_contexts([(row, aggregated) for _, _, row, aggregated in batch]):
+                print(f"\n💾 Wrote {len(batch)} context(s) to the database")
+                succeeded.extend(name for name, _, _, _ in batch)
+            else:
+                failed.extend(
+                    (name, f"Database update failed for {describe_scope(scope)} (saved locally)")
+                    for name, scope, _, _ in batch
+                )
 
-        success_count = 0
-        error_count = 0
+        def handle(job_pack, syntheses, error):
+            for i, job in enumerate(job_pack):
+                handle_one(job, syntheses[i] if syntheses else None, error)
 
-        for i, ds in enumerate(sorted(datasheets, key=lambda x: x["name"]), 1):
-            print(f"\n[{i}/{len(datasheets)}] Aggregating: {ds['name']}")
-            print("-" * 40)
+        def unit_of(job):
+            return job[0], job[1]["sources"]
 
-            result = aggregate_datasheet_context(
-                datasheet_id=ds["id"],
-                faction_id=resolved_faction_id,
-                detachment_id=detachment_id
+        packs = pack_aggregation_jobs(jobs(), unit_of) if pack else ([job] for job in jobs())
+        try:
+            run_adaptive_pool(
+                packs,
+                lambda job_pack: synthesize_pack(job_pack, gemini_key, local_consensus, unit_of),
+                handle,
+                concurrency
             )
-
-            if result == 0:
-                success_count += 1
-            else:
-                error_count += 1
-                print(f"   ⚠️ Failed to aggregate {ds['name']}")
+        finally:
+            # Also on interrupt: keep the syntheses already paid for
+            flush_writes()
+        if all_scopes and unchanged_scopes:
+            print(f"\n⏭️ {unchanged_scopes} scope(s) unchanged since their last aggregation (use --force to include)")
 
         print(f"\n{'=' * 50}")
-        print(f"✅ AGGREGATION COMPLETE")
-        print(f"   Success: {success_count}/{len(datasheets)}")
-        if error_count > 0:
-            print(f"   Errors: {error_count}")
-
-        return 0 if error_count == 0 else 1
+        print(f"✅ AGGREGATION COMPLETE ({time.time() - started:.0f}s)")
+        if all_scopes:
+            print(f"   Contexts written: {len(succeeded)} across {len(set(succeeded))} unit(s)")
+        else:
+            print(f"   Success: {len(succeeded)}/{len(datasheets)}")
+        if merged_locally:
+            print(f"   Merged locally (sources agree, no LLM call): {len(merged_locally)}")
+        if unchanged:
+            print(f"   Unchanged (skipped): {len(unchanged)}")
+        if skipped:
+            print(f"   Skipped (no valid sources): {len(skipped)}")
+        if failed:
+            print(f"   Errors: {len(failed)}")
+            for name, message in failed:
+                print(f"      • {name}: {message[:200]}")
+
+        return 0 if not failed else 1
 
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -2177,7 +4606,11 @@ def aggregate_datasheet_context(
     datasheet_id: Optional[str] = None,
     datasheet_name: Optional[str] = None,
     faction_id: Optional[str] = None,
-    detachment_id: Optional[str] = None
+    detachment_id: Optional[str] = None,
+    force: bool = False,
+    local_consensus: bool = False,
+    all_scopes: bool = False,
+    concurrency: int = 1
 ) -> int:
     """
     Aggregate all sources for a datasheet and synthesize competitive context.
@@ -2191,13 +4624,23 @@ def aggregate_datasheet_context(
     - faction_id=None, detachment_id=None: Generic context for all armies
     - faction_id set, detachment_id=None: Faction-specific context
     - faction_id set, detachment_id set: Detachment-specific context
+
+    Skipped when no source was added, extracted or outdated since the last
+    aggregation in this scope (stored source fingerprint), unless force=True.
+    With local_consensus=True, sources that clearly agree are merged locally
+    without a Gemini call.
+
+    all_scopes=True ignores faction_id/detachment_id and writes every scope the
+    sources support in one pass (see aggregate_datasheet_scopes).
     """
     print("\n🔄 AGGREGATE MODE")
     print("=" * 50)
     print("Using direct database connection")
 
     # Display scope
-    if detachment_id:
+    if all_scopes:
+        print("Scope: All (generic, faction and detachment contexts from one pass)")
+    elif detachment_id:
         print(f"Scope: Detachment-specific (factionId={faction_id}, detachmentId={detachment_id})")
     elif faction_id:
         print(f"Scope: Faction-specific (factionId={faction_id})")
@@ -2229,6 +4672,20 @@ def aggregate_datasheet_context(
         print("❌ Must provide --datasheet-id or --datasheet-name")
         return 1
 
+    if all_scopes:
+        return aggregate_datasheet_scopes(datasheet_id, gemini_key, force, local_consensus, concurrency)
+
+    # Skip when nothing changed since the last aggregation (fingerprint taken before loading sources)
+    try:
+        source_fingerprint = db_get_source_fingerprints([datasheet_id]).get(datasheet_id)
+        stored_fingerprint = db_get_context_fingerprints([datasheet_id], faction_id, detachment_id).get(datasheet_id)
+    except Exception as e:
+        print(f"⚠️ Could not compare source fingerprints: {e}")
+        source_fingerprint = stored_fingerprint = None
+    if not force and source_fingerprint and source_fingerprint == stored_fingerprint:
+        print("\n⏭️ Sources unchanged since the last aggregation - skipping (use --force to re-aggregate)")
+        return 0
+
     # Fetch sources for this datasheet directly from database
     print(f"\n📡 Fetching sources for datasheet {datasheet_id}...")
 
@@ -2236,10 +4693,7 @@ def aggregate_datasheet_context(
         sources = db_get_datasheet_sources_for_aggregation(datasheet_id)
 
         # Get datasheet info
-        conn = get_db_connection()
-        with conn.cursor() as cur:
-            cur.execute('SELECT id, name, faction FROM "Datasheet" WHERE id = %s', (datasheet_id,))
-            datasheet = cur.fetchone()
+        datasheet = db_get_datasheet(datasheet_id)
 
         if not datasheet:
             print("❌ Datasheet not found")
@@ -2265,329 +4719,992 @@ def aggregate_datasheet_context(
         type_icon = {"youtube": "📺", "reddit": "🔴", "article": "📄", "forum": "💬"}.get(s.get("sourceType", ""), "🌐")
         print(f"   {type_icon} {s.get('sourceTitle', s.get('sourceUrl', 'Unknown'))}")
     
-    # Build the aggregation prompt
-    system_prompt = build_aggregate_system_prompt()
-    user_prompt = build_aggregate_user_prompt(
-        datasheet.get("name", "Unknown"),
-        datasheet.get("faction", "Unknown"),
-        valid_sources
-    )
-    
     # Call Gemini API
     print(f"\n🤖 Calling Gemini ({GEMINI_MODEL}) to synthesize...")
-    gemini_url = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent?key={gemini_key}"
+    synthesis = synthesize_datasheet_context(datasheet, valid_sources, gemini_key, local_consensus)
+    if not synthesis["success"]:
+        print(f"❌ {synthesis['error']}")
+        return 1
+    aggregated = synthesis["aggregated"]
+    if synthesis.get("local"):
+        print("✅ Sources agree - context merged locally (no LLM call)")
+    else:
+        print("✅ Context synthesized successfully!")
+
+    print_aggregated_context(aggregated)
+
+    # Update the datasheet competitive context directly in database
+    scope_desc = "generic"
+    if detachment_id:
+        scope_desc = "detachment-specific"
+    elif faction_id:
+        scope_desc = "faction-specific"
+
+    print(f"\n📤 Updating datasheet competitive context ({scope_desc})...")
+    save_aggregated_context(datasheet_id, faction_id, detachment_id, aggregated, len(valid_sources), source_fingerprint)
     
+    print("\n✅ Done!")
+    return 0
+
+
+def aggregate_datasheet_scopes(
+    datasheet_id: str,
+    gemini_key: str,
+    force: bool = False,
+    local_consensus: bool = False,
+    concurrency: int = 1
+) -> int:
+    """
+    Aggregate every scope of one datasheet from a single source load.
+
+    Sources are partitioned by their faction/detachment (partition_sources_by_scope);
+    scopes whose sources are unchanged are skipped unless force=True, and scopes
+    with identical source sets share one synthesis.
+    """
+    print(f"\n📡 Fetching sources for datasheet {datasheet_id}...")
+    try:
+        sources = db_get_datasheet_sources_for_aggregation(datasheet_id, include_outdated=True)
+        datasheet = db_get_datasheet(datasheet_id)
+        stored_fingerprints = {} if force else db_get_scope_fingerprints([datasheet_id])
+    except Exception as e:
+        print(f"❌ Error fetching sources: {e}")
+        return 1
+
+    if not datasheet:
+        print("❌ Datasheet not found")
+        return 1
+
+    groups, unchanged = plan_scope_syntheses(datasheet_id, sources, stored_fingerprints, force)
+    print(f"📋 Datasheet: {datasheet['name']} ({datasheet['faction']})")
+    print(f"   Valid sources: {sum(1 for s in sources if not s.get('isOutdated'))}")
+    for scope in unchanged:
+        print(f"   ⏭️ {describe_scope(scope)}: unchanged since the last aggregation")
+    if not groups:
+        if unchanged:
+            print("\n⏭️ All scopes unchanged - skipping (use --force to re-aggregate)")
+        else:
+            print("\n⚠️ No valid sources to aggregate")
+            print("   Sources must be 'extracted' and not 'outdated'")
+        return 0
+
+    print(f"\n🤖 Synthesizing {len(groups)} distinct source set(s) for "
+          f"{sum(len(g['scopes']) for g in groups)} scope(s) with {GEMINI_MODEL}...")
+    failed = []
+
+    def handle(group, synthesis, error):
+        scopes = ", ".join(describe_scope(scope) for scope in group["scopes"])
+        print(f"\n📚 {len(group['sources'])} source(s) → {scopes}")
+        if error or not synthesis.get("success"):
+            message = str(error) if error else synthesis.get("error")
+            print(f"❌ {message}")
+            failed.append(message)
+            return
+        aggregated = synthesis["aggregated"]
+        if synthesis.get("local"):
+            print("✅ Sources agree - context merged locally (no LLM call)")
+        print_aggregated_context(aggregated)
+        for scope in group["scopes"]:
+            print(f"\n📤 Updating datasheet competitive context ({describe_scope(scope)})...")
+            if not save_aggregated_context(
+                datasheet_id, scope[0], scope[1], aggregated, len(group["sources"]),
+                group["fingerprints"].get(scope)
+            ):
+                failed.append(describe_scope(scope))
+
+    run_adaptive_pool(
+        iter(groups),
+        lambda group: synthesize_datasheet_context(datasheet, group["sources"], gemini_key, local_consensus),
+        handle,
+        concurrency
+    )
+
+    print("\n✅ Done!" if not failed else f"\n⚠️ Done with {len(failed)} error(s)")
+    return 0 if not failed else 1
+
+
+# ============================================
+# PACKED MULTI-UNIT AGGREGATION
+# ============================================
+
+# Units with only a few sources are synthesized several per call, keyed by datasheet ID
+MULTI_AGGREGATED_CONTEXT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "contexts": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "datasheetId": {
+                        "type": "string",
+                        "description": "The ID of the requested unit, exactly as given"
+                    },
+                    **AGGREGATED_CONTEXT_SCHEMA["properties"],
+                },
+                "required": ["datasheetId"] + AGGREGATED_CONTEXT_SCHEMA["required"]
+            },
+            "description": "Exactly one entry per requested unit"
+        }
+    },
+    "required": ["contexts"]
+}
+
+AGGREGATE_PACK_MAX_SOURCES = 2  # Units with more sources get their own call
+AGGREGATE_PACK_PROMPT_TOKEN_BUDGET = AGGREGATE_PROMPT_TOKEN_BUDGET
+AGGREGATE_PACK_OUTPUT_HEADROOM = 0.75  # Plan packs to use at most 75% of the output limit
+AGGREGATE_PACK_MAX_UNITS = max(
+    1, int(GEMINI_MAX_OUTPUT_TOKENS * AGGREGATE_PACK_OUTPUT_HEADROOM // AGGREGATE_EXPECTED_OUTPUT_TOKENS)
+)
+
+
+def build_packed_unit_section(datasheet: dict[str, Any], sources: list) -> str:
+    """One unit's part of a packed aggregation prompt: consensus summary plus per-source prose."""
+    consensus = build_consensus_summary(preaggregate_sources(sources))
+    blocks = "".join(build_aggregate_source_block(i, s, None, False) for i, s in enumerate(sources, 1))
+    return f"""
+=== UNIT {datasheet['id']}: "{datasheet.get('name', 'Unknown')}" ({datasheet.get('faction', 'Unknown')}) - {len(sources)} source(s) ===
+{consensus}
+PER-SOURCE ASSESSMENTS:
+{blocks}"""
+
+
+def build_packed_aggregate_user_prompt(sections: list) -> str:
+    """Prompt asking for one synthesized context per packed unit."""
+    return f"""Synthesize competitive context for EACH of the following {len(sections)} units. Every unit has its own sources - never use one unit's sources for another.
+{"".join(sections)}
+---
+
+For each unit, synthesize its sources into a single competitive assessment. Note any conflicts between sources and explain your resolution.
+Return exactly one entry in "contexts" per unit, with "datasheetId" set to the ID from the unit's heading.
+
+IMPORTANT - Synergy format: For synergies, provide structured objects with "unit" (name) and "why" (explanation). Example:
+{{"unit": "Wolf Guard Battle Leader", "why": "Wolf-touched enhancement grants +1 to wound, complementing Anti-keywords"}}"""
+
+
+def pack_aggregation_jobs(jobs, unit_of=lambda job: job):
+    """
+    Group aggregation jobs into packs for synthesize_pack.
+
+    unit_of(job) -> (datasheet, sources). Units with more than
+    AGGREGATE_PACK_MAX_SOURCES sources are yielded alone; small units are
+    collected until the prompt budget or AGGREGATE_PACK_MAX_UNITS is reached
+    (a datasheet appears at most once per pack). Yields lists of jobs.
+    """
+    pack: list = []
+    pack_ids: set = set()
+    pack_tokens = 0
+    for job in jobs:
+        datasheet, sources = unit_of(job)
+        if len(sources) > AGGREGATE_PACK_MAX_SOURCES:
+            yield [job]
+            continue
+        tokens = estimate_tokens(build_packed_unit_section(datasheet, sources))
+        if pack and (
+            pack_tokens + tokens > AGGREGATE_PACK_PROMPT_TOKEN_BUDGET
+            or len(pack) >= AGGREGATE_PACK_MAX_UNITS
+            or datasheet["id"] in pack_ids
+        ):
+            yield pack
+            pack, pack_ids, pack_tokens = [], set(), 0
+        pack.append(job)
+        pack_ids.add(datasheet["id"])
+        pack_tokens += tokens
+    if pack:
+        yield pack
+
+
+def synthesize_datasheet_contexts_packed(
+    items: list,
+    gemini_key: str,
+    local_consensus: bool = False
+) -> list:
+    """
+    Synthesize several small units in one Gemini call.
+
+    items: list of (datasheet, sources) with distinct datasheet IDs.
+    Returns one synthesize_datasheet_context()-shaped result per item, in order.
+    Truncated packs are split in half and retried; units missing from a
+    response are synthesized on their own.
+    """
+    results: list = [None] * len(items)
+    pending = []
+    for index, (datasheet, sources) in enumerate(items):
+        pre = preaggregate_sources(sources)
+        if local_consensus and has_local_consensus(pre):
+            results[index] = {"success": True, "aggregated": build_consensus_context(pre, sources), "local": True}
+        else:
+            pending.append(index)
+
+    if len(pending) == 1:
+        datasheet, sources = items[pending[0]]
+        results[pending[0]] = synthesize_datasheet_context(datasheet, sources, gemini_key)
+    if len(pending) <= 1:
+        return results
+
+    sections = [build_packed_unit_section(*items[i]) for i in pending]
     payload = {
-        "contents": [
-            {
-                "role": "user",
-                "parts": [{"text": user_prompt}]
-            }
-        ],
-        "systemInstruction": {
-            "parts": [{"text": system_prompt}]
-        },
+        "contents": [{"role": "user", "parts": [{"text": build_packed_aggregate_user_prompt(sections)}]}],
+        "systemInstruction": {"parts": [{"text": build_aggregate_system_prompt()}]},
         "generationConfig": {
             "temperature": 0.3,
-            "maxOutputTokens": 65536,
+            "maxOutputTokens": plan_output_tokens(AGGREGATE_EXPECTED_OUTPUT_TOKENS * len(pending)),
             "responseMimeType": "application/json",
-            "responseSchema": AGGREGATED_CONTEXT_SCHEMA
+            "responseSchema": MULTI_AGGREGATED_CONTEXT_SCHEMA
         }
     }
-    
+
+    def fail_all(error: str) -> list:
+        for i in pending:
+            results[i] = {"success": False, "error": error}
+        return results
+
     try:
-        response = requests_with_retry(
-            "POST", gemini_url,
-            headers={"Content-Type": "application/json"},
-            json=payload,
-            timeout=600  # 10 min timeout with retries
-        )
-        
-        if response.status_code != 200:
-            print(f"❌ Gemini API error: {response.status_code}")
-            print(f"   {response.text[:500]}")
-            return 1
-        
-        result = response.json()
-        candidates = result.get("candidates", [])
-        if not candidates:
-            print("❌ No response from Gemini")
-            return 1
-        
-        response_text = candidates[0].get("content", {}).get("parts", [{}])[0].get("text", "")
-        if not response_text:
-            print("❌ Empty response from Gemini")
-            return 1
-        
-        aggregated = json.loads(response_text)
-        print("✅ Context synthesized successfully!")
-        
+        response = gemini_generate(payload, gemini_key)
     except Exception as e:
-        print(f"❌ Error calling Gemini: {e}")
-        return 1
-    
-    # Display the results
-    print(f"\n{'=' * 50}")
-    print(f"📊 SYNTHESIZED COMPETITIVE CONTEXT")
-    print("=" * 50)
-    
-    if aggregated.get("competitiveTier"):
-        print(f"\n🏆 Tier: {aggregated['competitiveTier']}")
-    if aggregated.get("tierReasoning"):
-        print(f"   {aggregated['tierReasoning']}")
-    
-    if aggregated.get("bestTargets"):
-        print(f"\n🎯 Best Targets: {', '.join(aggregated['bestTargets'])}")
-    if aggregated.get("counters"):
-        print(f"⚠️ Counters: {', '.join(aggregated['counters'])}")
-    if aggregated.get("synergies"):
-        synergies = aggregated['synergies']
-        if synergies and isinstance(synergies[0], dict):
-            print(f"🤝 Synergies:")
-            for s in synergies:
-                if isinstance(s, dict):
-                    print(f"   • {s.get('unit', 'Unknown')}: {s.get('why', 'No explanation')}")
+        return fail_all(f"Error calling Gemini: {e}")
+    if response.status_code != 200:
+        return fail_all(f"Gemini API error {response.status_code}: {response.text[:500]}")
+
+    result = response.json()
+    candidates = result.get("candidates", [])
+    finish_reason = candidates[0].get("finishReason") if candidates else None
+    parsed = None
+    if candidates:
+        parts = candidates[0].get("content", {}).get("parts", [])
+        try:
+            parsed = json.loads(parts[0].get("text", "")) if parts else None
+        except json.JSONDecodeError:
+            parsed = None
+
+    if finish_reason == "MAX_TOKENS" or not isinstance(parsed, dict):
+        half = len(pending) // 2
+        print(f"   ⚠️ Packed aggregation of {len(pending)} units unusable (finishReason={finish_reason}), "
+              f"splitting into {half} + {len(pending) - half}")
+        for chunk in (pending[:half], pending[half:]):
+            for i, r in zip(chunk, synthesize_datasheet_contexts_packed(
+                [items[i] for i in chunk], gemini_key
+            )):
+                results[i] = r
+        return results
+
+    entries = {
+        str(e.get("datasheetId")): e for e in parsed.get("contexts", []) if isinstance(e, dict)
+    }
+    missing = []
+    for i in pending:
+        entry = entries.get(str(items[i][0]["id"]))
+        if entry is None:
+            missing.append(i)
+            continue
+        aggregated = {k: v for k, v in entry.items() if k != "datasheetId"}
+        results[i] = {"success": True, "aggregated": aggregated, "local": False}
+
+    if missing:
+        print(f"   ⚠️ {len(missing)} unit(s) missing from packed response, synthesizing them individually")
+        for i in missing:
+            datasheet, sources = items[i]
+            results[i] = synthesize_datasheet_context(datasheet, sources, gemini_key)
+    return results
+
+
+def synthesize_pack(pack: list, gemini_key: str, local_consensus: bool = False, unit_of=lambda job: job) -> list:
+    """Synthesize a pack from pack_aggregation_jobs: one call for the whole pack, or a regular call for a single unit."""
+    items = [unit_of(job) for job in pack]
+    if len(items) == 1:
+        return [synthesize_datasheet_context(items[0][0], items[0][1], gemini_key, local_consensus)]
+    print(f"   📦 Packing {len(items)} small unit(s) into one aggregation call")
+    return synthesize_datasheet_contexts_packed(items, gemini_key, local_consensus)
+
+
+# ============================================
+# TRANSCRIPT COMPACTION
+# ============================================
+
+# Applied to fetched YouTube transcripts before they are stored (raw text is kept in rawContent)
+COMPACT_MAX_SEGMENT_WORDS = 25  # Unpunctuated captions are segmented into runs of this many words
+COMPACT_MAX_REPEAT_WORDS = 30  # Longest immediately-repeated phrase collapsed (rolling auto-captions)
+COMPACT_MIN_DUPLICATE_WORDS = 5  # Shorter segments are never dropped as duplicates
+COMPACT_MAX_SPONSOR_SEGMENTS = 8  # Hard cap on how much text one sponsor read can remove
+
+_FILLER_RE = re.compile(
+    # Not \b: an apostrophe is a word boundary, so "Ah'ra" would lose its "Ah"
+    r"(?i)(?:(?<![\w'])(?:u+m+|u+h+m*|e+r+m+|hmm+|mhm+|ah+)(?![\w'])[,.]?\s*|,\s*(?:you know|i mean)\s*,)"
+)
+_SEGMENT_SPLIT_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+_DUPLICATE_KEY_RE = re.compile(r"[.,!?;:]+(?=\s|$)")  # Sentence punctuation only: "4+" and 6" stay distinct
+_SPONSOR_START_RE = re.compile(
+    r"(?i)\b(?:sponsored by|today'?s sponsor|thanks? (?:to|you to) (?:our|today'?s) sponsor|"
+    r"this (?:video|episode) is (?:brought to you|sponsored)|a word from our sponsor|"
+    r"support (?:the|this) channel (?:on|through|via) patreon)\b"
+)
+_SPONSOR_BODY_RE = re.compile(
+    r"(?i)\b(?:sponsor|promo code|discount|code \w+|% off|percent off|link (?:below|in the description)|"
+    r"description below|patreon|merch|free trial|sign up|use my link|affiliate)\b"
+)
+_SPONSOR_END_RE = re.compile(
+    r"(?i)\b(?:back to (?:the|our) (?:video|list|topic)|without further ado|let'?s (?:get|jump|dive) (?:into|in|started)|"
+    r"anyway|on to the)\b"
+)
+
+
+def _compact_segments(text: str) -> list:
+    """Split into sentences; split unpunctuated runs (auto-captions) into fixed-size pieces."""
+    segments = []
+    for sentence in _SEGMENT_SPLIT_RE.split(text):
+        words = sentence.split()
+        if len(words) <= 2 * COMPACT_MAX_SEGMENT_WORDS:
+            if words:
+                segments.append(" ".join(words))
+            continue
+        for i in range(0, len(words), COMPACT_MAX_SEGMENT_WORDS):
+            segments.append(" ".join(words[i:i + COMPACT_MAX_SEGMENT_WORDS]))
+    return segments
+
+
+def _collapsible(phrase: list) -> bool:
+    """Repeats are only collapsed for words: "4 4+" or "2 2" are game stats, not stutters."""
+    if any(any(ch.isdigit() for ch in word) for word in phrase):
+        return False
+    return len(phrase) > 1 or phrase[0].isalpha()
+
+
+def _collapse_repeats(words: list) -> list:
+    """
+    Drop immediately repeated phrases ("the the", rolling-caption overlap
+    "A B C | B C D"): after each word, remove the tail if it repeats the
+    phrase right before it. Words are compared as written (ignoring case);
+    phrases with numbers are never collapsed. Candidates are pre-filtered on
+    the last word, so this stays linear in practice.
+    """
+    out: list = []
+    keys: list = []
+    for word in words:
+        out.append(word)
+        keys.append(word.lower())
+        last = keys[-1]
+        for n in range(min(COMPACT_MAX_REPEAT_WORDS, len(keys) // 2), 0, -1):
+            if keys[-n - 1] == last and keys[-n:] == keys[-2 * n:-n] and _collapsible(out[-n:]):
+                del out[-n:]
+                del keys[-n:]
+                break
+    return out
+
+
+def compact_transcript(text: str) -> tuple[str, dict[str, int]]:
+    """
+    Remove filler words, stutters and rolling-caption overlap, sponsor reads
+    and repeated sentences from a spoken transcript (captions or Whisper).
+
+    Sentences count as repeated when they match exactly, ignoring case,
+    whitespace and sentence punctuation. Line breaks are kept. Linear in the
+    size of the text. Returns (compacted_text, stats).
+    """
+    stats = {"fillers": 0, "repeats": 0, "sponsor": 0, "duplicates": 0}
+    if not text:
+        return text, stats
+
+    text, stats["fillers"] = _FILLER_RE.subn(" ", text)
+
+    lines = []
+    seen = set()
+    sponsor_left = 0
+    for line in text.split("\n"):
+        words = line.split()
+        if not words:
+            lines.append("")
+            continue
+        collapsed = _collapse_repeats(words)
+        stats["repeats"] += len(words) - len(collapsed)
+
+        # Segment boundaries are re-derived after collapsing
+        kept = []
+        for segment in _compact_segments(" ".join(collapsed)):
+            if _SPONSOR_START_RE.search(segment):
+                sponsor_left = COMPACT_MAX_SPONSOR_SEGMENTS
+                stats["sponsor"] += 1
+                continue
+            if sponsor_left:
+                if _SPONSOR_END_RE.search(segment) or not _SPONSOR_BODY_RE.search(segment):
+                    sponsor_left = 0
+                else:
+                    sponsor_left -= 1
+                    stats["sponsor"] += 1
+                    continue
+
+            key = " ".join(_DUPLICATE_KEY_RE.sub(" ", segment.lower()).split())
+            if len(key.split()) >= COMPACT_MIN_DUPLICATE_WORDS:
+                if key in seen:
+                    stats["duplicates"] += 1
+                    continue
+                seen.add(key)
+            kept.append(segment)
+        if kept:
+            lines.append(" ".join(kept))
+
+    return "\n".join(lines).strip("\n"), stats
+
+
+# ============================================
+# SOURCE CONTENT STORAGE
+# ============================================
+
+# How fetched text is stored on CompetitiveSource (readers handle every mode):
+#   inline - plain text in content/rawContent
+#   zstd   - zstd-compressed in contentCompressed/rawContentCompressed
+#   blob   - like zstd, but bodies of SOURCE_BLOB_MIN_CHARS or more go to a private
+#            Supabase Storage bucket, addressed by contentHash (rawContentHash for the raw text)
+SOURCE_CONTENT_STORAGE = os.getenv("SOURCE_CONTENT_STORAGE", "inline")
+SOURCE_CONTENT_BUCKET = os.getenv("SOURCE_CONTENT_BUCKET", "competitive-source-content")
+SOURCE_BLOB_MIN_CHARS = int(os.getenv("SOURCE_BLOB_MIN_CHARS", "20000"))
+SOURCE_CONTENT_ZSTD_LEVEL = 10
+SOURCE_CONTENT_MODES = ("inline", "zstd", "blob")
+
+
+def _require_zstd() -> None:
+    if not HAS_ZSTD:
+        raise RuntimeError("zstandard not installed (pip install zstandard)")
+
+
+def compress_text(text: str) -> bytes:
+    _require_zstd()
+    return zstandard.ZstdCompressor(level=SOURCE_CONTENT_ZSTD_LEVEL).compress(text.encode("utf-8"))
+
+
+def decompress_text(data) -> str:
+    _require_zstd()
+    return zstandard.ZstdDecompressor().decompress(bytes(data)).decode("utf-8")
+
+
+def _content_blob_request(method: str, content_hash: str, **kwargs) -> requests.Response:
+    base_url = os.getenv("NEXT_PUBLIC_SUPABASE_URL") or os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not base_url or not key:
+        raise RuntimeError("Blob storage needs NEXT_PUBLIC_SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY")
+    url = f"{base_url.rstrip('/')}/storage/v1/object/{SOURCE_CONTENT_BUCKET}/{content_hash[:2]}/{content_hash}.zst"
+    headers = {"Authorization": f"Bearer {key}", "apikey": key, **kwargs.pop("headers", {})}
+    return requests_with_retry(method, url, headers=headers, timeout=60, **kwargs)
+
+
+def upload_content_blob(content_hash: str, data: bytes) -> None:
+    """Store compressed content under its hash (idempotent: same hash, same bytes)."""
+    response = _content_blob_request(
+        "POST", content_hash, data=data,
+        headers={"Content-Type": "application/zstd", "x-upsert": "true"}
+    )
+    if response.status_code not in (200, 201):
+        raise RuntimeError(f"Blob upload failed: HTTP {response.status_code} {response.text[:200]}")
+
+
+def download_content_blob(content_hash: str) -> bytes:
+    response = _content_blob_request("GET", content_hash)
+    if response.status_code != 200:
+        raise RuntimeError(f"Blob download failed: HTTP {response.status_code} {response.text[:200]}")
+    return response.content
+
+
+def stored_content_fields(content: str, raw_content: Optional[str] = None, mode: str = None) -> dict:
+    """
+    db_update_source_status fields storing fetched text in the given mode
+    (default SOURCE_CONTENT_STORAGE). Columns of the other modes are cleared.
+    """
+    mode = mode or SOURCE_CONTENT_STORAGE
+    if mode not in SOURCE_CONTENT_MODES:
+        raise ValueError(f"Unknown SOURCE_CONTENT_STORAGE: {mode}")
+
+    fields = {
+        "contentHash": hashlib.sha256(content.encode("utf-8")).hexdigest(),
+        "contentLength": len(content),
+    }
+    if mode == "inline":
+        return {
+            **fields,
+            "content": content,
+            "rawContent": raw_content if raw_content is not None else SET_NULL,
+            "contentEncoding": SET_NULL,
+            "contentCompressed": SET_NULL,
+            "rawContentCompressed": SET_NULL,
+            "rawContentHash": SET_NULL,
+        }
+
+    compressed = compress_text(content)
+    fields.update({"content": SET_NULL, "rawContent": SET_NULL, "rawContentCompressed": SET_NULL, "rawContentHash": SET_NULL})
+    if mode == "blob" and len(content) >= SOURCE_BLOB_MIN_CHARS:
+        upload_content_blob(fields["contentHash"], compressed)
+        fields.update({"contentEncoding": "blob", "contentCompressed": SET_NULL})
+    else:
+        fields.update({"contentEncoding": "zstd", "contentCompressed": compressed})
+
+    # The raw text is larger than the compacted content, so it leaves the row on the same terms
+    if raw_content:
+        if mode == "blob" and len(raw_content) >= SOURCE_BLOB_MIN_CHARS:
+            fields["rawContentHash"] = hashlib.sha256(raw_content.encode("utf-8")).hexdigest()
+            upload_content_blob(fields["rawContentHash"], compress_text(raw_content))
         else:
-            print(f"🤝 Synergies: {', '.join(synergies)}")
+            fields["rawContentCompressed"] = compress_text(raw_content)
+    return fields
 
-    if aggregated.get("playstyleNotes"):
-        print(f"\n📖 Playstyle: {aggregated['playstyleNotes']}")
-    if aggregated.get("deploymentTips"):
-        print(f"📍 Deployment: {aggregated['deploymentTips']}")
-    
-    # Show conflicts if any
-    conflicts = aggregated.get("conflicts", [])
-    if conflicts:
-        print(f"\n⚡ DETECTED CONFLICTS ({len(conflicts)}):")
-        for c in conflicts:
-            print(f"   • {c.get('field', 'Unknown')}: {c.get('disagreement', '')}")
-            print(f"     → Resolution: {c.get('resolution', '')}")
-    
-    # Update the datasheet competitive context directly in database
-    scope_desc = "generic"
-    if detachment_id:
-        scope_desc = "detachment-specific"
-    elif faction_id:
-        scope_desc = "faction-specific"
 
-    print(f"\n📤 Updating datasheet competitive context ({scope_desc})...")
+def source_content_text(row: dict) -> Optional[str]:
+    """
+    Fetched text of a CompetitiveSource row (content, contentEncoding,
+    contentCompressed, contentHash), decompressed/downloaded only when called.
+    """
+    encoding = row.get("contentEncoding")
+    if not encoding:
+        return row.get("content")
+    if encoding == "zstd":
+        return decompress_text(row["contentCompressed"])
+    if encoding == "blob":
+        text = decompress_text(download_content_blob(row["contentHash"]))
+        if hashlib.sha256(text.encode("utf-8")).hexdigest() != row["contentHash"]:
+            raise RuntimeError(f"Blob {row['contentHash']} does not match its hash")
+        return text
+    raise ValueError(f"Unknown contentEncoding: {encoding}")
+
+
+def convert_stored_content(mode: str = None) -> int:
+    """Rewrite sources still stored as plain text in the configured storage mode (--convert-content-storage)."""
+    mode = mode or SOURCE_CONTENT_STORAGE
+    if mode == "inline":
+        print("ℹ️ SOURCE_CONTENT_STORAGE is 'inline' - nothing to convert (set it to 'zstd' or 'blob')")
+        return 0
 
+    print(f"\n🗜️ CONVERT SOURCE CONTENT STORAGE (→ {mode})")
+    print("=" * 50)
+    converted = 0
+    chars = 0
     try:
-        db_upsert_datasheet_competitive_context(
-            datasheet_id=datasheet_id,
-            faction_id=faction_id,
-            detachment_id=detachment_id,
-            competitiveTier=aggregated.get("competitiveTier"),
-            tierReasoning=aggregated.get("tierReasoning"),
-            bestTargets=json.dumps(aggregated.get("bestTargets", [])),
-            counters=json.dumps(aggregated.get("counters", [])),
-            synergies=json.dumps(aggregated.get("synergies", [])),
-            playstyleNotes=aggregated.get("playstyleNotes"),
-            deploymentTips=aggregated.get("deploymentTips"),
-            competitiveNotes=aggregated.get("competitiveNotes"),
-            sourceCount=len(valid_sources),
-            conflicts=json.dumps(conflicts) if conflicts else None,
-        )
-        print("✅ Datasheet context updated successfully!")
+        for row in db_iter_inline_source_content():
+            try:
+                fields = stored_content_fields(row["content"], row.get("rawContent"), mode)
+            except Exception as e:
+                print(f"   ❌ {row['id']}: {e}")
+                continue
+            try:
+                if not db_update_source_content(row["id"], fields):
+                    continue
+            except Exception as e:
+                print(f"   ❌ {row['id']}: {e}")
+                continue
+            converted += 1
+            chars += len(row["content"]) + len(row.get("rawContent") or "")
     except Exception as e:
-        print(f"⚠️ Could not update database: {e}")
-        # Save locally as fallback
-        fallback_path = OUTPUT_DIR / f"{datasheet_id}_aggregated_context.json"
-        fallback_path.write_text(json.dumps(aggregated, indent=2), encoding="utf-8")
-        print(f"   Saved locally to: {fallback_path}")
-    
-    print("\n✅ Done!")
+        print(f"❌ Error reading sources: {e}")
+        return 1
+
+    print(f"✅ Converted {converted} source(s) ({chars:,} chars of text)")
     return 0
 
 
 # ============================================
-# NEW PIPELINE: Faction-Level Source Processing
+# WORK-QUEUE LEASES
 # ============================================
 
-def fetch_pending_sources(api_url: str = None, no_whisper: bool = False) -> int:
-    """
-    Fetch content for CompetitiveSources with status 'pending'.
-    Uses direct database connection (api_url parameter is kept for backward compatibility but ignored).
+# With --claim-size, pipeline stages lease rows in batches so several workers
+# (processes or machines) can run the same stage without double-processing
+PIPELINE_WORKER_ID = os.getenv("PIPELINE_WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}"
+PIPELINE_LEASE_SECONDS = int(os.getenv("PIPELINE_LEASE_SECONDS", "600"))
+LEASE_TABLES = ("CompetitiveSource", "DatasheetSource")
 
-    This is the FIRST step in the new pipeline:
-    1. FETCH: Download content (this function)
-    2. CURATE: AI identifies which units are mentioned
-    3. EXTRACT: AI extracts unit-specific context
-    4. AGGREGATE: Synthesize all sources for a unit
+
+class LeaseHeartbeat:
+    """
+    Keep this worker's leases on a batch of rows alive while it is processed
+    (renewed every third of the lease period), and release whatever is still
+    held when the block exits.
     """
-    print("\n🔄 FETCH PENDING SOURCES (Step 1: Fetch)")
-    print("=" * 50)
-    print("Using direct database connection")
 
-    try:
-        sources = db_get_pending_sources("pending")
+    def __init__(self, table: str, ids: list):
+        if table not in LEASE_TABLES:
+            raise ValueError(f"Not a work-queue table: {table}")
+        self.table = table
+        self.ids = list(ids)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
 
-        if not sources:
-            print("✅ No pending sources to fetch.")
-            return 0
+    def _run(self) -> None:
+        while not self._stop.wait(max(1.0, PIPELINE_LEASE_SECONDS / 3)):
+            try:
+                db_renew_leases(self.table, self.ids)
+            except Exception as e:
+                print(f"   ⚠️ Lease heartbeat failed: {e}")
+
+    def __enter__(self) -> "LeaseHeartbeat":
+        self._thread = threading.Thread(target=self._run, name=f"lease-{self.table}", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self._stop.set()
+        self._thread.join(timeout=5)
+        # Buffered status writes for these rows must land before another worker can claim them;
+        # if they could not be written, the leases are left to expire instead
+        if not status_writes.flush():
+            print(f"   ⚠️ Keeping leases on {len(self.ids)} row(s) until their buffered updates are written "
+                  f"(they expire in {PIPELINE_LEASE_SECONDS}s)")
+            return False
+        try:
+            db_release_leases(self.table, self.ids)
+        except Exception as e:
+            print(f"   ⚠️ Could not release leases (they expire in {PIPELINE_LEASE_SECONDS}s): {e}")
+        return False
 
-        print(f"📋 Found {len(sources)} source(s) to fetch")
 
-    except Exception as e:
-        print(f"❌ Error fetching sources from database: {e}")
-        return 1
+def iter_claimed_batches(table: str, claim, claim_size: int):
+    """
+    Lease and yield batches of work until nothing is claimable.
 
-    # Process each source
-    success_count = 0
-    for i, source in enumerate(sources, 1):
-        source_id = source.get("id")
-        source_url = source.get("sourceUrl", "")
-        source_type = source.get("sourceType", "youtube")
-        faction_name = source.get("factionName", "Unknown")
+    claim(limit, exclude_ids) leases rows (db_claim_sources / db_claim_datasheet_sources).
+    Each batch's leases are kept alive while the caller processes it and released
+    afterwards; rows this run already attempted are not claimed again, so rows
+    left unfinished (e.g. API errors) are retried by the next run or worker.
+    """
+    attempted: list = []
+    while True:
+        try:
+            rows = claim(claim_size, attempted)
+        except Exception as e:
+            print(f"❌ Could not claim work from {table}: {e}")
+            return
+        if not rows:
+            return
+        ids = [row["id"] for row in rows]
+        attempted.extend(ids)
+        print(f"\n🔒 Leased {len(rows)} row(s) from {table} as {PIPELINE_WORKER_ID}")
+        with LeaseHeartbeat(table, ids):
+            yield rows
 
-        print(f"\n{'=' * 50}")
-        print(f"📋 [{i}/{len(sources)}] Fetching source")
-        print(f"   Faction: {faction_name}")
-        print(f"   Type: {source_type}")
-        print(f"   URL: {source_url}")
 
-        content = None
-        title = None
-        author = None
-        platform_id = None
-        duration = None
+def claimed_rows(table: str, claim, claim_size: int):
+    """iter_claimed_batches flattened to single rows (for stages that process rows one at a time)."""
+    for rows in iter_claimed_batches(table, claim, claim_size):
+        yield from rows
 
-        try:
-            if source_type == "youtube":
-                video_id = extract_video_id(source_url)
-                if not video_id:
-                    raise Exception("Could not parse video ID")
 
-                platform_id = video_id
+# ============================================
+# WRITE-BEHIND STATUS BUFFER
+# ============================================
 
-                # Get video info
-                info = get_video_info(source_url)
-                title = info.get("title", "Unknown")
-                author = info.get("channel", info.get("uploader", "Unknown"))
-                duration = info.get("duration", 0)
+# Status and extraction updates are collected and written in one transaction
+# every STATUS_FLUSH_ITEMS updates or STATUS_FLUSH_SECONDS, at stage ends and at exit
+STATUS_FLUSH_ITEMS = int(os.getenv("STATUS_FLUSH_ITEMS", "25"))
+STATUS_FLUSH_SECONDS = float(os.getenv("STATUS_FLUSH_SECONDS", "5"))
 
-                print(f"   📺 Title: {title}")
-                print(f"   👤 Channel: {author}")
 
-                # Try captions
-                success, content, error = try_fetch_captions(source_url)
-                if not success and not no_whisper:
-                    print(f"   📝 Captions failed, trying Whisper...")
-                    with tempfile.TemporaryDirectory(prefix="yt_fetch_") as tmp_dir:
-                        audio_path = download_audio(source_url, tmp_dir)
-                        content = whisper_transcribe(audio_path)
+class StatusWriteBuffer:
+    """
+    Write-behind buffer for source status and link extraction updates.
 
-            elif source_type == "discord":
-                print("   ⚠️ Discord requires manual paste - skipping")
-                continue
+    Updates are keyed by row (the latest update for a row wins) and written
+    with db_apply_status_writes. A background thread flushes updates older
+    than max_seconds. A failed flush keeps its updates for the next attempt.
+    """
 
-            else:
-                # Web scraping
-                success, result, error = fetch_content(source_url, source_type)
-                if not success:
-                    raise Exception(error or "Scraping failed")
-
-                content = result.get("text", "")
-                title = result.get("title", "Unknown")
-                author = result.get("author", "Unknown")
-                platform_id = result.get("source_id")
-
-            if not content:
-                raise Exception("No content retrieved")
-
-            print(f"   ✅ Content fetched ({len(content):,} chars)")
-
-            # Update source in database directly
-            db_update_source_status(
-                source_id, "fetched",
-                content=content,
-                contentTitle=title,
-                authorName=author,
-                sourceId=platform_id,
-                duration=duration,
+    def __init__(self, max_items: int = STATUS_FLUSH_ITEMS, max_seconds: float = STATUS_FLUSH_SECONDS):
+        self.max_items = max_items
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # Flushes are serialized so a row's updates land in order
+        self._sources: dict = {}  # source_id -> (status, fields)
+        self._links: dict = {}  # link_id -> (extracted_context, confidence, status)
+        self._extracted: set = set()  # source ids to mark extracted after their links are written
+        self._timer: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sources) + len(self._links) + len(self._extracted)
+
+    def update_source_status(self, source_id: str, status: str, **fields) -> None:
+        """Buffered db_update_source_status (fields accumulate as with sequential updates)."""
+        def apply():
+            self._sources[source_id] = self._merge_source(
+                self._sources.get(source_id), (status, {k: v for k, v in fields.items() if v is not None})
             )
-            print(f"   ✅ Source updated (status: fetched)")
-            success_count += 1
+        self._add(apply)
+
+    @staticmethod
+    def _merge_source(earlier: Optional[tuple], later: tuple) -> tuple:
+        """Combine two buffered updates of a source: the later status (if any) and fields win."""
+        if earlier is None:
+            return later
+        return (later[0] or earlier[0], {**earlier[1], **later[1]})
+
+    def update_link_extraction(self, link_id: str, extracted_context: dict, confidence: int, status: str = "extracted") -> None:
+        """Buffered db_update_datasheet_source_extraction."""
+        def apply():
+            self._links[link_id] = (extracted_context, confidence, status)
+        self._add(apply)
+
+    def mark_sources_extracted(self, source_ids) -> None:
+        """Buffered db_mark_sources_extracted (applied after the buffered link updates)."""
+        def apply():
+            self._extracted.update(source_ids)
+        self._add(apply)
+
+    def _add(self, apply) -> None:
+        with self._lock:
+            apply()
+            self._start_timer()
+        if len(self) >= self.max_items:
+            self.flush()
+
+    def _start_timer(self) -> None:
+        if self._timer is None:
+            self._timer = threading.Thread(target=self._run_timer, name="status-writes", daemon=True)
+            self._timer.start()
+
+    def _run_timer(self) -> None:
+        while True:
+            time.sleep(self.max_seconds)
+            self.flush()
+
+    def flush(self) -> bool:
+        """Write everything buffered in one transaction. Returns False if the write failed."""
+        with self._flush_lock:
+            with self._lock:
+                sources, links, extracted = self._sources, self._links, self._extracted
+                self._sources, self._links, self._extracted = {}, {}, set()
+            if not (sources or links or extracted):
+                return True
+            try:
+                db_apply_status_writes(sources, links, extracted)
+                return True
+            except Exception as e:
+                count = len(sources) + len(links) + len(extracted)
+                print(f"⚠️ Could not write {count} buffered status update(s), kept for the next flush: {e}")
+                with self._lock:
+                    # Keep them, under any update buffered for the same row meanwhile
+                    for source_id, update in sources.items():
+                        self._sources[source_id] = self._merge_source(update, self._sources.get(source_id) or (None, {}))
+                    self._links = {**links, **self._links}
+                    self._extracted |= extracted
+                return False
 
-        except Exception as e:
-            print(f"   ❌ Error: {e}")
-            # Update with error status
-            db_update_source_status(source_id, "error", errorMessage=str(e))
 
-    print(f"\n✅ Fetch complete: {success_count}/{len(sources)} succeeded")
-    return 0
+status_writes = StatusWriteBuffer()
+atexit.register(status_writes.flush)
 
 
-def curate_pending_sources(api_url: str = None) -> int:
+def flush_status_writes_on_signal() -> None:
     """
-    Run AI curation on CompetitiveSources with status 'fetched'.
-    Uses direct database connection (api_url parameter is kept for backward compatibility but ignored).
+    Turn SIGTERM/SIGHUP into a normal exit so the status buffer is flushed by
+    atexit (Ctrl+C already does this via KeyboardInterrupt). Main thread only.
+    """
+    def handle(signum, frame):
+        print(f"\n🛑 Received signal {signum}, flushing buffered status updates...")
+        raise SystemExit(128 + signum)
 
-    This is the SECOND step: identify which units are mentioned in each source.
-    Creates DatasheetSource links for each mentioned unit.
+    for name in ("SIGTERM", "SIGHUP"):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), handle)
+
+
+# ============================================
+# NEW PIPELINE: Faction-Level Source Processing
+# ============================================
+
+def fetch_source(source: dict[str, Any], no_whisper: bool = False, compact: bool = True) -> Optional[dict[str, Any]]:
     """
-    print("\n🔄 CURATE PENDING SOURCES (Step 2: Curate)")
-    print("=" * 50)
-    print("Using direct database connection")
+    Fetch one pending CompetitiveSource and buffer its 'fetched' (or 'error')
+    update. Returns the source row with its new plain-text content, or None if
+    the source failed or was skipped.
+    """
+    source_id = source.get("id")
+    source_url = source.get("sourceUrl", "")
+    source_type = source.get("sourceType", "youtube")
+    faction_name = source.get("factionName", "Unknown")
 
-    google_api_key = os.getenv("GOOGLE_API_KEY")
+    print(f"   Faction: {faction_name}")
+    print(f"   Type: {source_type}")
+    print(f"   URL: {source_url}")
 
-    if not google_api_key:
-        print("⚠️ GOOGLE_API_KEY not found")
-        return 1
+    content = None
+    title = None
+    author = None
+    platform_id = None
+    duration = None
 
-    # Fetch sources ready for curation (status=fetched)
     try:
-        sources = db_get_pending_sources("fetched")
+        if source_type == "youtube":
+            video_id = extract_video_id(source_url)
+            if not video_id:
+                raise Exception("Could not parse video ID")
 
-        if not sources:
-            print("✅ No sources to curate.")
-            return 0
+            platform_id = video_id
+
+            # Get video info
+            info = get_video_info(source_url)
+            title = info.get("title", "Unknown")
+            author = info.get("channel", info.get("uploader", "Unknown"))
+            duration = info.get("duration", 0)
+
+            print(f"   📺 Title: {title}")
+            print(f"   👤 Channel: {author}")
 
-        print(f"📋 Found {len(sources)} source(s) to curate")
+            # Try captions
+            success, content, error = try_fetch_captions(source_url)
+            if not success and not no_whisper:
+                print(f"   📝 Captions failed, trying Whisper...")
+                with tempfile.TemporaryDirectory(prefix="yt_fetch_") as tmp_dir:
+                    audio_path = download_audio(source_url, tmp_dir)
+                    content = whisper_transcribe(audio_path)
 
-        # Pre-fetch datasheets for each faction
-        faction_datasheets = {}
-        for source in sources:
-            faction_id = source.get("factionId")
-            if faction_id and faction_id not in faction_datasheets:
-                faction_datasheets[faction_id] = db_get_faction_datasheets(faction_id)
+        elif source_type == "discord":
+            print("   ⚠️ Discord requires manual paste - skipping")
+            return None
+
+        else:
+            # Web scraping
+            success, result, error = fetch_content(source_url, source_type)
+            if not success:
+                raise Exception(error or "Scraping failed")
+
+            content = result.get("text", "")
+            title = result.get("title", "Unknown")
+            author = result.get("author", "Unknown")
+            platform_id = result.get("source_id")
+
+        if not content:
+            raise Exception("No content retrieved")
+
+        print(f"   ✅ Content fetched ({len(content):,} chars)")
+
+        raw_content = None
+        if compact and source_type == "youtube":
+            raw_content = content
+            content, stats = compact_transcript(raw_content)
+            print(f"   🗜️ Compacted to {len(content):,} chars ({1 - len(content) / len(raw_content):.0%} smaller: "
+                  f"{stats['fillers']} fillers, {stats['repeats']} repeated words, "
+                  f"{stats['sponsor']} sponsor and {stats['duplicates']} duplicate segments)")
+
+        # Update source in database (write-behind, see StatusWriteBuffer)
+        status_writes.update_source_status(
+            source_id, "fetched",
+            **stored_content_fields(content, raw_content),
+            contentTitle=title,
+            authorName=author,
+            sourceId=platform_id,
+            duration=duration,
+        )
+        print(f"   ✅ Source updated (status: fetched)")
+        return {
+            **source,
+            "status": "fetched",
+            "content": content,
+            "contentEncoding": None,
+            "contentTitle": title,
+            "authorName": author,
+            "sourceId": platform_id,
+        }
 
     except Exception as e:
-        print(f"❌ Error: {e}")
-        return 1
+        print(f"   ❌ Error: {e}")
+        # Update with error status
+        status_writes.update_source_status(source_id, "error", errorMessage=str(e))
+        return None
+
+
+def fetch_pending_sources(
+    api_url: str = None,
+    no_whisper: bool = False,
+    compact: bool = True,
+    claim_size: int = 0
+) -> int:
+    """
+    Fetch content for CompetitiveSources with status 'pending'.
+    Uses direct database connection (api_url parameter is kept for backward compatibility but ignored).
+
+    This is the FIRST step in the new pipeline:
+    1. FETCH: Download content (this function)
+    2. CURATE: AI identifies which units are mentioned
+    3. EXTRACT: AI extracts unit-specific context
+    4. AGGREGATE: Synthesize all sources for a unit
+
+    With compact=True, filler, stutters, sponsor reads and repeated sentences
+    are removed from YouTube transcripts before storing them (see
+    compact_transcript); the raw text is kept in rawContent. Articles, Reddit
+    and forum text are stored as fetched.
+
+    With claim_size > 0, sources are leased claim_size at a time (see
+    iter_claimed_batches), so several workers can fetch concurrently.
+    """
+    print("\n🔄 FETCH PENDING SOURCES (Step 1: Fetch)")
+    print("=" * 50)
+    print("Using direct database connection")
+
+    if claim_size > 0:
+        sources = claimed_rows(
+            "CompetitiveSource", lambda limit, exclude: db_claim_sources("pending", limit, exclude), claim_size
+        )
+        total = "?"
+    else:
+        try:
+            total = db_count_sources("pending")
 
+            if not total:
+                print("✅ No pending sources to fetch.")
+                return 0
+
+            print(f"📋 Found {total} source(s) to fetch")
+
+        except Exception as e:
+            print(f"❌ Error fetching sources from database: {e}")
+            return 1
+        # Streamed: the first source starts while the rest are still in the database
+        sources = db_iter_pending_sources("pending")
+
+    # Process each source
     success_count = 0
-    for i, source in enumerate(sources, 1):
-        source_id = source.get("id")
-        faction_id = source.get("factionId")
-        faction_name = source.get("factionName", "Unknown")
-        content = source.get("content", "")
-        title = source.get("contentTitle", "Unknown")
-        
-        print(f"\n{'=' * 50}")
-        print(f"📋 [{i}/{len(sources)}] Curating: {title}")
-        print(f"   Faction: {faction_name}")
-        print(f"   Content: {len(content):,} chars")
-        
-        # Get datasheets for this faction
-        datasheets = faction_datasheets.get(faction_id, [])
-        if not datasheets:
-            print(f"   ⚠️ No datasheets found for faction {faction_name}")
-            continue
-        
-        print(f"   📊 Checking against {len(datasheets)} datasheets")
-        
-        # Build the datasheet list for the prompt - include keywords for matching
-        datasheet_list = "\n".join([
-            f"- {d['name']} (ID: {d['id']}) [Keywords: {d.get('keywords', '')}]"
-            for d in datasheets
-        ])
-        
-        print(f"   📄 Content length: {len(content):,} chars (full content)")
-        
-        # Call Gemini to identify mentioned units
-        system_prompt = """You are an expert Warhammer 40,000 analyst. Given content from a competitive analysis source and a list of unit datasheets, identify which units are discussed.
+    i = 0
+    try:
+        for i, source in enumerate(sources, 1):
+            print(f"\n{'=' * 50}")
+            print(f"📋 [{i}/{total}] Fetching source")
+            if fetch_source(source, no_whisper, compact):
+                success_count += 1
+    except Exception as e:
+        print(f"❌ Error fetching sources from database: {e}")
+        status_writes.flush()
+        return 1
+
+    status_writes.flush()
+    print(f"\n✅ Fetch complete: {success_count}/{i} succeeded")
+    return 0
+
+
+def curate_source(source: dict[str, Any], content: str, google_api_key: str, faction_catalogs: dict) -> bool:
+    """
+    Identify the units a fetched source discusses, create their DatasheetSource
+    links and buffer the source's 'curated' update. faction_catalogs caches the
+    datasheet catalog per faction across calls. Returns True if curated.
+    """
+    source_id = source.get("id")
+    faction_id = source.get("factionId")
+    faction_name = source.get("factionName", "Unknown")
+    title = source.get("contentTitle", "Unknown")
+
+    # Get datasheets for this faction
+    if faction_id and faction_id not in faction_catalogs:
+        try:
+            faction_catalogs[faction_id] = get_faction_catalog(faction_id)
+        except Exception as e:
+            print(f"   ❌ Could not load datasheets for faction {faction_name}: {e}")
+            return False
+    catalog = faction_catalogs.get(faction_id) or {}
+    datasheets = catalog.get("datasheets", [])
+    if not datasheets:
+        print(f"   ⚠️ No datasheets found for faction {faction_name}")
+        return False
+    
+    print(f"   📊 Checking against {len(datasheets)} datasheets")
+    
+    # Pre-rendered datasheet list for the prompt - includes keywords for matching
+    datasheet_list = catalog["promptBlock"]
+    
+    print(f"   📄 Content length: {len(content):,} chars (full content)")
+    
+    # Call Gemini to identify mentioned units
+    system_prompt = """You are an expert Warhammer 40,000 analyst. Given content from a competitive analysis source and a list of unit datasheets, identify which units are discussed.
 
 CRITICAL MATCHING RULES:
 1. Match units even if pronounced/spelled differently (e.g., "Wulfen" might sound like "Wolfin", "He'stan" like "Histan")
@@ -2621,7 +5738,15 @@ OUTPUT FORMAT (JSON):
 
 IMPORTANT: Keep summaries SHORT (under 60 characters) to avoid truncation!"""
 
-        user_prompt = f"""CONTENT SOURCE: "{title}"
+    # Content over the prompt budget is curated in parts and the matches merged
+    content_parts = split_text_to_budget(
+        content, max(20000, PROMPT_TOKEN_BUDGET - estimate_tokens(system_prompt + datasheet_list))
+    )
+    if len(content_parts) > 1:
+        print(f"   ✂️ Content over the prompt budget, curating in {len(content_parts)} parts")
+
+    user_prompts = [
+        f"""CONTENT SOURCE: "{title}"{f" (part {n} of {len(content_parts)})" if len(content_parts) > 1 else ""}
 
 This appears to be a comprehensive tier list or unit review for {faction_name}. Carefully analyze the ENTIRE content and match units.
 
@@ -2629,39 +5754,63 @@ AVAILABLE DATASHEETS FOR {faction_name}:
 {datasheet_list}
 
 CONTENT TO ANALYZE (FULL TRANSCRIPT):
-{content}
+{part}
 
 TASK: Identify ALL units from the list above that are discussed. For a tier list video, expect to match MOST units from the list. Be thorough!"""
+        for n, part in enumerate(content_parts, 1)
+    ]
 
-        # Create Langfuse trace for this curation
-        trace = None
-        generation = None
-        if HAS_LANGFUSE and langfuse:
-            trace = langfuse.trace(
-                name="competitive-source-curation",
-                metadata={
-                    "sourceId": source_id,
-                    "factionName": faction_name,
-                    "contentTitle": title,
-                    "contentLength": len(content),
-                    "datasheetCount": len(datasheets),
-                },
-                tags=["curation", f"faction-{faction_name.lower().replace(' ', '-')}"]
-            )
-        
+    # Cache the transcript so the unit-level extraction calls can reference it
+    source_context = None
+    if len(content_parts) == 1:
         try:
-            gemini_url = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent?key={google_api_key}"
-            gemini_payload = {
+            source_context = get_source_context(google_api_key, source_id, title, content)
+        except Exception as e:
+            print(f"   ⚠️ Context cache skipped: {e}")
+    if source_context:
+        user_prompts = [f"""This appears to be a comprehensive tier list or unit review for {faction_name}. Carefully analyze the ENTIRE content source above and match units.
+
+AVAILABLE DATASHEETS FOR {faction_name}:
+{datasheet_list}
+
+TASK: Identify ALL units from the list above that are discussed. For a tier list video, expect to match MOST units from the list. Be thorough!"""]
+
+    # ~60 output tokens per matched unit (short summaries)
+    max_output_tokens = plan_output_tokens(300 + 60 * len(datasheets))
+
+    # Create Langfuse trace for this curation
+    trace = None
+    generation = None
+    if HAS_LANGFUSE and langfuse:
+        trace = langfuse.trace(
+            name="competitive-source-curation",
+            metadata={
+                "sourceId": source_id,
+                "factionName": faction_name,
+                "contentTitle": title,
+                "contentLength": len(content),
+                "contentParts": len(content_parts),
+                "datasheetCount": len(datasheets),
+                "contextCache": source_context.get("name") if source_context else None,
+            },
+            tags=["curation", f"faction-{faction_name.lower().replace(' ', '-')}"]
+        )
+    
+    try:
+        mentioned_by_id = {}
+        unmatched = []
+        for part_index, user_prompt in enumerate(user_prompts, 1):
+            gemini_payload = apply_source_context({
                 "contents": [
                     {"role": "user", "parts": [{"text": system_prompt + "\n\n" + user_prompt}]}
                 ],
                 "generationConfig": {
                     "temperature": 0.2,
-                    "maxOutputTokens": 65536,
+                    "maxOutputTokens": max_output_tokens,
                     "responseMimeType": "application/json",
                 }
-            }
-            
+            }, source_context)
+
             # Create Langfuse generation span
             if trace:
                 generation = trace.generation(
@@ -2674,21 +5823,22 @@ TASK: Identify ALL units from the list above that are discussed. For a tier list
                     },
                     metadata={
                         "temperature": 0.2,
-                        "maxOutputTokens": 65536,
+                        "maxOutputTokens": max_output_tokens,
+                        "part": part_index,
                     }
                 )
-            
-            print(f"   🤖 Calling Gemini for curation...")
-            response = requests_with_retry("POST", gemini_url, json=gemini_payload, timeout=600)  # 10 min timeout with retries
+
+            print(f"   🤖 Calling Gemini for curation{f' (part {part_index}/{len(user_prompts)})' if len(user_prompts) > 1 else ''}...")
+            response = gemini_generate(gemini_payload, google_api_key)
             if response.status_code != 200:
                 error_detail = response.text[:500] if response.text else "No details"
                 if generation:
                     generation.end(output={"error": error_detail}, level="ERROR")
                 raise Exception(f"Gemini API error {response.status_code}: {error_detail}")
-            
+
             result = response.json()
             text = result["candidates"][0]["content"]["parts"][0]["text"]
-            
+
             # Parse JSON with repair for truncated responses
             try:
                 curation_result = json.loads(text)
@@ -2704,86 +5854,96 @@ TASK: Identify ALL units from the list above that are discussed. For a tier list
                         raise e  # Re-raise original error if repair fails
                 else:
                     raise e
-            
-            mentioned_units = curation_result.get("mentionedUnits", [])
-            unmatched = curation_result.get("unmatchedMentions", [])
-            
-            # Log to Langfuse
-            if generation:
-                generation.end(
-                    output={
-                        "unitsFound": len(mentioned_units),
-                        "unmatchedCount": len(unmatched),
-                        "unitNames": [u["datasheetName"] for u in mentioned_units],
-                        "unmatched": unmatched[:10],
-                    }
-                )
-            
-            print(f"   🎯 Found {len(mentioned_units)} units mentioned")
-            if unmatched:
-                print(f"   ⚠️ Unmatched mentions (not in datasheet list): {', '.join(unmatched[:5])}")
-            
-            if mentioned_units:
-                # Create datasheet links directly in database
-                links = [
-                    {
-                        "datasheetId": u["datasheetId"],
-                        "relevanceScore": u.get("relevanceScore", 0.5),
-                        "mentionCount": u.get("mentionCount", 1),
-                        "mentionSummary": u.get("mentionSummary", ""),
-                    }
-                    for u in mentioned_units
-                ]
-                try:
-                    db_create_datasheet_links(source_id, links)
-                    print(f"   ✅ Created {len(mentioned_units)} datasheet links")
-                except Exception as link_err:
-                    print(f"   ⚠️ Failed to create links: {link_err}")
 
-            # Update source status directly in database
-            db_update_source_status(source_id, "curated")
-            
-            print(f"   ✅ Source curated")
-            success_count += 1
-            
-            # Print summary
-            for u in mentioned_units[:5]:
-                print(f"      • {u['datasheetName']} (relevance: {u.get('relevanceScore', '?')})")
-            if len(mentioned_units) > 5:
-                print(f"      ... and {len(mentioned_units) - 5} more")
+            # Merge parts: sum mentions, keep the most relevant summary
+            for unit in curation_result.get("mentionedUnits", []):
+                existing = mentioned_by_id.get(unit.get("datasheetId"))
+                if not existing:
+                    mentioned_by_id[unit.get("datasheetId")] = dict(unit)
+                    continue
+                existing["mentionCount"] = existing.get("mentionCount", 1) + unit.get("mentionCount", 1)
+                if unit.get("relevanceScore", 0) > existing.get("relevanceScore", 0):
+                    existing["relevanceScore"] = unit["relevanceScore"]
+                    existing["mentionSummary"] = unit.get("mentionSummary", existing.get("mentionSummary", ""))
+            for name in curation_result.get("unmatchedMentions", []):
+                if name not in unmatched:
+                    unmatched.append(name)
+
+        mentioned_units = list(mentioned_by_id.values())
         
-        except json.JSONDecodeError as e:
-            print(f"   ❌ Failed to parse Gemini response: {e}")
-            # Log raw response for debugging
-            if 'text' in dir():
-                print(f"      Raw response (first 500 chars): {text[:500]}")
-            if trace:
-                trace.update(level="ERROR", metadata={"error": f"JSON parse: {e}", "rawResponse": text[:1000] if 'text' in dir() else None})
-        except Exception as e:
-            print(f"   ❌ Error: {e}")
-            if trace:
-                trace.update(level="ERROR", metadata={"error": str(e)})
-    
-    # Flush Langfuse traces
-    if HAS_LANGFUSE and langfuse:
-        try:
-            langfuse.flush()
-        except Exception:
-            pass
-    
-    print(f"\n✅ Curation complete: {success_count}/{len(sources)} succeeded")
-    return 0
+        # Log to Langfuse
+        if generation:
+            generation.end(
+                output={
+                    "unitsFound": len(mentioned_units),
+                    "unmatchedCount": len(unmatched),
+                    "unitNames": [u["datasheetName"] for u in mentioned_units],
+                    "unmatched": unmatched[:10],
+                }
+            )
+        
+        print(f"   🎯 Found {len(mentioned_units)} units mentioned")
+        if unmatched:
+            print(f"   ⚠️ Unmatched mentions (not in datasheet list): {', '.join(unmatched[:5])}")
+        
+        if mentioned_units:
+            # Create datasheet links directly in database
+            links = [
+                {
+                    "datasheetId": u["datasheetId"],
+                    "relevanceScore": u.get("relevanceScore", 0.5),
+                    "mentionCount": u.get("mentionCount", 1),
+                    "mentionSummary": u.get("mentionSummary", ""),
+                }
+                for u in mentioned_units
+            ]
+            try:
+                written = db_create_datasheet_links(source_id, links)
+                print(f"   ✅ Created {written} datasheet links")
+            except Exception as link_err:
+                print(f"   ⚠️ Failed to create links: {link_err}")
+        else:
+            # No units to extract, so nothing will ever reuse this source's context
+            release_source_contexts(google_api_key, [source_id])
+
+        # Update source status in database (write-behind, see StatusWriteBuffer)
+        status_writes.update_source_status(source_id, "curated")
+        
+        print(f"   ✅ Source curated")
+        
+        # Print summary
+        for u in mentioned_units[:5]:
+            print(f"      • {u['datasheetName']} (relevance: {u.get('relevanceScore', '?')})")
+        if len(mentioned_units) > 5:
+            print(f"      ... and {len(mentioned_units) - 5} more")
+        return True
+    
+    except json.JSONDecodeError as e:
+        print(f"   ❌ Failed to parse Gemini response: {e}")
+        # Log raw response for debugging
+        if 'text' in dir():
+            print(f"      Raw response (first 500 chars): {text[:500]}")
+        if trace:
+            trace.update(level="ERROR", metadata={"error": f"JSON parse: {e}", "rawResponse": text[:1000] if 'text' in dir() else None})
+    except Exception as e:
+        print(f"   ❌ Error: {e}")
+        if trace:
+            trace.update(level="ERROR", metadata={"error": str(e)})
+    return False
 
 
-def extract_pending_links(api_url: str = None) -> int:
+def curate_pending_sources(api_url: str = None, claim_size: int = 0) -> int:
     """
-    Extract unit-specific context for DatasheetSources with status 'pending'.
+    Run AI curation on CompetitiveSources with status 'fetched'.
     Uses direct database connection (api_url parameter is kept for backward compatibility but ignored).
 
-    This is the THIRD step: for each unit link, extract detailed competitive insights
-    from the source content specifically about that unit.
+    This is the SECOND step: identify which units are mentioned in each source.
+    Creates DatasheetSource links for each mentioned unit.
+
+    With claim_size > 0, sources are leased claim_size at a time (see
+    iter_claimed_batches), so several workers can curate concurrently.
     """
-    print("\n🔄 EXTRACT PENDING LINKS (Step 3: Extract)")
+    print("\n🔄 CURATE PENDING SOURCES (Step 2: Curate)")
     print("=" * 50)
     print("Using direct database connection")
 
@@ -2793,20 +5953,172 @@ def extract_pending_links(api_url: str = None) -> int:
         print("⚠️ GOOGLE_API_KEY not found")
         return 1
 
-    # Fetch pending datasheet sources directly from database
-    try:
-        pending_links = db_get_pending_datasheet_sources()
+    # Resolve the datasheet catalog for each faction (cached across sources and runs)
+    faction_catalogs = {}
 
-        if not pending_links:
-            print("✅ No links to extract.")
-            return 0
+    # Fetch sources ready for curation (status=fetched)
+    if claim_size > 0:
+        sources = claimed_rows(
+            "CompetitiveSource", lambda limit, exclude: db_claim_sources("fetched", limit, exclude), claim_size
+        )
+        total = "?"
+    else:
+        try:
+            total = db_count_sources("fetched")
+
+            if not total:
+                print("✅ No sources to curate.")
+                return 0
+
+            print(f"📋 Found {total} source(s) to curate")
+
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            return 1
+        # Streamed: transcripts are read a few at a time instead of the whole backlog up front
+        sources = db_iter_pending_sources("fetched")
+
+    success_count = 0
+    i = 0
+    result = 0
+    try:
+        for i, source in enumerate(sources, 1):
+            faction_name = source.get("factionName", "Unknown")
+            title = source.get("contentTitle", "Unknown")
+            try:
+                content = source_content_text(source) or ""
+            except Exception as e:
+                print(f"\n❌ Could not load content for {title}: {e}")
+                continue
 
-        print(f"📋 Found {len(pending_links)} pending link(s) to extract")
+            print(f"\n{'=' * 50}")
+            print(f"📋 [{i}/{total}] Curating: {title}")
+            print(f"   Faction: {faction_name}")
+            print(f"   Content: {len(content):,} chars")
 
+            if curate_source(source, content, google_api_key, faction_catalogs):
+                success_count += 1
     except Exception as e:
         print(f"❌ Error: {e}")
-        return 1
+        result = 1
+
+    # Flush Langfuse traces
+    if HAS_LANGFUSE and langfuse:
+        try:
+            langfuse.flush()
+        except Exception:
+            pass
+    
+    status_writes.flush()
+    print(f"\n✅ Curation complete: {success_count}/{i} succeeded")
+    return result
+
+
+def save_link_extraction(link_id: str, result: dict[str, Any]) -> bool:
+    """Write one extraction result to its DatasheetSource link. Returns True if context was found."""
+    if result.get("success") and result.get("found"):
+        context = result.get("context", {})
+        confidence = context.get("confidence", 50)
+
+        # Update the datasheet source link in database (write-behind, see StatusWriteBuffer)
+        status_writes.update_link_extraction(
+            link_id,
+            extracted_context=result,
+            confidence=confidence,
+            status="extracted"
+        )
+
+        print(f"   ✅ Extracted (confidence: {confidence}%)")
+        return True
+
+    print(f"   ⚠️ Unit not found in content")
+    # Mark as extracted but with low confidence
+    status_writes.update_link_extraction(
+        link_id,
+        extracted_context={"found": False},
+        confidence=0,
+        status="extracted"
+    )
+    return False
+
+
+# Source content for extraction, loaded once per source and kept for the few
+# sources in flight (links arrive grouped by source)
+SOURCE_CONTENT_CACHE_SIZE = 4
+_source_content_cache: OrderedDict[str, str] = OrderedDict()
+
+
+def get_source_content(source_id: str) -> str:
+    """Content of a CompetitiveSource, via a small LRU cache."""
+    if source_id in _source_content_cache:
+        _source_content_cache.move_to_end(source_id)
+        return _source_content_cache[source_id]
+    content = db_get_source_content(source_id) or ""
+    _source_content_cache[source_id] = content
+    while len(_source_content_cache) > SOURCE_CONTENT_CACHE_SIZE:
+        _source_content_cache.popitem(last=False)
+    return content
+
+
+def ensure_source_context(google_api_key: str, source_contexts: dict, source_id: str, title: str, content: str) -> Optional[dict[str, Any]]:
+    """Create the cached transcript context for a source on first use."""
+    if source_id not in source_contexts:
+        try:
+            source_contexts[source_id] = get_source_context(google_api_key, source_id, title, content)
+        except Exception as e:
+            print(f"   ⚠️ Context cache skipped: {e}")
+            source_contexts[source_id] = None
+    return source_contexts[source_id]
+
+
+def link_source_info(link: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "title": link.get("contentTitle", "Unknown"),
+        "source_type": link.get("sourceType"),
+        "author": link.get("authorName"),
+    }
+
+
+def link_search_terms(link: dict[str, Any]) -> list:
+    return get_unit_search_terms(
+        link.get("datasheetName", "Unknown"),
+        link.get("datasheetFactionId"),
+        link.get("datasheetId")
+    )
+
+
+def prepare_link_extraction(link: dict[str, Any], google_api_key: str, source_contexts: dict) -> dict[str, Any]:
+    """
+    Build the extract_unit_context() arguments for a link: the passages around the
+    unit's mentions, or the full (cached) source when the unit can't be located.
+    """
+    unit_name = link.get("datasheetName", "Unknown")
+    content = get_source_content(link.get("sourceId"))
+    title = link.get("contentTitle", "Unknown")
+
+    excerpt = retrieve_unit_passages(
+        content, [unit_name], link_source_info(link), {unit_name: link_search_terms(link)}
+    )
+    if excerpt:
+        print(f"   🔎 Sending mention windows: {len(excerpt):,} of {len(content):,} chars")
+        source_context = None
+    else:
+        source_context = ensure_source_context(google_api_key, source_contexts, link.get("sourceId"), title, content)
+
+    return {
+        "transcript": excerpt or content,
+        "unit_name": unit_name,
+        "faction": link.get("faction", "Unknown"),
+        "video_info": {"title": title},
+        "source_context": source_context,
+    }
+
 
+def extract_links_sequential(pending_links: list, google_api_key: str, source_contexts: dict) -> Tuple[int, set]:
+    """
+    One Gemini call per (source, unit) link.
+    Returns (total_extracted, processed_source_ids).
+    """
     total_extracted = 0
     processed_sources = set()
 
@@ -2815,7 +6127,6 @@ def extract_pending_links(api_url: str = None) -> int:
         source_id = link.get("sourceId")
         unit_name = link.get("datasheetName", "Unknown")
         faction = link.get("faction", "Unknown")
-        content = link.get("content", "")
         title = link.get("contentTitle", "Unknown")
 
         print(f"\n{'=' * 50}")
@@ -2825,36 +6136,10 @@ def extract_pending_links(api_url: str = None) -> int:
 
         try:
             # Use existing extract_unit_context function
-            result = extract_unit_context(
-                transcript=content,
-                unit_name=unit_name,
-                faction=faction,
-                video_info={"title": title}
-            )
-
-            if result.get("success") and result.get("found"):
-                context = result.get("context", {})
-                confidence = context.get("confidence", 50)
+            result = extract_unit_context(**prepare_link_extraction(link, google_api_key, source_contexts))
 
-                # Update the datasheet source link directly in database
-                db_update_datasheet_source_extraction(
-                    link_id,
-                    extracted_context=result,
-                    confidence=confidence,
-                    status="extracted"
-                )
-
-                print(f"   ✅ Extracted (confidence: {confidence}%)")
+            if save_link_extraction(link_id, result):
                 total_extracted += 1
-            else:
-                print(f"   ⚠️ Unit not found in content")
-                # Mark as extracted but with low confidence
-                db_update_datasheet_source_extraction(
-                    link_id,
-                    extracted_context={"found": False},
-                    confidence=0,
-                    status="extracted"
-                )
 
         except Exception as e:
             print(f"   ❌ Error: {e}")
@@ -2863,38 +6148,267 @@ def extract_pending_links(api_url: str = None) -> int:
         if source_id:
             processed_sources.add(source_id)
 
-    # Update source statuses for all processed sources
-    for source_id in processed_sources:
+    return total_extracted, processed_sources
+
+
+def extract_links_concurrent(
+    pending_links: list,
+    google_api_key: str,
+    source_contexts: dict,
+    max_concurrency: int
+) -> Tuple[int, set]:
+    """
+    Extract links on up to max_concurrency threads (adaptive, see
+    AdaptiveConcurrencyLimiter). Results are written to the database as they
+    complete; links whose Gemini call failed stay 'pending' for the next run.
+    Returns (total_extracted, processed_source_ids).
+    """
+    total_extracted = 0
+    failed_sources = set()
+    seen_sources = set()
+    completed = 0
+
+    def jobs():
+        for link in pending_links:
+            seen_sources.add(link.get("sourceId"))
+            try:
+                yield link, prepare_link_extraction(link, google_api_key, source_contexts)
+            except Exception as e:
+                print(f"   ❌ {link.get('datasheetName', 'Unknown')}: {e}")
+                failed_sources.add(link.get("sourceId"))
+
+    def handle(job, result, error):
+        nonlocal total_extracted, completed
+        link, _ = job
+        completed += 1
+        print(f"\n📋 [{completed}/{len(pending_links)}] {link.get('datasheetName', 'Unknown')} "
+              f"({link.get('contentTitle', 'Unknown')})")
+        if error or not result.get("success"):
+            print(f"   ❌ Error: {error or result.get('error')}")
+            failed_sources.add(link.get("sourceId"))
+            return
+        try:
+            if save_link_extraction(link["id"], result):
+                total_extracted += 1
+        except Exception as e:
+            print(f"   ❌ Error: {e}")
+            failed_sources.add(link.get("sourceId"))
+
+    print(f"⚙️ Extracting with up to {max_concurrency} concurrent Gemini calls")
+    run_adaptive_pool(jobs(), lambda job: extract_unit_context(**job[1]), handle, max_concurrency)
+
+    processed_sources = {sid for sid in seen_sources if sid and sid not in failed_sources}
+    return total_extracted, processed_sources
+
+
+def extract_links_batched(
+    pending_links: list,
+    google_api_key: str,
+    source_contexts: dict,
+    max_concurrency: int = 1
+) -> Tuple[int, set]:
+    """
+    Batched extraction: group pending links by source and extract several units per
+    Gemini call (batch size adapts to the output-token limit). With
+    max_concurrency > 1, batches run concurrently (see run_adaptive_pool).
+
+    Links whose batch failed at the API level are left 'pending' for the next run.
+    Returns (total_extracted, processed_source_ids).
+    """
+    by_source: dict[str, list] = {}
+    for link in pending_links:
+        by_source.setdefault(link.get("sourceId"), []).append(link)
+
+    total_extracted = 0
+    failed_sources = set()
+
+    def jobs():
+        for s_index, (source_id, links) in enumerate(by_source.items(), 1):
+            first = links[0]
+            content = get_source_content(source_id)
+            title = first.get("contentTitle", "Unknown")
+            faction = first.get("faction", "Unknown")
+
+            print(f"\n{'=' * 50}")
+            print(f"📋 [{s_index}/{len(by_source)}] Source: {title}")
+            print(f"   Units: {len(links)} | Faction: {faction}")
+
+            remaining = list(links)
+            while remaining:
+                batch = remaining[:plan_extraction_batch_size()]
+                remaining = remaining[len(batch):]
+
+                # Union of mention windows for the batch, only if every unit was located
+                excerpt = retrieve_unit_passages(
+                    content,
+                    [l.get("datasheetName", "Unknown") for l in batch],
+                    link_source_info(first),
+                    {l.get("datasheetName", "Unknown"): link_search_terms(l) for l in batch}
+                )
+                if excerpt:
+                    print(f"   🔎 Sending mention windows: {len(excerpt):,} of {len(content):,} chars")
+                    source_context = None
+                else:
+                    source_context = ensure_source_context(google_api_key, source_contexts, source_id, title, content)
+
+                yield source_id, batch, {
+                    "transcript": excerpt or content,
+                    "units": [(l["id"], l.get("datasheetName", "Unknown")) for l in batch],
+                    "faction": faction,
+                    "video_info": {"title": title},
+                    "source_context": source_context,
+                }
+
+    def handle(job, results, error):
+        nonlocal total_extracted
+        source_id, batch, _ = job
+        for link in batch:
+            result = (results or {}).get(link["id"]) or {"success": False, "error": str(error or "No result")}
+            print(f"   • {link.get('datasheetName', 'Unknown')}")
+            if not result.get("success"):
+                print(f"   ❌ Error: {result.get('error')}")
+                failed_sources.add(source_id)
+                continue
+            try:
+                if save_link_extraction(link["id"], result):
+                    total_extracted += 1
+            except Exception as e:
+                print(f"   ❌ Error: {e}")
+                failed_sources.add(source_id)
+
+    run_adaptive_pool(jobs(), lambda job: extract_units_context_batch(**job[2]), handle, max_concurrency)
+
+    # Only advance a source once every link has been written
+    processed_sources = {sid for sid in by_source if sid and sid not in failed_sources}
+    return total_extracted, processed_sources
+
+
+def extract_links(
+    pending_links: list,
+    google_api_key: str,
+    source_contexts: dict,
+    batch: bool = False,
+    concurrency: int = 1
+) -> Tuple[int, set]:
+    """Extract links with the batched, concurrent or sequential strategy. Returns (total_extracted, processed_source_ids)."""
+    if batch:
+        return extract_links_batched(pending_links, google_api_key, source_contexts, max_concurrency=concurrency)
+    if concurrency > 1:
+        return extract_links_concurrent(pending_links, google_api_key, source_contexts, concurrency)
+    return extract_links_sequential(pending_links, google_api_key, source_contexts)
+
+
+def extract_pending_links(
+    api_url: str = None,
+    batch: bool = False,
+    concurrency: int = 1,
+    claim_size: int = 0
+) -> int:
+    """
+    Extract unit-specific context for DatasheetSources with status 'pending'.
+    Uses direct database connection (api_url parameter is kept for backward compatibility but ignored).
+
+    This is the THIRD step: for each unit link, extract detailed competitive insights
+    from the source content specifically about that unit.
+
+    With batch=True, all pending units of a source are extracted in as few Gemini
+    calls as the output-token limit allows (see extract_links_batched).
+    With concurrency > 1, up to that many Gemini calls run at once; the limit
+    backs off automatically when the API throttles.
+    With claim_size > 0, links are leased claim_size at a time (see
+    iter_claimed_batches), so several workers can extract concurrently.
+    """
+    print("\n🔄 EXTRACT PENDING LINKS (Step 3: Extract)")
+    print("=" * 50)
+    print("Using direct database connection")
+
+    google_api_key = os.getenv("GOOGLE_API_KEY")
+
+    if not google_api_key:
+        print("⚠️ GOOGLE_API_KEY not found")
+        return 1
+
+    # Fetch pending datasheet sources directly from database
+    if claim_size > 0:
+        link_batches = iter_claimed_batches("DatasheetSource", db_claim_datasheet_sources, claim_size)
+    else:
         try:
-            db_update_source_status(source_id, "extracted")
+            pending_links = db_get_pending_datasheet_sources()
+
+            if not pending_links:
+                print("✅ No links to extract.")
+                return 0
+
+            print(f"📋 Found {len(pending_links)} pending link(s) to extract")
+
         except Exception as e:
-            print(f"⚠️ Could not update source {source_id}: {e}")
+            print(f"❌ Error: {e}")
+            return 1
+        link_batches = [pending_links]
+
+    source_contexts = {}  # sourceId -> cached context handle (one upload per source)
+    extracted_sources = set()
+    total_extracted = 0
+    total_links = 0
+
+    for pending_links in link_batches:
+        total_links += len(pending_links)
+        extracted, processed_sources = extract_links(pending_links, google_api_key, source_contexts, batch, concurrency)
+        total_extracted += extracted
+        extracted_sources |= processed_sources
+
+        # Sources are marked extracted once none of their links is pending (another
+        # worker or a later batch may still hold some of them) - written with the
+        # batch's buffered link updates
+        status_writes.mark_sources_extracted(processed_sources)
 
-    print(f"\n✅ Extraction complete: {total_extracted}/{len(pending_links)} unit contexts extracted")
+    status_writes.flush()
+
+    # Cached transcripts are no longer needed once every unit is extracted,
+    # including the ones curation created (extraction mostly sends mention windows)
+    for handle in source_contexts.values():
+        release_source_context(google_api_key, handle)
+    release_source_contexts(google_api_key, extracted_sources)
+
+    print(f"\n✅ Extraction complete: {total_extracted}/{total_links} unit contexts extracted")
     return 0
 
 
-def process_all_pipeline(api_url: str, no_whisper: bool = False) -> int:
+def process_all_pipeline(
+    api_url: str,
+    no_whisper: bool = False,
+    batch_extract: bool = False,
+    concurrency: int = 1,
+    compact: bool = True,
+    claim_size: int = 0,
+    streaming: bool = True
+) -> int:
     """
     Run the complete pipeline: fetch → curate → extract.
-    
-    This is a convenience function that runs all three steps in sequence.
+
+    By default the three steps run at the same time and each source moves on
+    as soon as it is ready (see process_all_streaming). With streaming=False,
+    or with claim_size > 0 (leases are held per step), the steps run one after
+    another over the whole backlog.
     """
+    if streaming and claim_size <= 0:
+        return process_all_streaming(api_url, no_whisper, batch_extract, concurrency, compact)
+
     print("\n🚀 RUNNING FULL PIPELINE")
     print("=" * 50)
     
     # Step 1: Fetch
-    result = fetch_pending_sources(api_url, no_whisper)
+    result = fetch_pending_sources(api_url, no_whisper, compact=compact, claim_size=claim_size)
     if result != 0:
         print("\n⚠️ Fetch step had issues, continuing...")
     
     # Step 2: Curate
-    result = curate_pending_sources(api_url)
+    result = curate_pending_sources(api_url, claim_size=claim_size)
     if result != 0:
         print("\n⚠️ Curate step had issues, continuing...")
     
     # Step 3: Extract
-    result = extract_pending_links(api_url)
+    result = extract_pending_links(api_url, batch=batch_extract, concurrency=concurrency, claim_size=claim_size)
     if result != 0:
         print("\n⚠️ Extract step had issues")
     
@@ -2902,6 +6416,367 @@ def process_all_pipeline(api_url: str, no_whisper: bool = False) -> int:
     return 0
 
 
+# ============================================
+# STREAMING PIPELINE
+# ============================================
+
+# Sources waiting between two stages (fetched → curate, curated → extract).
+# A full queue blocks the stage in front of it, so fetched transcripts held in
+# memory stay bounded and fetching does not run far ahead of the Gemini stages.
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "2"))
+PIPELINE_DONE = object()  # Sent downstream when a stage has finished
+
+
+def pipeline_put(stage_queue: queue.Queue, item: Any, consumer_gone: threading.Event) -> bool:
+    """Blocking put that gives up (returns False) once the consuming stage has stopped."""
+    while not consumer_gone.is_set():
+        try:
+            stage_queue.put(item, timeout=1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def start_pipeline_stage(
+    name: str,
+    work,
+    inbox_closed: Optional[threading.Event],
+    outbox: queue.Queue,
+    outbox_closed: threading.Event,
+    errors: list
+) -> threading.Thread:
+    """
+    Run work() on a thread. However it ends, the next stage gets PIPELINE_DONE
+    and the previous stage (inbox_closed) stops producing for it.
+    """
+    def run():
+        try:
+            work()
+        except Exception as e:
+            print(f"\n❌ {name} stage failed: {e}")
+            errors.append(name)
+        finally:
+            if inbox_closed is not None:
+                inbox_closed.set()
+            pipeline_put(outbox, PIPELINE_DONE, outbox_closed)
+
+    thread = threading.Thread(target=run, name=f"pipeline-{name}", daemon=True)
+    thread.start()
+    return thread
+
+
+def process_all_streaming(
+    api_url: str,
+    no_whisper: bool = False,
+    batch_extract: bool = False,
+    concurrency: int = 1,
+    compact: bool = True
+) -> int:
+    """
+    Run fetch, curate and extract concurrently, connected by bounded queues.
+
+    A source is curated as soon as it is fetched (its content is handed over
+    in memory) and its links are extracted as soon as it is curated, so the
+    first unit contexts land while later videos are still downloading and
+    Gemini is not idle during fetching. Sources fetched or curated by an
+    earlier run are picked up first by the curate and extract stages.
+
+    Single worker only - multi-worker runs use --claim-size (see process_all_pipeline).
+    """
+    print("\n🚀 RUNNING FULL PIPELINE (streaming)")
+    print("=" * 50)
+    print(f"Stages run concurrently (queue size: {PIPELINE_QUEUE_SIZE})")
+
+    google_api_key = os.getenv("GOOGLE_API_KEY")
+    if not google_api_key:
+        print("⚠️ GOOGLE_API_KEY not found")
+        return 1
+
+    fetched_queue: queue.Queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    curated_queue: queue.Queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    fetched_closed = threading.Event()  # Curate stage stopped
+    curated_closed = threading.Event()  # Extract stage stopped
+    errors: list = []
+    counts = {"fetched": 0, "curated": 0, "links": 0, "extracted": 0}
+
+    def fetch_stage():
+        for i, source in enumerate(db_iter_pending_sources("pending"), 1):
+            if fetched_closed.is_set():
+                return
+            print(f"\n{'=' * 50}")
+            print(f"📥 [fetch {i}] Fetching source")
+            fetched = fetch_source(source, no_whisper, compact)
+            if fetched:
+                counts["fetched"] += 1
+                if not pipeline_put(fetched_queue, fetched, fetched_closed):
+                    return
+
+    def curate_stage():
+        faction_catalogs = {}
+        curated_ids = set()
+
+        def sources():
+            # Earlier runs' backlog first, then sources as the fetch stage delivers them
+            yield from db_iter_pending_sources("fetched")
+            while True:
+                source = fetched_queue.get()
+                if source is PIPELINE_DONE:
+                    return
+                yield source
+
+        for i, source in enumerate(sources(), 1):
+            if source["id"] in curated_ids:
+                continue  # Fetched by this run and flushed before the backlog query ran
+            curated_ids.add(source["id"])
+            title = source.get("contentTitle", "Unknown")
+            try:
+                content = source_content_text(source) or ""  # Plain text for sources fetched by this run
+            except Exception as e:
+                print(f"\n❌ Could not load content for {title}: {e}")
+                continue
+            print(f"\n{'=' * 50}")
+            print(f"🔎 [curate {i}] Curating: {title} ({len(content):,} chars)")
+            if not curate_source(source, content, google_api_key, faction_catalogs):
+                continue
+            counts["curated"] += 1
+            # Extraction reads the content and links from the database
+            if not status_writes.flush():
+                print("   ⚠️ Source left for the next run's extraction")
+                continue
+            if not pipeline_put(curated_queue, source["id"], curated_closed):
+                return
+
+    fetcher = start_pipeline_stage("fetch", fetch_stage, None, fetched_queue, fetched_closed, errors)
+    curator = start_pipeline_stage("curate", curate_stage, fetched_closed, curated_queue, curated_closed, errors)
+
+    source_contexts = {}  # sourceId -> cached context handle (one upload per source)
+
+    def extract(source_ids: Optional[list] = None) -> set:
+        """Extract the pending links of source_ids (all pending links if None). Returns their source ids."""
+        try:
+            pending_links = db_get_pending_datasheet_sources(source_ids)
+        except Exception as e:
+            print(f"\n❌ Could not load links to extract: {e}")
+            errors.append("extract")
+            return set()
+        link_sources = {link["sourceId"] for link in pending_links}
+        if not pending_links:
+            return link_sources
+        print(f"\n🧩 [extract] {len(pending_links)} link(s) from {len(link_sources)} source(s)")
+        extracted, processed_sources = extract_links(
+            pending_links, google_api_key, source_contexts, batch_extract, concurrency
+        )
+        counts["links"] += len(pending_links)
+        counts["extracted"] += extracted
+        status_writes.mark_sources_extracted(processed_sources)
+        # Curation and extraction caches of finished sources are no longer needed
+        for source_id in processed_sources:
+            source_contexts.pop(source_id, None)
+        release_source_contexts(google_api_key, processed_sources)
+        return link_sources
+
+    try:
+        # Links pending from earlier runs, then sources as the curate stage delivers them
+        backlog_ids = extract()
+
+        done = False
+        while not done:
+            source_ids = [curated_queue.get()]
+            # Take whatever else is ready so concurrent extraction has more to work on
+            while True:
+                try:
+                    source_ids.append(curated_queue.get_nowait())
+                except queue.Empty:
+                    break
+            if PIPELINE_DONE in source_ids:
+                done = True
+                source_ids = [sid for sid in source_ids if sid is not PIPELINE_DONE]
+            source_ids = [sid for sid in source_ids if sid not in backlog_ids]
+            if source_ids:
+                extract(source_ids)
+    finally:
+        curated_closed.set()  # On Ctrl+C, upstream stages stop after their current source
+        status_writes.flush()
+
+    fetcher.join()
+    curator.join()
+    status_writes.flush()
+
+    if HAS_LANGFUSE and langfuse:
+        try:
+            langfuse.flush()
+        except Exception:
+            pass
+
+    # Cached transcripts are no longer needed once every unit is extracted
+    for handle in source_contexts.values():
+        release_source_context(google_api_key, handle)
+
+    print(f"\n✅ Pipeline complete: {counts['fetched']} fetched, {counts['curated']} curated, "
+          f"{counts['extracted']}/{counts['links']} unit contexts extracted")
+    if errors:
+        print(f"⚠️ Stage(s) stopped early: {', '.join(errors)}")
+        return 1
+    return 0
+
+
+# ============================================
+# PIPELINE DAEMON
+# ============================================
+
+# Status changes are announced on this channel by the triggers in
+# prisma/manual_migrations/add_pipeline_work_notifications.sql
+PIPELINE_NOTIFY_CHANNEL = "pipeline_work"
+DAEMON_POLL_SECONDS = int(os.getenv("DAEMON_POLL_SECONDS", "300"))  # Full pass when no notification arrives
+DAEMON_DEBOUNCE_SECONDS = 2.0  # Collect a burst of notifications into one pass
+DAEMON_RECONNECT_SECONDS = 60  # Poll interval while LISTEN is unavailable
+
+# (table, new status) -> stage that has work because of it
+DAEMON_STAGE_TRIGGERS = {
+    ("CompetitiveSource", "pending"): "fetch",
+    ("CompetitiveSource", "fetched"): "curate",
+    ("CompetitiveSource", "curated"): "extract",
+    ("DatasheetSource", "pending"): "extract",
+}
+DAEMON_STAGES = ("fetch", "curate", "extract")
+
+
+def open_listen_connection():
+    """
+    Dedicated connection LISTENing on PIPELINE_NOTIFY_CHANNEL. Uses DIRECT_URL:
+    LISTEN needs a session, which pgbouncer in transaction mode does not keep.
+    """
+    db_url = os.getenv("DIRECT_URL")
+    if not db_url:
+        db_url = os.getenv("DATABASE_URL")
+        print("⚠️ DIRECT_URL not set - listening through DATABASE_URL (notifications are lost behind pgbouncer; polling still works)")
+    if not db_url:
+        raise RuntimeError("DATABASE_URL not found in .env.local")
+    # TCP keepalives let the kernel notice a peer that vanished without closing the socket
+    conn = psycopg2.connect(
+        clean_database_url(db_url), keepalives=1, keepalives_idle=60, keepalives_interval=10, keepalives_count=3
+    )
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f"LISTEN {PIPELINE_NOTIFY_CHANNEL}")
+    return conn
+
+
+def wait_for_pipeline_work(conn, timeout: float) -> set:
+    """
+    Block until notifications arrive (then collect the burst for
+    DAEMON_DEBOUNCE_SECONDS) or timeout. Returns the stages with new work.
+    """
+    stages = set()
+    deadline = time.time() + timeout
+    while True:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return stages
+        if select.select([conn], [], [], remaining) == ([], [], []):
+            return stages
+        conn.poll()
+        while conn.notifies:
+            notify = conn.notifies.pop(0)
+            try:
+                payload = json.loads(notify.payload)
+            except json.JSONDecodeError:
+                continue
+            stage = DAEMON_STAGE_TRIGGERS.get((payload.get("table"), payload.get("status")))
+            if stage:
+                stages.add(stage)
+        if stages:
+            deadline = min(deadline, time.time() + DAEMON_DEBOUNCE_SECONDS)
+
+
+def run_pipeline_stage(stage: str, api_url: str, no_whisper: bool, batch_extract: bool,
+                       concurrency: int, compact: bool, claim_size: int) -> int:
+    if stage == "fetch":
+        return fetch_pending_sources(api_url, no_whisper, compact=compact, claim_size=claim_size)
+    if stage == "curate":
+        return curate_pending_sources(api_url, claim_size=claim_size)
+    return extract_pending_links(api_url, batch=batch_extract, concurrency=concurrency, claim_size=claim_size)
+
+
+def run_pipeline_daemon(
+    api_url: str,
+    no_whisper: bool = False,
+    batch_extract: bool = False,
+    concurrency: int = 1,
+    compact: bool = True,
+    claim_size: int = 0,
+    poll_seconds: int = DAEMON_POLL_SECONDS
+) -> int:
+    """
+    Long-running worker: fetch → curate → extract as work arrives.
+
+    Stages run when Postgres announces a status change that gives them work
+    (LISTEN/NOTIFY, see add_pipeline_work_notifications.sql), and all of them
+    run every poll_seconds in case notifications were missed. The process keeps
+    its connection pool and catalog/LLM caches warm between passes (Gemini
+    context caches are still released once a pass has extracted their
+    sources). Combine with claim_size to run several daemons at once.
+    """
+    print("\n🛰️ PIPELINE DAEMON")
+    print("=" * 50)
+    print(f"Worker: {PIPELINE_WORKER_ID} | poll every {poll_seconds}s | Ctrl+C to stop")
+
+    conn = None
+    due = set(DAEMON_STAGES)  # Start with a full pass: work may have queued while we were down
+    try:
+        while True:
+            if conn is None:
+                try:
+                    conn = open_listen_connection()
+                    print(f"👂 Listening on '{PIPELINE_NOTIFY_CHANNEL}'")
+                except Exception as e:
+                    print(f"⚠️ Could not LISTEN ({e}) - polling every {DAEMON_RECONNECT_SECONDS}s until it works")
+
+            for stage in DAEMON_STAGES:
+                if stage in due:
+                    try:
+                        run_pipeline_stage(stage, api_url, no_whisper, batch_extract, concurrency, compact, claim_size)
+                    except Exception as e:
+                        print(f"\n❌ {stage} pass failed: {e}")
+
+            if conn is None:
+                time.sleep(DAEMON_RECONNECT_SECONDS)
+                due = set(DAEMON_STAGES)
+                continue
+
+            # Writes made by the pass above (fetched → curated → ...) arrive as notifications too
+            print(f"\n💤 Waiting for work ({datetime.now():%H:%M:%S})...")
+            try:
+                due = wait_for_pipeline_work(conn, poll_seconds)
+                if not due:
+                    # A silently dropped socket looks like a quiet channel to select() - check it
+                    with conn.cursor() as cur:
+                        cur.execute("SELECT 1")
+                    conn.notifies.clear()  # Anything that arrived meanwhile is covered by the full pass
+            except (psycopg2.Error, OSError) as e:
+                print(f"\n⚠️ Lost the notification connection ({e}) - reconnecting")
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+                conn = None
+                due = set(DAEMON_STAGES)  # Notifications may have been missed meanwhile
+                continue
+            if due:
+                print(f"\n🔔 New work for: {', '.join(s for s in DAEMON_STAGES if s in due)}")
+            else:
+                print("\n⏰ Poll interval reached - checking every stage")
+                due = set(DAEMON_STAGES)
+    except KeyboardInterrupt:
+        print("\n🛑 Daemon stopped")
+        return 0
+    finally:
+        status_writes.flush()
+        if conn is not None:
+            conn.close()
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(
         description="Fetch content from YouTube, Reddit, articles, forums and extract unit context",
@@ -2959,6 +6834,28 @@ Examples:
                        help="[Pipeline Step 3] Extract unit-specific context for each link")
     parser.add_argument("--process-all", action="store_true",
                        help="Run all pipeline steps (fetch → curate → extract)")
+    parser.add_argument("--sequential-stages", action="store_true",
+                       help="With --process-all: finish each step over the whole backlog before the next "
+                            "(default: steps run concurrently, each source moving on as soon as it is ready)")
+    parser.add_argument("--daemon", action="store_true",
+                       help="Keep running and process fetch/curate/extract work as it arrives (LISTEN/NOTIFY + slow poll)")
+    parser.add_argument("--poll-interval", type=int, default=DAEMON_POLL_SECONDS,
+                       help=f"With --daemon: seconds between full passes when no notification arrives (default: {DAEMON_POLL_SECONDS})")
+    parser.add_argument("--batch-extract", action="store_true",
+                       help="Extract all units linked to a source in batched Gemini calls (use with --extract-pending or --process-all)")
+    parser.add_argument("--no-compact", action="store_true",
+                       help="Store fetched YouTube transcripts as-is (skip filler/sponsor/duplicate removal)")
+    parser.add_argument("--convert-content-storage", action="store_true",
+                       help="Re-store plain-text source content in the SOURCE_CONTENT_STORAGE mode (zstd or blob)")
+    parser.add_argument("--concurrency", type=int, default=1,
+                       help="Max concurrent Gemini calls for extraction and --aggregate-all (adapts down on 429/503, default: 1)")
+    parser.add_argument("--claim-size", type=int, default=0,
+                       help="Lease pending work this many rows at a time so several workers can run a stage at once "
+                            "(fetch/curate/extract; requires the lease columns migration, default: 0 = no leasing)")
+    parser.add_argument("--full-transcript", action="store_true",
+                       help="Send the whole source to extraction instead of the passages around each unit's mentions")
+    parser.add_argument("--no-llm-cache", action="store_true",
+                       help="Bypass the local Gemini response cache (always call the API)")
     
     # Aggregate mode - synthesize context from all sources
     parser.add_argument("--aggregate", action="store_true",
@@ -2975,9 +6872,25 @@ Examples:
                        help="Faction name to aggregate all units for (use with --aggregate-all)")
     parser.add_argument("--detachment-id",
                        help="Detachment ID for detachment-specific context (use with --aggregate, requires --faction-id)")
+    parser.add_argument("--all-scopes", action="store_true",
+                       help="Write generic, faction and detachment contexts in one pass, partitioning sources by their faction/detachment (use with --aggregate or --aggregate-all)")
+    parser.add_argument("--pack-aggregate", action="store_true",
+                       help=f"Synthesize units with up to {AGGREGATE_PACK_MAX_SOURCES} sources several per Gemini call (use with --aggregate-all)")
+    parser.add_argument("--local-consensus", action="store_true",
+                       help="When sources clearly agree on a unit's tier, merge them locally instead of calling Gemini (aggregation)")
+    parser.add_argument("--force", action="store_true",
+                       help="Re-aggregate even if no source changed since the last aggregation (use with --aggregate or --aggregate-all)")
     
     args = parser.parse_args()
 
+    global RETRIEVAL_ENABLED, LLM_CACHE_ENABLED
+    if args.full_transcript:
+        RETRIEVAL_ENABLED = False
+    if args.no_llm_cache:
+        LLM_CACHE_ENABLED = False
+    atexit.register(print_llm_cache_stats)
+    flush_status_writes_on_signal()
+
     # Ensure output directory exists
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -3007,21 +6920,39 @@ Examples:
 
     # ===== NEW PIPELINE MODES =====
     
+    # Long-running worker
+    if getattr(args, 'daemon', False):
+        return run_pipeline_daemon(
+            args.api_url, args.no_whisper, batch_extract=args.batch_extract, concurrency=args.concurrency,
+            compact=not args.no_compact, claim_size=args.claim_size, poll_seconds=args.poll_interval
+        )
+    
     # Process all pipeline steps
     if getattr(args, 'process_all', False):
-        return process_all_pipeline(args.api_url, args.no_whisper)
+        return process_all_pipeline(
+            args.api_url, args.no_whisper, batch_extract=args.batch_extract, concurrency=args.concurrency,
+            compact=not args.no_compact, claim_size=args.claim_size, streaming=not args.sequential_stages
+        )
     
     # Step 1: Fetch content for pending CompetitiveSources
     if getattr(args, 'fetch_pending', False):
-        return fetch_pending_sources(args.api_url, args.no_whisper)
+        return fetch_pending_sources(
+            args.api_url, args.no_whisper, compact=not args.no_compact, claim_size=args.claim_size
+        )
     
     # Step 2: Curate - identify mentioned units
     if getattr(args, 'curate_pending', False):
-        return curate_pending_sources(args.api_url)
+        return curate_pending_sources(args.api_url, claim_size=args.claim_size)
+    
+    # Compress/offload source content that is still stored as plain text
+    if getattr(args, 'convert_content_storage', False):
+        return convert_stored_content()
     
     # Step 3: Extract - unit-specific context
     if getattr(args, 'extract_pending', False):
-        return extract_pending_links(args.api_url)
+        return extract_pending_links(
+            args.api_url, batch=args.batch_extract, concurrency=args.concurrency, claim_size=args.claim_size
+        )
     
     # Aggregate ALL units for a faction
     if getattr(args, 'aggregate_all', False):
@@ -3032,13 +6963,18 @@ Examples:
             args.api_url,
             faction_id=args.faction_id,
             faction_name=args.faction_name,
-            detachment_id=args.detachment_id
+            detachment_id=args.detachment_id,
+            concurrency=args.concurrency,
+            force=args.force,
+            local_consensus=args.local_consensus,
+            all_scopes=args.all_scopes,
+            pack=args.pack_aggregate
         )
     
     # Aggregate mode - synthesize context from multiple sources (single unit)
     if getattr(args, 'aggregate', False):
         # Validate detachment requires faction
-        if args.detachment_id and not args.faction_id:
+        if args.detachment_id and not args.faction_id and not args.all_scopes:
             print("❌ --detachment-id requires --faction-id to be set")
             return 1
         
@@ -3047,7 +6983,11 @@ Examples:
             datasheet_id=args.datasheet_id,
             datasheet_name=args.datasheet_name,
             faction_id=args.faction_id,
-            detachment_id=args.detachment_id
+            detachment_id=args.detachment_id,
+            force=args.force,
+            local_consensus=args.local_consensus,
+            all_scopes=args.all_scopes,
+            concurrency=args.concurrency
         )
 
     # File mode - read from existing transcript
@@ -3097,7 +7037,7 @@ Examples:
         
         # Extract unit context
         context_result = extract_unit_context(
-            transcript=transcript,
+            transcript=retrieve_unit_passages(transcript, [args.unit], video_info) or transcript,
             unit_name=args.unit,
             faction=args.faction,
             video_info=video_info
@@ -3318,7 +7258,7 @@ Examples:
         }
         
         context_result = extract_unit_context(
-            transcript=transcript,
+            transcript=retrieve_unit_passages(transcript, [args.unit], source_info) or transcript,
             unit_name=args.unit,
             faction=args.faction,
             video_info=source_info  # Use source_info, compatible with video_info structure